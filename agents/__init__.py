@@ -1,70 +1,236 @@
-from typing import List, Any, Optional
-from tools import nominate_tool, vote_tool, president_legislate_tool, chancellor_legislate_tool, investigate_tool
-from log import log as logger
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import List, Any, Callable, Optional, Dict, Tuple
+import contextvars
+import random
+import memory
+import tracing
+import usage
+from agents.scripted import ScriptedAgent, HeuristicPolicy, RolePolicy, DEFAULT_POLICIES
+from parsers import NominationOut, VoteOut, PresidentLegislateOut, ChancellorLegislateOut, InvestigateOut
+from tools import PHASES, PromptContext, heuristic_decision, nominate_tool, vote_tool, president_legislate_tool, chancellor_legislate_tool, investigate_tool
+from usage import record_tier
+from tracing import get_tracer
+from log import WARNING, capture as capture_log, log as logger, replay as replay_log
+
+tracer = get_tracer(__name__)
+# Speculative President decisions run here while the ballots are collected.
+_SPECULATION_POOL = ThreadPoolExecutor(max_workers=8, thread_name_prefix="speculate")
+
+# Minimum heuristic confidence, per phase and role, for the "tiered" backend to decide
+# without the model. Fascist legislation always goes to the model: what a fascist passes
+# or enacts is part of their cover story, which the heuristic cannot weigh.
+DEFAULT_THRESHOLDS: Dict[str, Dict[str, float]] = {
+    "nominate": {"liberal": 0.9, "fascist": 0.9, "hitler": 0.9},
+    "vote": {"liberal": 0.9, "fascist": 0.9, "hitler": 0.9},
+    "legislate_president": {"liberal": 0.9, "fascist": 1.01, "hitler": 1.01},
+    "legislate_chancellor": {"liberal": 0.9, "fascist": 1.01, "hitler": 1.01},
+    "executive": {"liberal": 0.9, "fascist": 0.9, "hitler": 0.9},
+}
 
 class Agent:
-    def __init__(self, aid: int, role: str, team: str, model: Optional[str] = None, llm_client: Optional[Any] = None):
+    def __init__(self, aid: int, role: str, team: str, model: Optional[str] = None, llm_client: Optional[Any] = None, prompt_context: Optional[PromptContext] = None,
+                 heuristic: Optional[HeuristicPolicy] = None, thresholds: Optional[Dict[str, Dict[str, float]]] = None, fallback: Optional[ScriptedAgent] = None):
         """
         Agent is a lightweight wrapper around decision functions.
         LLM/tool clients are provided via runtime/context or explicit llm_client injection.
+        prompt_context is the game's shared prompt scaffolding (built from the players if omitted).
+        With a heuristic, each decision asks it first and only goes to the model when its
+        confidence is below thresholds[phase][role].
+        fallback plays the decisions the model cannot take (call failed, circuit breaker open).
         """
         self.agent_id = aid
         self.role = role
         self.team = team
         self.model = model
         self.llm = llm_client
+        self.prompt_context = prompt_context
+        self.heuristic = heuristic
+        self.thresholds = DEFAULT_THRESHOLDS if thresholds is None else thresholds
+        self.fallback = fallback
+        self._speculation: Optional[Tuple[tuple, Future]] = None
+
+    def _context(self, state: dict) -> PromptContext:
+        if self.prompt_context is None:
+            self.prompt_context = PromptContext(state["players"])
+        return self.prompt_context
+
+    def _tiered(self, schema: type, state: dict, opinion: Optional[Tuple[Any, float]], ask: Callable[[], Any], same: Callable[[Any, Any], bool] = lambda a, b: a == b) -> Any:
+        """Take the heuristic's choice if it is confident enough for this phase and role; otherwise ask the model."""
+        if opinion is None:
+            return ask()
+        choice, confidence = opinion
+        phase = PHASES[schema]
+        threshold = self.thresholds.get(phase, {}).get(self.role)
+        if threshold is not None and confidence >= threshold:
+            return heuristic_decision(schema, self.agent_id, self.role, state, self._context(state), choice, confidence)
+        value = ask()
+        record_tier(phase, self.role, escalated=True, agreed=same(value, choice))
+        return value
 
     def nominate(self, state: dict) -> int:
-        eligible = [
-            p["id"]
-            for p in state["players"]
-            if p["alive"]
-            and p["id"] != state["current_president_idx"]
-            and (state.get("previous_chancellor_idx") is None or p["id"] != state.get("previous_chancellor_idx"))
-            and (state.get("previous_president_idx") is None or p["id"] != state.get("previous_president_idx"))
-        ]
-        cid, public, private = nominate_tool(self.agent_id, self.role, state, model=self.model, llm_client=self.llm)
+        context = self._context(state)
+        eligible = context.nominees(state, state["current_president_idx"])
+        if self.heuristic is not None:
+            opinion = self.heuristic.nominate(self.agent_id, self.role, state, eligible)
+            return self._tiered(NominationOut, state, opinion, lambda: self._nominate(state, context, eligible))
+        return self._nominate(state, context, eligible)
+
+    def _nominate(self, state: dict, context: PromptContext, eligible: List[int]) -> int:
+        cid, public, private = nominate_tool(self.agent_id, self.role, state, model=self.model, llm_client=self.llm, prompt_context=context, fallback_agent=self.fallback)
         if cid not in eligible:
             fallback = eligible[0] if eligible else 0
-            logger(f"[AGENT WARNING] Agent {self.agent_id}: LLM nominated invalid player {cid}; falling back to {fallback}.")
+            logger(f"[AGENT WARNING] Agent {self.agent_id}: LLM nominated invalid player {cid}; falling back to {fallback}.", level=WARNING)
             cid = fallback
         return cid
 
     def vote(self, state: dict) -> bool:
-        v, public, private = vote_tool(self.agent_id, self.role, state, model=self.model, llm_client=self.llm)
+        if self.heuristic is not None:
+            return self._tiered(VoteOut, state, self.heuristic.vote(self.agent_id, self.role, state), lambda: self._vote(state))
+        return self._vote(state)
+
+    def _vote(self, state: dict) -> bool:
+        v, public, private = vote_tool(self.agent_id, self.role, state, model=self.model, llm_client=self.llm, prompt_context=self._context(state), fallback_agent=self.fallback)
         return v
 
+    def speculate_president_legislate(self, state: dict) -> None:
+        """
+        Start the President's legislative decision in the background, for `state` with the
+        cards it will draw if elected. Its log lines, events, trace spans, memory writes and
+        usage records are held back: president_legislate() takes them over if it is asked about
+        the same government and cards, cancel_speculation() drops them (only the tokens are
+        counted).
+        """
+        self.cancel_speculation()
+        key = (state["current_president_idx"], state["nominated_chancellor_idx"], tuple(state["drawn_policies"]))
+        future = _SPECULATION_POOL.submit(contextvars.copy_context().run, self._speculate, state)
+        self._speculation = (key, future)
+
+    def _speculate(self, state: dict) -> tuple:
+        with tracer.start_as_current_span("speculation", {"player": self.agent_id, "phase": "legislate_president"}) as span:
+            # Its decision spans (forced/heuristic flags) would reveal the cards as much as its log lines.
+            with capture_log() as lines, memory.deferred() as notes, usage.deferred() as records, tracing.deferred() as spans:
+                value = self._president_decision(state)
+        return value, lines, notes, records, spans, span
+
+    def cancel_speculation(self) -> None:
+        if self._speculation is not None:
+            _, future = self._speculation
+            self._speculation = None
+            future.add_done_callback(lambda f: self._settle(f, kept=False))
+
+    def _settle(self, future: Future, kept: bool) -> Any:
+        if future.exception() is not None:
+            logger(f"[SPECULATION] Player {self.agent_id}: speculative decision failed ({future.exception()})", level=WARNING)
+            return None
+        value, lines, notes, records, spans, span = future.result()
+        span.set_attribute("speculation.kept", kept)
+        tracing.commit(spans, keep=kept)
+        if kept:
+            replay_log(lines)
+            memory.apply(notes)
+        usage.commit(records, wasted=not kept)
+        return value
+
     def president_legislate(self, state: dict) -> List[str]:
-        rem, public, private = president_legislate_tool(self.agent_id, state, model=self.model, llm_client=self.llm)
+        speculation, self._speculation = self._speculation, None
+        if speculation is not None:
+            key, future = speculation
+            if key == (state["current_president_idx"], state["nominated_chancellor_idx"], tuple(state.get("drawn_policies", []))):
+                value = self._settle(future, kept=True)
+                if value is not None:
+                    logger(f"[SPECULATION] Player {self.agent_id}: legislative decision was prefetched during the vote")
+                    return value
+            else:
+                future.add_done_callback(lambda f: self._settle(f, kept=False))
+        return self._president_decision(state)
+
+    def _president_decision(self, state: dict) -> List[str]:
+        if self.heuristic is not None:
+            opinion = self.heuristic.president_legislate(self.agent_id, self.role, state)
+            return self._tiered(PresidentLegislateOut, state, opinion, lambda: self._president_legislate(state), lambda a, b: sorted(a) == sorted(b))
+        return self._president_legislate(state)
+
+    def _president_legislate(self, state: dict) -> List[str]:
+        rem, public, private = president_legislate_tool(self.agent_id, state, model=self.model, llm_client=self.llm, prompt_context=self._context(state), fallback_agent=self.fallback)
         # Validate returned policies are subset of drawn policies
         drawn = state.get("drawn_policies", [])
         if any(r not in drawn for r in rem):
-            logger(f"[AGENT WARNING] Agent {self.agent_id}: President returned policies {rem} not subset of drawn {drawn}. Adjusting to intersection.")
+            logger(f"[AGENT WARNING] Agent {self.agent_id}: President returned policies {rem} not subset of drawn {drawn}. Adjusting to intersection.", level=WARNING)
             rem = [p for p in rem if p in drawn]
             if not rem:
                 # fallback: pass first two drawn (or drawn itself)
                 rem = drawn[:2]
-                logger(f"[AGENT WARNING] Agent {self.agent_id}: Adjusted passed policies to {rem}.")
+                logger(f"[AGENT WARNING] Agent {self.agent_id}: Adjusted passed policies to {rem}.", level=WARNING)
         return rem
 
     def chancellor_legislate(self, state: dict) -> str:
-        enact, public, private = chancellor_legislate_tool(self.agent_id, state, model=self.model, llm_client=self.llm)
+        if self.heuristic is not None:
+            opinion = self.heuristic.chancellor_legislate(self.agent_id, self.role, state)
+            return self._tiered(ChancellorLegislateOut, state, opinion, lambda: self._chancellor_legislate(state))
+        return self._chancellor_legislate(state)
+
+    def _chancellor_legislate(self, state: dict) -> str:
+        enact, public, private = chancellor_legislate_tool(self.agent_id, state, model=self.model, llm_client=self.llm, prompt_context=self._context(state), fallback_agent=self.fallback)
         passed = state.get("passed_policies", [])
         if enact not in passed:
             fallback = passed[0] if passed else enact
-            logger(f"[AGENT WARNING] Agent {self.agent_id}: Chancellor chose invalid policy {enact}; falling back to {fallback}.")
+            logger(f"[AGENT WARNING] Agent {self.agent_id}: Chancellor chose invalid policy {enact}; falling back to {fallback}.", level=WARNING)
             enact = fallback
         return enact
 
     def investigate_player(self, state: dict) -> int:
-        eligible = [p["id"] for p in state["players"] if p["alive"] and not p.get("investigated", False)]
-        target, public, private = investigate_tool(self.agent_id, state, model=self.model, llm_client=self.llm)
+        context = self._context(state)
+        eligible = context.investigable(state)
+        if self.heuristic is not None:
+            opinion = self.heuristic.investigate_player(self.agent_id, self.role, state, eligible)
+            return self._tiered(InvestigateOut, state, opinion, lambda: self._investigate_player(state, context, eligible))
+        return self._investigate_player(state, context, eligible)
+
+    def _investigate_player(self, state: dict, context: PromptContext, eligible: List[int]) -> int:
+        target, public, private = investigate_tool(self.agent_id, state, model=self.model, llm_client=self.llm, prompt_context=context, fallback_agent=self.fallback)
         if target not in eligible:
             fallback = eligible[0] if eligible else 0
-            logger(f"[AGENT WARNING] Agent {self.agent_id}: Investigation target {target} not eligible; falling back to {fallback}.")
+            logger(f"[AGENT WARNING] Agent {self.agent_id}: Investigation target {target} not eligible; falling back to {fallback}.", level=WARNING)
             target = fallback
         return target
 
-def initialize_agents(players: List[dict], model: Optional[str] = None, llm_client: Optional[Any] = None) -> List[Agent]:
-    """Create runtime Agent objects. Provide shared llm_client via injection if available."""
-    return [Agent(p["id"], p["role"], p["team"], model, llm_client=llm_client) for p in players]
\ No newline at end of file
+def game_memory(agents: List[Any]) -> Optional[memory.GameMemory]:
+    """The GameMemory the LLM agents share (looking through wrappers that keep the agent in `.agent`), if any."""
+    for agent in agents:
+        while not isinstance(agent, Agent) and hasattr(agent, "agent"):
+            agent = agent.agent
+        if isinstance(agent, Agent) and agent.prompt_context is not None:
+            return agent.prompt_context.memory
+    return None
+
+def initialize_agents(
+    players: List[dict],
+    model: Optional[str] = None,
+    llm_client: Optional[Any] = None,
+    backend: str = "llm",
+    policies: Optional[Dict[str, RolePolicy]] = None,
+    rng: Optional[random.Random] = None,
+    thresholds: Optional[Dict[str, Dict[str, float]]] = None,
+    seed: Optional[Any] = None,
+) -> List[Any]:
+    """
+    Create runtime agent objects. Provide shared llm_client via injection if available.
+    backend="scripted" plays offline with rule-based policies (per-role overrides via `policies`).
+    backend="tiered" is the LLM agents with the scripted rules as a first tier: confident
+    heuristic decisions (see DEFAULT_THRESHOLDS, or `thresholds`) skip the model.
+    LLM agents fall back to the scripted policy of their role when the model cannot answer;
+    each fallback draws from its own RNG derived from `seed`, so how often the model fails
+    does not shift the game RNG.
+    """
+    policies = {**DEFAULT_POLICIES, **(policies or {})}
+    if backend == "scripted":
+        return [ScriptedAgent(p["id"], p["role"], p["team"], policies[p["role"]], rng=rng) for p in players]
+    if backend not in ("llm", "tiered"):
+        raise ValueError(f"Unknown agent backend: {backend}")
+    prompt_context = PromptContext(players)
+    heuristic = HeuristicPolicy(policies) if backend == "tiered" else None
+    return [
+        Agent(p["id"], p["role"], p["team"], model, llm_client=llm_client, prompt_context=prompt_context, heuristic=heuristic, thresholds=thresholds,
+              fallback=ScriptedAgent(p["id"], p["role"], p["team"], policies[p["role"]], rng=None if seed is None else random.Random(f"{seed}-fallback-{p['id']}")))
+        for p in players
+    ]
\ No newline at end of file
@@ -0,0 +1,160 @@
+"""Rule-based agents that play without an LLM.
+
+They expose the same decision methods as Agent, so the game nodes can drive them
+unchanged. Play is controlled per role by a RolePolicy; decisions depend only on
+the role, what that role knows about teammates, the board and the cards in hand.
+"""
+import random
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+@dataclass(frozen=True)
+class RolePolicy:
+    # Probability of nominating a known teammate when one is eligible.
+    nominate_teammate: float = 0.0
+    # Probability of voting Ja on a government with no known teammate in it.
+    vote_ja: float = 0.7
+    # Same, once 3 Fascist policies are on the board (Hitler zone).
+    vote_ja_late: float = 0.5
+    # Probability of voting Ja when a known teammate is President or Chancellor.
+    vote_ja_teammate: float = 1.0
+    # Probability of discarding/enacting in favour of the own team when the cards allow it.
+    promote_own_team: float = 1.0
+
+DEFAULT_POLICIES: Dict[str, RolePolicy] = {
+    "liberal": RolePolicy(vote_ja=0.7, vote_ja_late=0.4),
+    "fascist": RolePolicy(nominate_teammate=0.8, vote_ja=0.6, vote_ja_late=0.6, promote_own_team=0.9),
+    "hitler": RolePolicy(nominate_teammate=0.3, vote_ja=0.7, vote_ja_late=0.7, promote_own_team=0.6),
+}
+
+def own_policy(role: str) -> str:
+    return "liberal" if role == "liberal" else "fascist"
+
+def known_teammates(players: List[dict], agent_id: int, role: str) -> List[int]:
+    """Ids this role knows to be on its own team (5-player rules: Fascist and Hitler know each other)."""
+    if role == "liberal":
+        return []
+    return [p["id"] for p in players if p["id"] != agent_id and p["team"] == "fascist"]
+
+class ScriptedAgent:
+    def __init__(self, aid: int, role: str, team: str, policy: Optional[RolePolicy] = None, rng: Optional[random.Random] = None):
+        self.agent_id = aid
+        self.role = role
+        self.team = team
+        self.policy = policy or DEFAULT_POLICIES[role]
+        self.rng = rng or random
+
+    def nominate(self, state: dict) -> int:
+        eligible = [
+            p["id"]
+            for p in state["players"]
+            if p["alive"]
+            and p["id"] != state["current_president_idx"]
+            and p["id"] != state.get("previous_chancellor_idx")
+            and p["id"] != state.get("previous_president_idx")
+        ]
+        if not eligible:
+            return 0
+        mates = [pid for pid in known_teammates(state["players"], self.agent_id, self.role) if pid in eligible]
+        if mates and self.rng.random() < self.policy.nominate_teammate:
+            return self.rng.choice(mates)
+        return self.rng.choice(eligible)
+
+    def vote(self, state: dict) -> bool:
+        government = (state["current_president_idx"], state["nominated_chancellor_idx"])
+        if self.agent_id in government:
+            return True
+        mates = known_teammates(state["players"], self.agent_id, self.role)
+        if any(pid in mates for pid in government):
+            p = self.policy.vote_ja_teammate
+        elif state.get("fascist_policies", 0) >= 3:
+            p = self.policy.vote_ja_late
+        else:
+            p = self.policy.vote_ja
+        return self.rng.random() < p
+
+    def president_legislate(self, state: dict) -> List[str]:
+        drawn = list(state.get("drawn_policies", []))
+        mine = own_policy(self.role)
+        theirs = "fascist" if mine == "liberal" else "liberal"
+        if self.rng.random() < self.policy.promote_own_team:
+            order = (theirs, mine)
+        else:
+            order = (mine, theirs)
+        discard = next((p for p in order if p in drawn), None)
+        if discard is not None:
+            drawn.remove(discard)
+        return drawn[:2]
+
+    def chancellor_legislate(self, state: dict) -> str:
+        passed = state.get("passed_policies", [])
+        mine = own_policy(self.role)
+        theirs = "fascist" if mine == "liberal" else "liberal"
+        if self.rng.random() < self.policy.promote_own_team:
+            order = (mine, theirs)
+        else:
+            order = (theirs, mine)
+        return next(p for p in order if p in passed)
+
+    def investigate_player(self, state: dict) -> int:
+        eligible = [p["id"] for p in state["players"] if p["alive"] and not p.get("investigated", False)]
+        others = [pid for pid in eligible if pid != self.agent_id]
+        if others or eligible:
+            return self.rng.choice(others or eligible)
+        return 0
+
+class HeuristicPolicy:
+    """
+    The scripted rules as a deterministic first opinion: each method returns the RolePolicy's
+    most likely move and its probability as a confidence, or None when there is nothing to
+    choose between (single-outcome decisions are left to the tools, which resolve them as forced).
+    """
+
+    def __init__(self, policies: Optional[Dict[str, RolePolicy]] = None):
+        self.policies = {**DEFAULT_POLICIES, **(policies or {})}
+
+    def nominate(self, agent_id: int, role: str, state: dict, eligible: List[int]) -> Optional[Tuple[int, float]]:
+        if len(eligible) < 2:
+            return None
+        policy = self.policies[role]
+        mates = [pid for pid in known_teammates(state["players"], agent_id, role) if pid in eligible]
+        if mates and policy.nominate_teammate >= 0.5:
+            return mates[0], policy.nominate_teammate / len(mates)
+        return eligible[0], 1 / len(eligible)
+
+    def vote(self, agent_id: int, role: str, state: dict) -> Optional[Tuple[bool, float]]:
+        government = (state["current_president_idx"], state["nominated_chancellor_idx"])
+        if agent_id in government:
+            return True, 1.0
+        policy = self.policies[role]
+        if any(pid in known_teammates(state["players"], agent_id, role) for pid in government):
+            p = policy.vote_ja_teammate
+        elif state.get("previous_president_idx") is None and state.get("election_tracker", 0) == 0:
+            # The first government: nothing is known yet and refusing it only advances the tracker.
+            p = max(policy.vote_ja, 0.9)
+        elif state.get("fascist_policies", 0) >= 3:
+            p = policy.vote_ja_late
+        else:
+            p = policy.vote_ja
+        return p >= 0.5, max(p, 1 - p)
+
+    def president_legislate(self, agent_id: int, role: str, state: dict) -> Optional[Tuple[List[str], float]]:
+        drawn = list(state.get("drawn_policies", []))
+        if len(set(drawn)) < 2:
+            return None
+        mine = own_policy(role)
+        theirs = "fascist" if mine == "liberal" else "liberal"
+        drawn.remove(theirs)
+        return drawn, self.policies[role].promote_own_team
+
+    def chancellor_legislate(self, agent_id: int, role: str, state: dict) -> Optional[Tuple[str, float]]:
+        passed = state.get("passed_policies", [])
+        if len(set(passed)) < 2:
+            return None
+        return own_policy(role), self.policies[role].promote_own_team
+
+    def investigate_player(self, agent_id: int, role: str, state: dict, eligible: List[int]) -> Optional[Tuple[int, float]]:
+        others = [pid for pid in eligible if pid != agent_id]
+        if len(eligible) < 2 or not others:
+            return None
+        return others[0], 1 / len(others)
@@ -0,0 +1,147 @@
+"""Cross-game batching of structured LLM calls.
+
+BatchingLLM wraps a chat model. Decision requests arriving from concurrent games (each
+on its own graph thread) for the same output schema are held for up to `window`
+seconds or until `max_batch` of them are waiting, then sent together with the model's
+`batch()` — one request on backends with a bulk endpoint, the client's own concurrent
+fan-out otherwise — and each caller gets its own result (or exception) back. The first
+request of a batch waits out the window and submits it; the others just wait for their
+answer.
+
+Requests with different extra arguments (e.g. another context-cache handle) never share
+a batch call. Per-request configs (usage callbacks) travel with their request.
+
+Configured from LLM_BATCH_WINDOW_MS (default 0: off) and LLM_BATCH_MAX (default 16).
+"""
+import os
+import threading
+from collections import Counter
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from tracing import get_current_span
+
+class _Request:
+    def __init__(self, prompt: Any, config: Optional[dict], kwargs: dict):
+        self.prompt = prompt
+        self.config = config
+        self.kwargs = kwargs
+        self.future: Future = Future()
+        self.batch_size = 1
+
+class _Batch:
+    def __init__(self):
+        self.requests: List[_Request] = []
+        self.full = threading.Event()
+
+class BatchingLLM:
+    """Wraps an LLM client and merges concurrent structured calls with the same schema into batch calls."""
+
+    def __init__(self, llm: Any, window: float = 0.005, max_batch: int = 16):
+        self.llm = llm
+        self.window = window
+        self.max_batch = max(1, max_batch)
+        self._runnables: Dict[tuple, Any] = {}
+        self._open: Dict[tuple, _Batch] = {}
+        self._lock = threading.Lock()
+        self.sizes: Counter = Counter()
+
+    def with_structured_output(self, schema, **kwargs):
+        key = (schema, tuple(sorted(kwargs.items())))
+        with self._lock:
+            runnable = self._runnables.get(key)
+            if runnable is None:
+                runnable = self._runnables[key] = self.llm.with_structured_output(schema, **kwargs)
+        return _BatchingRunnable(self, key, runnable)
+
+    def submit(self, key: tuple, runnable: Any, request: _Request) -> Any:
+        with self._lock:
+            batch = self._open.get(key)
+            leader = batch is None
+            if leader:
+                batch = self._open[key] = _Batch()
+            batch.requests.append(request)
+            if len(batch.requests) >= self.max_batch:
+                del self._open[key]
+                batch.full.set()
+        if leader:
+            batch.full.wait(self.window)
+            with self._lock:
+                if self._open.get(key) is batch:
+                    del self._open[key]
+            self._run(runnable, batch.requests)
+        try:
+            return request.future.result()
+        finally:
+            get_current_span().set_attribute("llm.batch_size", request.batch_size)
+
+    def _run(self, runnable: Any, requests: List[_Request]) -> None:
+        groups: Dict[tuple, List[_Request]] = {}
+        for request in requests:
+            groups.setdefault(tuple(sorted(request.kwargs.items())), []).append(request)
+        for group in groups.values():
+            with self._lock:
+                self.sizes[len(group)] += 1
+            for request in group:
+                request.batch_size = len(group)
+            if len(group) == 1:
+                results = [self._invoke(runnable, group[0])]
+            elif hasattr(runnable, "batch"):
+                try:
+                    results = runnable.batch([r.prompt for r in group], config=[r.config or {} for r in group], return_exceptions=True, **group[0].kwargs)
+                except Exception as e:
+                    results = [e] * len(group)
+            else:
+                with ThreadPoolExecutor(max_workers=len(group)) as pool:
+                    results = list(pool.map(lambda r: self._invoke(runnable, r), group))
+            for request, result in zip(group, results):
+                if isinstance(result, Exception):
+                    request.future.set_exception(result)
+                else:
+                    request.future.set_result(result)
+
+    @staticmethod
+    def _invoke(runnable: Any, request: _Request) -> Any:
+        try:
+            return runnable.invoke(request.prompt, config=request.config, **request.kwargs)
+        except Exception as e:
+            return e
+
+    def stats(self) -> dict:
+        with self._lock:
+            batches = sum(self.sizes.values())
+            requests = sum(size * n for size, n in self.sizes.items())
+            return {
+                "requests": requests,
+                "batches": batches,
+                "mean_batch_size": round(requests / batches, 2) if batches else 0.0,
+                "sizes": dict(sorted(self.sizes.items())),
+            }
+
+    def __getattr__(self, name):
+        return getattr(self.llm, name)
+
+class _BatchingRunnable:
+    def __init__(self, owner: BatchingLLM, key: tuple, runnable: Any):
+        self.owner = owner
+        self.key = key
+        self.runnable = runnable
+
+    def invoke(self, prompt: Any, *args, **kwargs):
+        config = kwargs.pop("config", None) or (args[0] if args else None)
+        return self.owner.submit(self.key, self.runnable, _Request(prompt, config, kwargs))
+
+def batching_from_env(llm: Any) -> Any:
+    """Wrap `llm` in a BatchingLLM when LLM_BATCH_WINDOW_MS is set above 0."""
+    window_ms = float(os.environ.get("LLM_BATCH_WINDOW_MS", "0"))
+    if window_ms <= 0:
+        return llm
+    return BatchingLLM(llm, window=window_ms / 1000, max_batch=int(os.environ.get("LLM_BATCH_MAX", "16")))
+
+def find(llm: Any) -> Optional[BatchingLLM]:
+    """The BatchingLLM inside a stack of client wrappers (each keeps the next in `.llm`), if any."""
+    while llm is not None:
+        if isinstance(llm, BatchingLLM):
+            return llm
+        llm = llm.__dict__.get("llm") if hasattr(llm, "__dict__") else None
+    return None
@@ -0,0 +1,356 @@
+"""Benchmarks for the game engine and the agent pipeline, against a fake LLM.
+
+Measures, on fixed seeds:
+  games     games/sec through the raw nodes (graph.run_headless) and the compiled
+            LangGraph app, with scripted agents and with LLM agents on fake_llm.FakeLLM
+  nodes     per-node overhead (node wall time minus time spent inside agent decisions)
+            and the compiled app's extra cost per step
+  prompts   time spent in the tools.py decision path outside the model call
+            (prompt building, parsing, validation), per decision kind
+  memory    tracemalloc peak per game and memory retained across many games
+  batching  concurrent games on one shared fake LLM, with and without the cross-game
+            batching broker (batching.BatchingLLM): wall time, model round trips and
+            the batch sizes the fake LLM received
+
+Results are written as JSON with a fixed layout (schema, env, config, results), so
+two runs can be diffed or compared with --compare.
+
+    python benchmark.py --out bench/HEAD.json
+    python benchmark.py --latency 0.05 --games 20 --only games
+    python benchmark.py --compare bench/base.json bench/HEAD.json
+    python benchmark.py --only batching --latency 0.05 --batch-window-ms 10
+"""
+import argparse
+import contextvars
+import gc
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from game import create_initial_state
+from agents import initialize_agents
+from graph import build_workflow, run_headless
+from fake_llm import FakeLLM
+from batching import BatchingLLM
+from log import muted, log as logger
+import tools
+
+SCHEMA_VERSION = 1
+SECTIONS = ("games", "nodes", "prompts", "memory", "batching")
+# Node each agent decision is made in.
+DECISION_NODES = {
+    "nominate": "nominate",
+    "vote": "vote",
+    "president_legislate": "legislate_president",
+    "chancellor_legislate": "legislate_chancellor",
+    "investigate_player": "executive",
+}
+
+class _TimedAgent:
+    """Forwards decisions to an agent, adding the time spent to agent_seconds[node] and keeping the states seen."""
+
+    def __init__(self, agent: Any, agent_seconds: Dict[str, float], states: Optional[List[tuple]] = None):
+        self.agent = agent
+        self.agent_id = agent.agent_id
+        self.role = agent.role
+        self.team = agent.team
+        self.agent_seconds = agent_seconds
+        self.states = states
+
+    def _timed(self, kind: str, state: dict) -> Any:
+        if self.states is not None:
+            self.states.append((kind, self.agent_id, self.role, state))
+        start = time.perf_counter()
+        try:
+            return getattr(self.agent, kind)(state)
+        finally:
+            node = DECISION_NODES[kind]
+            self.agent_seconds[node] = self.agent_seconds.get(node, 0.0) + time.perf_counter() - start
+
+    def nominate(self, state):
+        return self._timed("nominate", state)
+
+    def vote(self, state):
+        return self._timed("vote", state)
+
+    def president_legislate(self, state):
+        return self._timed("president_legislate", state)
+
+    def chancellor_legislate(self, state):
+        return self._timed("chancellor_legislate", state)
+
+    def investigate_player(self, state):
+        return self._timed("investigate_player", state)
+
+def _setup(seed: int, backend: str, llm: Optional[FakeLLM]):
+    rng = random.Random(seed)
+    state = create_initial_state(rng)
+    agents = initialize_agents(state["players"], llm_client=llm, backend=backend, rng=rng, seed=seed)
+    # Serial ballots keep every run of a seed identical.
+    return state, {"agents": agents, "rng": rng, "vote_workers": 1}
+
+def _stats(samples: List[float]) -> Dict[str, float]:
+    ordered = sorted(samples)
+    return {
+        "n": len(ordered),
+        "mean_us": statistics.fmean(ordered) * 1e6 if ordered else 0.0,
+        "p50_us": ordered[len(ordered) // 2] * 1e6 if ordered else 0.0,
+        "p95_us": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1e6 if ordered else 0.0,
+    }
+
+def _best_of(repeat: int, fn: Callable[[], Any]) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def bench_games(games: int, seed: int, latency: float, repeat: int) -> dict:
+    """Games/sec for each engine (raw nodes, compiled app) and backend (scripted, fake LLM)."""
+    app = build_workflow().compile()
+    engines = {
+        "headless": lambda state, context: run_headless(state, context),
+        "compiled": lambda state, context: app.invoke(state, config={"recursion_limit": 1000}, context=context),
+    }
+    out = {}
+    for backend in ("scripted", "llm"):
+        for engine, play in engines.items():
+            calls = [0]
+
+            def run():
+                calls[0] = 0
+                for i in range(games):
+                    llm = FakeLLM(latency=latency, seed=seed + i) if backend == "llm" else None
+                    state, context = _setup(seed + i, backend, llm)
+                    play(state, context)
+                    if llm is not None:
+                        calls[0] += sum(llm.calls.values())
+
+            seconds = _best_of(repeat, run)
+            out[f"{backend}_{engine}"] = {
+                "games": games,
+                "seconds": seconds,
+                "games_per_second": games / seconds if seconds else 0.0,
+                "llm_calls_per_game": calls[0] / games if games else 0.0,
+            }
+    return out
+
+def bench_nodes(games: int, seed: int) -> dict:
+    """Per-node overhead with scripted agents: node wall time minus time inside agent decisions."""
+    timings: Dict[str, List[float]] = {}
+    agent_seconds: Dict[str, float] = {}
+    steps = 0
+    headless = 0.0
+    for i in range(games):
+        state, context = _setup(seed + i, "scripted", None)
+        context["agents"] = [_TimedAgent(a, agent_seconds) for a in context["agents"]]
+        start = time.perf_counter()
+        before = sum(len(v) for v in timings.values())
+        run_headless(state, context, timings)
+        headless += time.perf_counter() - start
+        steps += sum(len(v) for v in timings.values()) - before
+    nodes = {}
+    for node, samples in sorted(timings.items()):
+        total = sum(samples)
+        inside_agents = agent_seconds.get(node, 0.0)
+        nodes[node] = {
+            **_stats(samples),
+            "agent_share": inside_agents / total if total else 0.0,
+            "overhead_mean_us": (total - inside_agents) / len(samples) * 1e6,
+        }
+    app = build_workflow().compile()
+    compiled = 0.0
+    for i in range(games):
+        state, context = _setup(seed + i, "scripted", None)
+        start = time.perf_counter()
+        app.invoke(state, config={"recursion_limit": 1000}, context=context)
+        compiled += time.perf_counter() - start
+    return {
+        "steps_per_game": steps / games if games else 0.0,
+        "per_node": nodes,
+        "headless_step_us": headless / steps * 1e6 if steps else 0.0,
+        "compiled_step_us": compiled / steps * 1e6 if steps else 0.0,
+        "compiled_overhead_per_step_us": (compiled - headless) / steps * 1e6 if steps else 0.0,
+    }
+
+TOOLS = {
+    "nominate": lambda aid, role, state, llm, ctx: tools.nominate_tool(aid, role, state, llm_client=llm, prompt_context=ctx),
+    "vote": lambda aid, role, state, llm, ctx: tools.vote_tool(aid, role, state, llm_client=llm, prompt_context=ctx),
+    "president_legislate": lambda aid, role, state, llm, ctx: tools.president_legislate_tool(aid, state, llm_client=llm, prompt_context=ctx),
+    "chancellor_legislate": lambda aid, role, state, llm, ctx: tools.chancellor_legislate_tool(aid, state, llm_client=llm, prompt_context=ctx),
+    "investigate_player": lambda aid, role, state, llm, ctx: tools.investigate_tool(aid, state, llm_client=llm, prompt_context=ctx),
+}
+
+def bench_prompts(games: int, seed: int) -> dict:
+    """Time in each tools.py decision function outside the (zero-latency) model call, on states from real games."""
+    states: List[tuple] = []
+    for i in range(games):
+        state, context = _setup(seed + i, "scripted", None)
+        context["agents"] = [_TimedAgent(a, {}, states) for a in context["agents"]]
+        run_headless(state, context)
+    # The per-game prompt context is built at setup, as initialize_agents does; it depends only on the roles.
+    contexts: Dict[tuple, tools.PromptContext] = {}
+    for _, _, _, state in states:
+        roles = tuple(p["role"] for p in state["players"])
+        if roles not in contexts:
+            contexts[roles] = tools.PromptContext(state["players"])
+    out = {}
+    for kind, tool in TOOLS.items():
+        samples = []
+        for k, aid, role, state in states:
+            if k != kind:
+                continue
+            llm = FakeLLM(seed=seed)
+            ctx = contexts[tuple(p["role"] for p in state["players"])]
+            start = time.perf_counter()
+            tool(aid, role, state, llm, ctx)
+            samples.append(time.perf_counter() - start - llm.invoke_seconds)
+        if samples:
+            out[kind] = _stats(samples)
+    all_samples = [s["mean_us"] * s["n"] for s in out.values()]
+    decisions = sum(s["n"] for s in out.values())
+    out["all"] = {"n": decisions, "mean_us": sum(all_samples) / decisions if decisions else 0.0}
+    return out
+
+def bench_memory(games: int, seed: int) -> dict:
+    """tracemalloc peak per game (fake LLM agents) and memory still held after `games` games."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        baseline = tracemalloc.get_traced_memory()[0]
+        peaks, retained, messages = [], [], []
+        for i in range(games):
+            tracemalloc.reset_peak()
+            start = tracemalloc.get_traced_memory()[0]
+            state, context = _setup(seed + i, "llm", FakeLLM(seed=seed + i))
+            final = run_headless(state, context)
+            peaks.append(tracemalloc.get_traced_memory()[1] - start)
+            messages.append(len(final["messages"]))
+            del state, context, final
+            gc.collect()
+            retained.append(tracemalloc.get_traced_memory()[0] - baseline)
+    finally:
+        tracemalloc.stop()
+    half = max(1, games // 2)
+    return {
+        "games": games,
+        "peak_kib_per_game": statistics.fmean(peaks) / 1024 if peaks else 0.0,
+        "peak_kib_max": max(peaks) / 1024 if peaks else 0.0,
+        "messages_per_game": statistics.fmean(messages) if messages else 0.0,
+        "retained_kib_after_all": retained[-1] / 1024 if retained else 0.0,
+        # Growth over the second half of the run; ~0 unless something accumulates across games.
+        "retained_growth_kib_per_game": (retained[-1] - retained[half - 1]) / 1024 / max(1, games - half) if retained else 0.0,
+    }
+
+def bench_batching(games: int, seed: int, latency: float, window_ms: float, max_batch: int) -> dict:
+    """All `games` games at once on one fake LLM, each decision a request or batched across games."""
+    out = {}
+    for mode in ("direct", "batched"):
+        fake = FakeLLM(latency=latency, seed=seed)
+        llm = BatchingLLM(fake, window=window_ms / 1000, max_batch=max_batch) if mode == "batched" else fake
+
+        def play(i: int) -> None:
+            state, context = _setup(seed + i, "llm", llm)
+            run_headless(state, context)
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=games) as pool:
+            list(pool.map(lambda i: contextvars.copy_context().run(play, i), range(games)))
+        seconds = time.perf_counter() - start
+        answers = sum(fake.calls.values())
+        sizes = fake.batch_sizes
+        out[mode] = {
+            "games": games,
+            "seconds": seconds,
+            "decisions": answers,
+            # A batch() call is one round trip; everything else went out on its own.
+            "round_trips": len(sizes) + answers - sum(sizes),
+            "mean_batch_size": statistics.fmean(sizes) if sizes else 1.0,
+            "max_batch_size": max(sizes, default=1),
+        }
+    out["config"] = {"window_ms": window_ms, "max_batch": max_batch, "latency": latency}
+    return out
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except Exception:
+        return None
+
+def run(games: int = 20, seed: int = 0, latency: float = 0.0, repeat: int = 3, only: Optional[List[str]] = None, batch_window_ms: float = 10.0, batch_max: int = 16) -> dict:
+    sections = only or list(SECTIONS)
+    results = {}
+    with muted():
+        if "games" in sections:
+            results["games"] = bench_games(games, seed, latency, repeat)
+        if "nodes" in sections:
+            results["nodes"] = bench_nodes(games, seed)
+        if "prompts" in sections:
+            results["prompts"] = bench_prompts(games, seed)
+        if "memory" in sections:
+            results["memory"] = bench_memory(games, seed)
+        if "batching" in sections:
+            results["batching"] = bench_batching(games, seed, latency, batch_window_ms, batch_max)
+    return {
+        "schema": SCHEMA_VERSION,
+        "created": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+        "env": {"commit": _git_commit(), "python": platform.python_version(), "platform": platform.platform()},
+        "config": {"games": games, "seed": seed, "latency": latency, "repeat": repeat, "sections": sections},
+        "results": results,
+    }
+
+def _flatten(tree: Any, prefix: str = "") -> Dict[str, float]:
+    if isinstance(tree, dict):
+        out = {}
+        for key, value in tree.items():
+            out.update(_flatten(value, f"{prefix}.{key}" if prefix else key))
+        return out
+    if isinstance(tree, (int, float)) and not isinstance(tree, bool):
+        return {prefix: float(tree)}
+    return {}
+
+def compare(base: dict, new: dict) -> Dict[str, dict]:
+    """Metric-by-metric ratio new/base for every numeric result present in both runs."""
+    a, b = _flatten(base["results"]), _flatten(new["results"])
+    return {key: {"base": a[key], "new": b[key], "ratio": b[key] / a[key] if a[key] else None} for key in sorted(a.keys() & b.keys())}
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the game engine and agent pipeline against a fake LLM.")
+    parser.add_argument("--games", type=int, default=20, help="games per measurement")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--latency", type=float, default=0.0, help="fake LLM latency per call, seconds")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per throughput measurement (best is kept)")
+    parser.add_argument("--only", nargs="+", choices=SECTIONS, default=None)
+    parser.add_argument("--batch-window-ms", type=float, default=10.0, help="batching section: broker window")
+    parser.add_argument("--batch-max", type=int, default=16, help="batching section: largest batch")
+    parser.add_argument("--out", default=None, help="write the JSON report here")
+    parser.add_argument("--compare", nargs=2, metavar=("BASE", "NEW"), default=None, help="compare two reports instead of running")
+    args = parser.parse_args()
+    if args.compare:
+        reports = []
+        for path in args.compare:
+            with open(path, encoding="utf-8") as fh:
+                reports.append(json.load(fh))
+        logger(json.dumps(compare(*reports), indent=2, sort_keys=True))
+        return
+    report = run(args.games, args.seed, args.latency, args.repeat, args.only, args.batch_window_ms, args.batch_max)
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if args.out:
+        os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+        with open(args.out, "w", encoding="utf-8") as fh:
+            fh.write(text + "\n")
+    logger(text)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""Durable checkpoints for in-progress games, so a crash does not throw away paid LLM calls.
+
+Games run with a SQLite checkpointer keyed by game id (the LangGraph thread id), so
+every completed node is persisted. A `games` table in the same database keeps what is
+needed to rebuild the runtime context — seed, agent backend and model — plus the
+result once the game is finished. The game RNG's state travels inside GameState
+(`rng_state`, written after every node when the context sets `persist_rng`), so a
+resumed game draws the same tiles it would have drawn.
+"""
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional
+
+import aiosqlite
+
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+from langgraph.checkpoint.sqlite import SqliteSaver
+from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+
+from game_types import MessageLog
+
+DEFAULT_PATH = os.path.join("checkpoints", "games.sqlite")
+
+def _plain(value: Any) -> Any:
+    if isinstance(value, MessageLog):
+        return list(value)
+    if isinstance(value, dict):
+        return {k: _plain(v) for k, v in value.items()}
+    return value
+
+class GameStateSerializer(JsonPlusSerializer):
+    """Stores MessageLog values (channels, pending writes, the start input) as plain lists and restores the channel on load."""
+
+    def dumps_typed(self, obj: Any):
+        return super().dumps_typed(_plain(obj))
+
+    def loads_typed(self, data):
+        obj = super().loads_typed(data)
+        values = obj.get("channel_values") if isinstance(obj, dict) else None
+        if isinstance(values, dict) and isinstance(values.get("messages"), list):
+            values["messages"] = MessageLog(values["messages"])
+        return obj
+
+def checkpoint_config(game_id: str) -> dict:
+    return {"configurable": {"thread_id": game_id}, "recursion_limit": 1000}
+
+def restore_rng(rng: random.Random, state: dict) -> bool:
+    """Put `rng` back into the state saved with the checkpoint. Returns False if there was none."""
+    saved = state.get("rng_state")
+    if not saved:
+        return False
+    version, internal, gauss = saved
+    rng.setstate((version, tuple(internal), gauss))
+    return True
+
+@asynccontextmanager
+async def async_saver(path: str = DEFAULT_PATH) -> AsyncIterator[AsyncSqliteSaver]:
+    """Checkpointer for games driven with astream (tournament.py), on its own connection."""
+    async with aiosqlite.connect(path, timeout=30) as conn:
+        saver = AsyncSqliteSaver(conn, serde=GameStateSerializer())
+        await saver.setup()
+        yield saver
+
+class GameStore:
+    """The checkpoint database: LangGraph's checkpoint tables plus a `games` table of per-game metadata."""
+
+    def __init__(self, path: str = DEFAULT_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS games ("
+            "game_id TEXT PRIMARY KEY, seed INTEGER, backend TEXT, model TEXT, created REAL, result TEXT)"
+        )
+        self.conn.commit()
+        self._lock = threading.Lock()
+
+    def saver(self) -> SqliteSaver:
+        """Synchronous checkpointer sharing this store's connection."""
+        saver = SqliteSaver(self.conn, serde=GameStateSerializer())
+        saver.setup()
+        return saver
+
+    def register(self, game_id: str, seed: int, backend: str, model: Optional[str]) -> None:
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR IGNORE INTO games (game_id, seed, backend, model, created) VALUES (?, ?, ?, ?, ?)",
+                (game_id, seed, backend, model, time.time()),
+            )
+            self.conn.commit()
+
+    def meta(self, game_id: str) -> Optional[dict]:
+        with self._lock:
+            row = self.conn.execute("SELECT seed, backend, model, result FROM games WHERE game_id = ?", (game_id,)).fetchone()
+        if row is None:
+            return None
+        seed, backend, model, result = row
+        return {"game_id": game_id, "seed": seed, "backend": backend, "model": model, "result": json.loads(result) if result else None}
+
+    def finish(self, game_id: str, result: dict) -> None:
+        with self._lock:
+            self.conn.execute("UPDATE games SET result = ? WHERE game_id = ?", (json.dumps(result), game_id))
+            self.conn.commit()
+
+    def results(self) -> Dict[str, dict]:
+        """Results of every finished game, by game id."""
+        with self._lock:
+            rows = self.conn.execute("SELECT game_id, result FROM games WHERE result IS NOT NULL").fetchall()
+        return {game_id: json.loads(result) for game_id, result in rows}
+
+    def close(self) -> None:
+        self.conn.close()
@@ -0,0 +1,263 @@
+"""Compact, array-backed game state for high-volume headless runs.
+
+CompactState packs players into bitfields (alive / investigated / fascist team) plus a
+role byte per seat, and stores the deck and discard pile as int8 arrays with a read
+cursor and running Liberal/Fascist counts (which become the deck_*/discard_* counters). `from_state` / `to_state` convert to and
+from the GameState TypedDict without loss, so the LangGraph path is unaffected.
+
+`play_compact` plays a whole game on this representation. It follows the rules and
+RNG call order of the nodes in game.py, so a seeded game ends exactly as it does
+through graph.run_headless, but it does not log or record messages.
+"""
+import random
+from array import array
+from typing import Any, Dict, Iterable, List, Optional
+
+from game_types import GameState, PLAYER_COUNT
+
+TILES = ("liberal", "fascist")
+TILE_CODES = {name: code for code, name in enumerate(TILES)}
+ROLES = ("liberal", "fascist", "hitler")
+ROLE_CODES = {name: code for code, name in enumerate(ROLES)}
+PLAYER_KEYS = ("id", "role", "team", "alive", "investigated")
+
+class TilePile:
+    """Policy tiles as an int8 array read from `cursor` onwards, with running counts."""
+
+    __slots__ = ("tiles", "cursor", "liberal", "fascist")
+
+    def __init__(self, names: Iterable[str] = ()):
+        self.tiles = array("b", (TILE_CODES[n] for n in names))
+        self.cursor = 0
+        self.fascist = sum(self.tiles)
+        self.liberal = len(self.tiles) - self.fascist
+
+    def __len__(self) -> int:
+        return len(self.tiles) - self.cursor
+
+    def names(self) -> List[str]:
+        return [TILES[t] for t in self.tiles[self.cursor:]]
+
+    def draw(self, n: int) -> array:
+        drawn = self.tiles[self.cursor:self.cursor + n]
+        self.cursor += len(drawn)
+        fascist = sum(drawn)
+        self.fascist -= fascist
+        self.liberal -= len(drawn) - fascist
+        return drawn
+
+    def add(self, tile: int) -> None:
+        self.tiles.append(tile)
+        if tile:
+            self.fascist += 1
+        else:
+            self.liberal += 1
+
+    def take_all(self) -> array:
+        tiles = self.tiles[self.cursor:]
+        self.tiles = array("b")
+        self.cursor = 0
+        self.liberal = self.fascist = 0
+        return tiles
+
+    def refill(self, tiles: array, rng: Any) -> None:
+        """Replace the remaining tiles with `tiles` shuffled (the reshuffle in game.py)."""
+        rng.shuffle(tiles)
+        self.tiles = tiles
+        self.cursor = 0
+        self.fascist = sum(tiles)
+        self.liberal = len(tiles) - self.fascist
+
+class CompactState:
+    __slots__ = (
+        "roles", "alive", "investigated", "fascist_team", "player_extras",
+        "deck", "discard", "liberal_policies", "fascist_policies",
+        "current_president_idx", "nominated_chancellor_idx", "previous_president_idx", "previous_chancellor_idx",
+        "election_tracker", "phase", "drawn", "passed", "winner", "game_over_reason", "rest", "absent", "_players_view",
+    )
+
+    @classmethod
+    def from_state(cls, state: GameState) -> "CompactState":
+        cs = cls()
+        players = state.get("players", [])
+        cs.roles = bytes(ROLE_CODES[p["role"]] for p in players)
+        cs.alive = cs.investigated = cs.fascist_team = 0
+        cs.player_extras = {}
+        for seat, p in enumerate(players):
+            bit = 1 << seat
+            cs.alive |= bit if p.get("alive") else 0
+            cs.investigated |= bit if p.get("investigated") else 0
+            cs.fascist_team |= bit if p.get("team") == "fascist" else 0
+            extras = {k: v for k, v in p.items() if k not in PLAYER_KEYS}
+            if extras or p.get("id") != seat:
+                cs.player_extras[seat] = {"id": p.get("id"), **extras}
+        cs.deck = TilePile(state.get("policy_deck", []))
+        cs.discard = TilePile(state.get("discard_pile", []))
+        cs.drawn = TilePile(state.get("drawn_policies", []))
+        cs.passed = TilePile(state.get("passed_policies", []))
+        cs.liberal_policies = state.get("liberal_policies", 0)
+        cs.fascist_policies = state.get("fascist_policies", 0)
+        cs.current_president_idx = state.get("current_president_idx", 0)
+        cs.nominated_chancellor_idx = state.get("nominated_chancellor_idx")
+        cs.previous_president_idx = state.get("previous_president_idx")
+        cs.previous_chancellor_idx = state.get("previous_chancellor_idx")
+        cs.election_tracker = state.get("election_tracker", 0)
+        cs.phase = state.get("phase", "nominate")
+        cs.winner = state.get("winner")
+        cs.game_over_reason = state.get("game_over_reason")
+        packed = {
+            "players", "policy_deck", "discard_pile", "drawn_policies", "passed_policies",
+            "deck_liberal", "deck_fascist", "discard_liberal", "discard_fascist",
+            "liberal_policies", "fascist_policies", "current_president_idx", "nominated_chancellor_idx",
+            "previous_president_idx", "previous_chancellor_idx", "election_tracker", "phase", "winner", "game_over_reason",
+        }
+        # Everything else (messages, votes, ...) is carried through untouched; note which packed keys were absent.
+        cs.rest = {k: v for k, v in state.items() if k not in packed}
+        cs.absent = frozenset(k for k in packed if k not in state)
+        cs._players_view = None
+        return cs
+
+    def player(self, seat: int) -> dict:
+        bit = 1 << seat
+        role = ROLES[self.roles[seat]]
+        extras = dict(self.player_extras.get(seat, {}))
+        p = {
+            "id": extras.pop("id", seat),
+            "role": role,
+            "team": "fascist" if self.fascist_team & bit else "liberal",
+            "alive": bool(self.alive & bit),
+            "investigated": bool(self.investigated & bit),
+        }
+        p.update(extras)
+        return p
+
+    def to_state(self, share_players: bool = False) -> GameState:
+        """
+        Rebuild the GameState. With share_players=True the player dicts are cached and reused
+        until a player changes (for read-only agent views on the hot path).
+        """
+        if share_players:
+            if self._players_view is None:
+                self._players_view = [self.player(seat) for seat in range(len(self.roles))]
+            players = self._players_view
+        else:
+            players = [self.player(seat) for seat in range(len(self.roles))]
+        state = {
+            "players": players,
+            "liberal_policies": self.liberal_policies,
+            "fascist_policies": self.fascist_policies,
+            "policy_deck": self.deck.names(),
+            "discard_pile": self.discard.names(),
+            "deck_liberal": self.deck.liberal,
+            "deck_fascist": self.deck.fascist,
+            "discard_liberal": self.discard.liberal,
+            "discard_fascist": self.discard.fascist,
+            "current_president_idx": self.current_president_idx,
+            "nominated_chancellor_idx": self.nominated_chancellor_idx,
+            "previous_president_idx": self.previous_president_idx,
+            "previous_chancellor_idx": self.previous_chancellor_idx,
+            "election_tracker": self.election_tracker,
+            "phase": self.phase,
+            "drawn_policies": self.drawn.names(),
+            "passed_policies": self.passed.names(),
+            "winner": self.winner,
+            "game_over_reason": self.game_over_reason,
+        }
+        for key in self.absent:
+            state.pop(key, None)
+        state.update(self.rest)
+        return GameState(**state)
+
+    # --- transitions used by play_compact -------------------------------------------------
+
+    def _refresh(self, view: GameState, **fields: Any) -> None:
+        """Update fields of a round's agent view (see play_round) after a transition changed them."""
+        for key, value in fields.items():
+            if key not in self.absent:
+                view[key] = value
+
+    def _draw_from_deck(self, n: int, rng: Any) -> array:
+        drawn = self.deck.draw(n)
+        if len(self.deck) < 3:
+            self.deck.refill(self.deck.take_all() + self.discard.take_all(), rng)
+        return drawn
+
+    def _enact(self, tile: int) -> None:
+        if tile:
+            self.fascist_policies += 1
+        else:
+            self.liberal_policies += 1
+
+    def _finish(self, winner: str, reason: str) -> None:
+        self.phase = "game_over"
+        self.winner = winner
+        self.game_over_reason = reason
+
+    def _check_win(self, agents: List[Any]) -> None:
+        if self.liberal_policies >= 5:
+            return self._finish("liberals", "5 Liberal policies enacted!")
+        if self.fascist_policies >= 6:
+            return self._finish("fascists", "6 Fascist policies enacted!")
+        if self.fascist_policies == 3 and self.previous_president_idx is not None and self.alive & ~self.investigated:
+            target = agents[self.previous_president_idx].investigate_player(self.to_state(True))
+            self.investigated |= 1 << target
+            self._players_view = None
+        self.current_president_idx = (self.current_president_idx + 1) % PLAYER_COUNT
+        self.nominated_chancellor_idx = None
+        self.phase = "nominate"
+
+    def play_round(self, agents: List[Any], rng: Any) -> None:
+        """Nomination, vote and (if elected) the legislative session, then the win check."""
+        president = self.current_president_idx
+        # One GameState view per round, refreshed in place: only the nominee, the election tracker and the piles change before the win check.
+        view = self.to_state(True)
+        chancellor = agents[president].nominate(view)
+        self.nominated_chancellor_idx = chancellor
+        self._refresh(view, nominated_chancellor_idx=chancellor)
+        ja = sum(1 for agent in agents if self.alive >> agent.agent_id & 1 and agent.vote(view))
+        voters = bin(self.alive).count("1")
+        if ja > voters / 2:
+            if self.fascist_policies >= 3 and ROLES[self.roles[chancellor]] == "hitler":
+                return self._finish("fascists", "Hitler elected as Chancellor after 3 fascist policies!")
+            self.election_tracker = 0
+            drawn = self._draw_from_deck(3, rng)
+            self.drawn = TilePile(TILES[t] for t in drawn)
+            self._refresh(view, election_tracker=0, drawn_policies=self.drawn.names(), policy_deck=self.deck.names(), deck_liberal=self.deck.liberal,
+                          deck_fascist=self.deck.fascist, discard_pile=self.discard.names(), discard_liberal=self.discard.liberal, discard_fascist=self.discard.fascist)
+            passed = agents[president].president_legislate(view)
+            rest = list(drawn)
+            for name in passed:
+                if TILE_CODES[name] in rest:
+                    rest.remove(TILE_CODES[name])
+            if rest:
+                self.discard.add(rest[0])
+            self.drawn = TilePile()
+            self.passed = TilePile(passed)
+            self._refresh(view, drawn_policies=[], passed_policies=self.passed.names(), discard_pile=self.discard.names(),
+                          discard_liberal=self.discard.liberal, discard_fascist=self.discard.fascist)
+            enacted = agents[chancellor].chancellor_legislate(view)
+            remaining = list(passed)
+            remaining.remove(enacted)
+            if remaining:
+                self.discard.add(TILE_CODES[remaining[0]])
+            self.passed = TilePile()
+            self._enact(TILE_CODES[enacted])
+            self.previous_president_idx = president
+            self.previous_chancellor_idx = chancellor
+            return self._check_win(agents)
+        self.election_tracker += 1
+        self.current_president_idx = (president + 1) % PLAYER_COUNT
+        self.nominated_chancellor_idx = None
+        if self.election_tracker >= 3:
+            self._enact(self._draw_from_deck(1, rng)[0])
+            self.election_tracker = 0
+            return self._check_win(agents)
+        self.phase = "nominate"
+
+def play_compact(state: GameState, agents: List[Any], rng: Optional[random.Random] = None) -> GameState:
+    """Play a game to the end on the compact representation and return the final GameState."""
+    rng = rng or random
+    cs = CompactState.from_state(state)
+    while cs.phase != "game_over":
+        cs.play_round(agents, rng)
+    return cs.to_state()
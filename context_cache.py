@@ -0,0 +1,134 @@
+"""Provider-side context caching of each agent's system message.
+
+Prompts are a per-agent system message that never changes during a game plus a short
+per-turn user message (see tools.PromptContext). ContextCachedLLM wraps a Gemini chat
+model: the first time it sees a system message it stores it as cached content on the
+provider (one handle per agent, created once and shared by every later decision that
+starts with the same text) and from then on sends only the user message plus the
+handle, so the system part is billed at the cached rate and not re-processed.
+
+If the model or the prompt does not qualify (e.g. below the provider's minimum cached
+size) creation fails once, caching is switched off for the process and requests go out
+with the system message inline, as before.
+
+Configured from GEMINI_CONTEXT_CACHE (on/off, default on) and GEMINI_CONTEXT_CACHE_TTL
+(seconds, default 3600).
+"""
+import hashlib
+import os
+import threading
+from typing import Any, Dict, List, Optional
+
+from langchain_core.messages import SystemMessage
+from langchain_google_genai import create_context_cache
+
+from log import WARNING, log as logger
+
+class ContextCachedLLM:
+    """Wraps a ChatGoogleGenerativeAI client and serves system messages from context caches."""
+
+    def __init__(self, llm: Any, ttl: int = 3600):
+        self.llm = llm
+        self.ttl = ttl
+        self.enabled = True
+        self._handles: Dict[str, str] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self.created = 0
+        self.hits = 0
+
+    def with_structured_output(self, schema, **kwargs):
+        return _ContextCachedRunnable(self, self.llm.with_structured_output(schema, **kwargs))
+
+    def handle(self, system: SystemMessage) -> Optional[str]:
+        """Cache name for this system message, creating the cached content on first use; None if unavailable."""
+        if not self.enabled:
+            return None
+        key = hashlib.sha256(system.content.encode()).hexdigest()
+        with self._lock:
+            name = self._handles.get(key)
+            if name is not None:
+                self.hits += 1
+                return name
+            key_lock = self._locks.setdefault(key, threading.Lock())
+        # One creation per system message even when an agent's ballots race for it.
+        with key_lock:
+            with self._lock:
+                name = self._handles.get(key)
+            if name is None and self.enabled:
+                name = self._create(system)
+                if name is not None:
+                    with self._lock:
+                        self._handles[key] = name
+                        self.created += 1
+        return name
+
+    def _create(self, system: SystemMessage) -> Optional[str]:
+        try:
+            return create_context_cache(self.llm, [system], ttl=f"{self.ttl}s")
+        except Exception as e:
+            self.enabled = False
+            logger(f"[CONTEXT CACHE] Unavailable ({e.__class__.__name__}: {e}); sending system prompts inline", level=WARNING)
+            return None
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"enabled": self.enabled, "handles": len(self._handles), "created": self.created, "hits": self.hits}
+
+    def release(self) -> None:
+        """Delete every cached content this client created (they would otherwise live until their TTL)."""
+        with self._lock:
+            names = list(self._handles.values())
+            self._handles.clear()
+        for name in names:
+            try:
+                self.llm.client.caches.delete(name=name)
+            except Exception as e:
+                logger(f"[CONTEXT CACHE] Could not delete {name}: {e}", level=WARNING)
+
+    def __getattr__(self, name):
+        return getattr(self.llm, name)
+
+class _ContextCachedRunnable:
+    def __init__(self, owner: ContextCachedLLM, runnable: Any):
+        self.owner = owner
+        self.runnable = runnable
+
+    def invoke(self, prompt: Any, *args, **kwargs):
+        if isinstance(prompt, list) and prompt and isinstance(prompt[0], SystemMessage):
+            name = self.owner.handle(prompt[0])
+            if name is not None:
+                # The cached content carries the system instruction; the request must not repeat it.
+                return self.runnable.invoke(prompt[1:], *args, cached_content=name, **kwargs)
+        return self.runnable.invoke(prompt, *args, **kwargs)
+
+    def batch(self, prompts: List[Any], config: Any = None, **kwargs) -> List[Any]:
+        """Batch calls, one per cache handle (requests for different system messages cannot share one)."""
+        configs = config if isinstance(config, list) else [config] * len(prompts)
+        groups: Dict[Optional[str], List[int]] = {}
+        for i, prompt in enumerate(prompts):
+            name = None
+            if isinstance(prompt, list) and prompt and isinstance(prompt[0], SystemMessage):
+                name = self.owner.handle(prompt[0])
+            groups.setdefault(name, []).append(i)
+        results: List[Any] = [None] * len(prompts)
+        for name, indices in groups.items():
+            extra = dict(kwargs, cached_content=name) if name is not None else kwargs
+            batch = [prompts[i][1:] if name is not None else prompts[i] for i in indices]
+            for i, result in zip(indices, self.runnable.batch(batch, config=[configs[i] or {} for i in indices], **extra)):
+                results[i] = result
+        return results
+
+def context_cache_from_env(llm: Any) -> Any:
+    """Wrap `llm` in a ContextCachedLLM unless GEMINI_CONTEXT_CACHE=off."""
+    if os.environ.get("GEMINI_CONTEXT_CACHE", "on").lower() in ("off", "0", "false", "no"):
+        return llm
+    return ContextCachedLLM(llm, ttl=int(os.environ.get("GEMINI_CONTEXT_CACHE_TTL", "3600")))
+
+def find(llm: Any) -> Optional[ContextCachedLLM]:
+    """The ContextCachedLLM inside a stack of client wrappers (each keeps the next in `.llm`), if any."""
+    while llm is not None:
+        if isinstance(llm, ContextCachedLLM):
+            return llm
+        llm = llm.__dict__.get("llm") if hasattr(llm, "__dict__") else None
+    return None
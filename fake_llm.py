@@ -0,0 +1,101 @@
+"""Stand-in for the chat model: answers structured calls with seeded random moves after a configurable delay.
+
+Implements the part of the LLM client interface the agents use
+(`with_structured_output(schema).invoke(prompt, config)`), so the real prompt-building,
+validation and logging paths run without a network. Token usage (about four
+characters per token) is reported to any callbacks in `config`, like a chat model
+would. `batch()` answers several prompts in one round trip and records the batch
+size. Used by benchmark.py.
+"""
+import random
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, LLMResult
+
+from parsers import NominationOut, VoteOut, PresidentLegislateOut, ChancellorLegislateOut, InvestigateOut
+from game_types import PLAYER_COUNT
+
+class FakeLLM:
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, seed: Optional[int] = 0, thoughts: str = "fake thoughts"):
+        """
+        latency: seconds each call sleeps; jitter: +/- uniform spread around it.
+        Answers are drawn from one seeded RNG, so serial games are reproducible.
+        """
+        self.latency = latency
+        self.jitter = jitter
+        self.thoughts = thoughts
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls: Dict[str, int] = {}
+        # Sizes of the batch() calls received, in order (see batching.BatchingLLM).
+        self.batch_sizes: List[int] = []
+        self.invoke_seconds = 0.0
+
+    def with_structured_output(self, schema, **kwargs):
+        return _FakeRunnable(self, schema)
+
+    def _delay(self) -> float:
+        if self.jitter:
+            with self._lock:
+                return max(0.0, self.latency + self._rng.uniform(-self.jitter, self.jitter))
+        return self.latency
+
+    def answer(self, schema: type) -> Any:
+        with self._lock:
+            rng = self._rng
+            self.calls[schema.__name__] = self.calls.get(schema.__name__, 0) + 1
+            if schema is NominationOut:
+                return NominationOut(nominate_player=rng.randrange(PLAYER_COUNT), public_statement="I trust them.", private_thoughts=self.thoughts)
+            if schema is VoteOut:
+                return VoteOut(vote=rng.random() < 0.6, public_statement="", private_thoughts=self.thoughts)
+            if schema is PresidentLegislateOut:
+                return PresidentLegislateOut(discard_policy=rng.choice(["liberal", "fascist"]), public_statement="", private_thoughts=self.thoughts)
+            if schema is ChancellorLegislateOut:
+                return ChancellorLegislateOut(policy_to_enact=rng.choice(["liberal", "fascist"]), public_statement="", private_thoughts=self.thoughts)
+            if schema is InvestigateOut:
+                return InvestigateOut(player_to_investigate=rng.randrange(PLAYER_COUNT), public_statement="", private_thoughts=self.thoughts)
+        raise ValueError(f"FakeLLM has no answer for schema {schema.__name__}")
+
+class _FakeRunnable:
+    def __init__(self, llm: FakeLLM, schema: type):
+        self.llm = llm
+        self.schema = schema
+
+    def invoke(self, prompt: Any, *args, **kwargs):
+        start = time.perf_counter()
+        delay = self.llm._delay()
+        if delay:
+            time.sleep(delay)
+        result = self._respond(prompt, kwargs.get("config") or (args[0] if args else None) or {})
+        with self.llm._lock:
+            self.llm.invoke_seconds += time.perf_counter() - start
+        return result
+
+    def batch(self, prompts: List[Any], config: Any = None, return_exceptions: bool = False, **kwargs) -> List[Any]:
+        """Answer several prompts in one round trip (one delay), recording the batch size."""
+        start = time.perf_counter()
+        delay = self.llm._delay()
+        if delay:
+            time.sleep(delay)
+        configs = config if isinstance(config, list) else [config or {}] * len(prompts)
+        results = [self._respond(prompt, cfg or {}) for prompt, cfg in zip(prompts, configs)]
+        with self.llm._lock:
+            self.llm.batch_sizes.append(len(prompts))
+            self.llm.invoke_seconds += time.perf_counter() - start
+        return results
+
+    def _respond(self, prompt: Any, config: dict) -> Any:
+        result = self.llm.answer(self.schema)
+        callbacks = config.get("callbacks") or []
+        if callbacks:
+            text = "".join(m.content for m in prompt) if isinstance(prompt, list) else str(prompt)
+            input_tokens, output_tokens = len(text) // 4, len(result.model_dump_json()) // 4
+            usage = {"input_tokens": input_tokens, "output_tokens": output_tokens, "total_tokens": input_tokens + output_tokens}
+            response = LLMResult(generations=[[ChatGeneration(message=AIMessage(content="", usage_metadata=usage))]])
+            for callback in callbacks:
+                callback.on_llm_end(response, run_id=uuid.uuid4())
+        return result
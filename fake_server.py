@@ -0,0 +1,170 @@
+"""Local stand-in for an LLM server, for offline runs and load tests.
+
+Speaks the OpenAI chat-completions protocol (POST /v1/chat/completions) and answers
+structured requests with schema-valid, seeded random moves for the schema named in
+`response_format` (NominationOut, VoteOut, ...), like fake_llm.FakeLLM. Responses
+carry token usage (about four characters per token). Faults are injected on purpose:
+
+- latency drawn per request: "fixed:S", "uniform:LO:HI", "lognormal:MU:SIGMA" or "exp:MEAN" (seconds)
+- HTTP 429 with probability `rate_429`, and for every request over `rpm` per minute
+- HTTP 500 with probability `failure_rate`
+
+GET /stats returns request, 429 and failure counts. Used by the "local" provider
+(providers.py), which starts one in-process; run standalone for other clients:
+
+    python fake_server.py --port 8099 --latency lognormal:-0.7:0.5 --rate-429 0.05 --failure-rate 0.01
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Optional, Tuple
+
+from fake_llm import FakeLLM
+from parsers import NominationOut, VoteOut, PresidentLegislateOut, ChancellorLegislateOut, InvestigateOut
+
+SCHEMAS = {s.__name__: s for s in (NominationOut, VoteOut, PresidentLegislateOut, ChancellorLegislateOut, InvestigateOut)}
+
+def parse_latency(spec: str) -> Callable[[random.Random], float]:
+    """Sampler for a latency spec ("fixed:0.2", "uniform:0.1:0.5", "lognormal:-0.7:0.5", "exp:0.4"), in seconds."""
+    kind, *args = spec.split(":")
+    values = [float(a) for a in args]
+    if kind == "fixed":
+        return lambda rng: values[0]
+    if kind == "uniform":
+        return lambda rng: rng.uniform(values[0], values[1])
+    if kind == "lognormal":
+        return lambda rng: rng.lognormvariate(values[0], values[1])
+    if kind == "exp":
+        return lambda rng: rng.expovariate(1 / values[0]) if values[0] > 0 else 0.0
+    raise ValueError(f"Unknown latency distribution: {spec!r}")
+
+class FaultyModel:
+    """Answers, delays and injected faults for the stand-in server."""
+
+    def __init__(self, latency: str = "fixed:0", rate_429: float = 0.0, failure_rate: float = 0.0, rpm: float = 0.0, seed: Optional[int] = 0):
+        self.sample_latency = parse_latency(latency)
+        self.rate_429 = rate_429
+        self.failure_rate = failure_rate
+        self.rpm = rpm
+        self.answers = FakeLLM(seed=seed)
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._window: list = []
+        self.counts: Counter = Counter()
+
+    def _fault(self) -> Optional[Tuple[int, str]]:
+        with self._lock:
+            now = time.monotonic()
+            self._window = [t for t in self._window if now - t < 60]
+            if self.rpm and len(self._window) >= self.rpm:
+                return 429, "Rate limit exceeded: quota of %d requests per minute" % self.rpm
+            self._window.append(now)
+            roll = self._rng.random()
+        if roll < self.rate_429:
+            return 429, "Rate limit exceeded (injected)"
+        if roll < self.rate_429 + self.failure_rate:
+            return 500, "Internal error (injected)"
+        return None
+
+    def _count(self, status: int) -> int:
+        """Count a response (requests are handled on several threads); returns the new count for its status."""
+        with self._lock:
+            self.counts[str(status)] += 1
+            return self.counts[str(status)]
+
+    def complete(self, body: dict) -> Tuple[int, dict]:
+        with self._lock:
+            delay = max(0.0, self.sample_latency(self._rng))
+        time.sleep(delay)
+        fault = self._fault()
+        if fault is not None:
+            status, message = fault
+            self._count(status)
+            return status, {"error": {"message": message, "code": status}}
+        fmt = (body.get("response_format") or {}).get("json_schema") or {}
+        schema = SCHEMAS.get(fmt.get("name"))
+        if schema is None:
+            self._count(400)
+            return 400, {"error": {"message": f"Unknown response schema {fmt.get('name')!r}", "code": 400}}
+        content = self.answers.answer(schema).model_dump_json()
+        prompt_chars = sum(len(m.get("content") or "") for m in body.get("messages", []))
+        served = self._count(200)
+        return 200, {
+            "id": f"chatcmpl-{served}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "stand-in"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": prompt_chars // 4, "completion_tokens": len(content) // 4, "total_tokens": prompt_chars // 4 + len(content) // 4},
+        }
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"requests": sum(self.counts.values()), **{f"status_{k}": v for k, v in sorted(self.counts.items())}}
+
+def _handler(model: FaultyModel):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _reply(self, status: int, payload: dict) -> None:
+            data = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            if not self.path.rstrip("/").endswith("/chat/completions"):
+                self._reply(404, {"error": {"message": f"No route {self.path}", "code": 404}})
+                return
+            try:
+                body = json.loads(self.rfile.read(length) or b"{}")
+            except ValueError:
+                self._reply(400, {"error": {"message": "Invalid JSON body", "code": 400}})
+                return
+            self._reply(*model.complete(body))
+
+        def do_GET(self):
+            if self.path.rstrip("/").endswith("/stats"):
+                self._reply(200, model.stats())
+            else:
+                self._reply(404, {"error": {"message": f"No route {self.path}", "code": 404}})
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+def serve(host: str = "127.0.0.1", port: int = 0, **options) -> ThreadingHTTPServer:
+    """Start a stand-in server on a daemon thread (port 0: any free port); options go to FaultyModel."""
+    server = ThreadingHTTPServer((host, port), _handler(FaultyModel(**options)))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="fake-llm-server", daemon=True).start()
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve schema-valid fake answers over the OpenAI chat-completions protocol.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--latency", default="fixed:0", help="fixed:S | uniform:LO:HI | lognormal:MU:SIGMA | exp:MEAN (seconds)")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="probability of an injected 429")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="probability of an injected 500")
+    parser.add_argument("--rpm", type=float, default=0.0, help="answer 429 above this many requests per minute (0: no quota)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    server = serve(args.host, args.port, latency=args.latency, rate_429=args.rate_429, failure_rate=args.failure_rate, rpm=args.rpm, seed=args.seed)
+    print(f"Serving on http://{args.host}:{server.server_address[1]}/v1 — Ctrl-C to stop")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,24 @@
-from typing import List
+from typing import List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+import contextvars
 import random
-from game_types import GameState, PLAYER_COUNT
-from log import log as logger
+from game_types import GameState, MessageLog, PLAYER_COUNT, TOTAL_POLICY_TILES, pile_counts
+from log import log as logger, capture as capture_log, replay as replay_log
 
-def create_initial_state() -> GameState:
+# Upper bound on ballots requested from agents at the same time.
+MAX_CONCURRENT_VOTES = PLAYER_COUNT
+
+def create_initial_state(rng: Optional[random.Random] = None) -> GameState:
+    rng = rng or random
     roles = ["liberal", "liberal", "liberal", "fascist", "hitler"]
-    random.shuffle(roles)
+    rng.shuffle(roles)
     players = []
     for i, r in enumerate(roles):
         team = "liberal" if r == "liberal" else "fascist"
         players.append({"id": i, "role": r, "team": team, "alive": True, "investigated": False})
     deck = ["liberal"] * 6 + ["fascist"] * 11
-    random.shuffle(deck)
-    start = random.randint(0, PLAYER_COUNT - 1)
+    rng.shuffle(deck)
+    start = rng.randint(0, PLAYER_COUNT - 1)
     logger("=" * 60)
     logger("SECRET HITLER - 5 PLAYER GAME")
     logger("=" * 60)
@@ -20,13 +26,18 @@ def create_initial_state() -> GameState:
     for p in players:
         logger(f"  Player {p['id']}: {p['role'].upper()} ({p['team']})")
     logger(f"\n[SETUP] Starting President: Player {start}")
-    logger(f"[SETUP] Policy deck created: {deck.count('liberal')} Liberal, {deck.count('fascist')} Fascist\n")
+    deck_lib = deck.count("liberal")
+    logger(f"[SETUP] Policy deck created: {deck_lib} Liberal, {len(deck) - deck_lib} Fascist\n")
     return GameState(
         players=players,
         liberal_policies=0,
         fascist_policies=0,
         policy_deck=deck,
         discard_pile=[],
+        deck_liberal=deck_lib,
+        deck_fascist=len(deck) - deck_lib,
+        discard_liberal=0,
+        discard_fascist=0,
         current_president_idx=start,
         nominated_chancellor_idx=None,
         previous_president_idx=None,
@@ -36,20 +47,33 @@ def create_initial_state() -> GameState:
         votes={},
         drawn_policies=[],
         passed_policies=[],
-        messages=[f"Game started. Player {start} is the first President."],
+        messages=MessageLog([f"Game started. Player {start} is the first President."]),
         winner=None,
         game_over_reason=None,
     )
 
+def _rng(runtime) -> random.Random:
+    """Per-game RNG from the runtime context, falling back to the global random module."""
+    context = getattr(runtime, "context", None) or {}
+    return context.get("rng") or random
+
 def _print_round_summary(state: GameState, note: str = "") -> None:
     """Print a concise spectator-facing summary of the board and deck."""
     lib = state.get("liberal_policies", 0)
     fas = state.get("fascist_policies", 0)
-    deck = state.get("policy_deck", [])
-    discard = state.get("discard_pile", [])
-    deck_lib = deck.count("liberal")
-    deck_fas = deck.count("fascist")
-    logger(f"[ROUND SUMMARY]{(' ' + note) if note else ''} Board: {lib} Liberal, {fas} Fascist — Deck: {deck_lib}L/{deck_fas}F  Discard: {len(discard)}")
+    deck_lib, deck_fas = pile_counts(state, "deck")
+    discard = sum(pile_counts(state, "discard"))
+    logger(f"[ROUND SUMMARY]{(' ' + note) if note else ''} Board: {lib} Liberal, {fas} Fascist — Deck: {deck_lib}L/{deck_fas}F  Discard: {discard}")
+
+def _check_tiles(state: GameState) -> None:
+    """Invariant: all 17 policy tiles are in the deck, the discard pile, the Chancellor's hand or on the board."""
+    deck = sum(pile_counts(state, "deck"))
+    discard = sum(pile_counts(state, "discard"))
+    in_hand = len(state.get("passed_policies", []))
+    board = state.get("liberal_policies", 0) + state.get("fascist_policies", 0)
+    assert deck + discard + in_hand + board == TOTAL_POLICY_TILES, (
+        f"Policy tiles unaccounted for: deck {deck} + discard {discard} + hand {in_hand} + board {board} != {TOTAL_POLICY_TILES}"
+    )
 
 def nomination_node(state: GameState, runtime) -> GameState:
     logger(f"\n--- ROUND: President Player {state['current_president_idx']} ---")
@@ -58,57 +82,87 @@ def nomination_node(state: GameState, runtime) -> GameState:
     president = agents[state["current_president_idx"]]
     chancellor_id = president.nominate(state)
     msg = f"Player {state['current_president_idx']} nominated Player {chancellor_id} as Chancellor."
-    return {"nominated_chancellor_idx": chancellor_id, "phase": "vote", "messages": state["messages"] + [msg]}
+    return {"nominated_chancellor_idx": chancellor_id, "phase": "vote", "messages": [msg]}
+
+def _cast_ballot(agent, state: GameState) -> Tuple[bool, list]:
+    """Ask one agent for its vote, holding back its log output so ballots are reported in player order."""
+    with capture_log() as lines:
+        vote = agent.vote(state)
+    return vote, lines
 
 def voting_node(state: GameState, runtime) -> GameState:
     logger(f"\n[VOTING] On government: President {state['current_president_idx']}, Chancellor {state['nominated_chancellor_idx']}")
     votes = {}
     agents = runtime.context.get("agents") if getattr(runtime, "context", None) else runtime.get("context", {})
-    for agent in agents:
-        if state["players"][agent.agent_id]["alive"]:
-            vote = agent.vote(state)
-            votes[str(agent.agent_id)] = vote
-            role = state["players"][agent.agent_id].get("role", "unknown")
-            role_display = role.capitalize()
-            logger(f"  Player {agent.agent_id} ({role_display}): {'JA' if vote else 'NEIN'}")
+    voters = [agent for agent in agents if state["players"][agent.agent_id]["alive"]]
+    context = getattr(runtime, "context", None) or {}
+    workers = min(len(voters), context.get("vote_workers", MAX_CONCURRENT_VOTES))
+    president = agents[state["current_president_idx"]]
+    speculating = bool(context.get("speculate")) and hasattr(president, "speculate_president_legislate")
+    if speculating:
+        # An elected President draws the top three cards, so their decision can start with the ballots.
+        # The cards go to the agent only; they reach the state and the log if the government is elected.
+        president.speculate_president_legislate({**state, "drawn_policies": state["policy_deck"][:3]})
+    if workers <= 1:
+        # Serial ballots keep games that draw on a shared RNG (scripted agents) reproducible.
+        ballots = [_cast_ballot(agent, state) for agent in voters]
+    else:
+        # Ballots are secret and simultaneous: every voter sees the same state, so they can be cast concurrently.
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(contextvars.copy_context().run, _cast_ballot, agent, state) for agent in voters]
+            ballots = [f.result() for f in futures]
+    for agent, (vote, lines) in zip(voters, ballots):
+        replay_log(lines)
+        votes[str(agent.agent_id)] = vote
+        role = state["players"][agent.agent_id].get("role", "unknown")
+        role_display = role.capitalize()
+        logger(f"  Player {agent.agent_id} ({role_display}): {'JA' if vote else 'NEIN'}")
     ja_votes = sum(1 for v in votes.values() if v)
     total_votes = len(votes)
     elected = ja_votes > total_votes / 2
     if elected:
         msg = f"Government ELECTED ({ja_votes}/{total_votes} Ja). President {state['current_president_idx']}, Chancellor {state['nominated_chancellor_idx']}."
         logger(f"\n[RESULT] {msg}")
-        logger(f"[ROUND SUMMARY] Board: {state.get('liberal_policies',0)} Liberal, {state.get('fascist_policies',0)} Fascist — Deck: {state.get('policy_deck',[]).count('liberal')}L/{state.get('policy_deck',[]).count('fascist')}F  Discard: {len(state.get('discard_pile',[]))}")
+        _print_round_summary(state)
         if state["fascist_policies"] >= 3:
             chancellor = state["players"][state["nominated_chancellor_idx"]]
             if chancellor["role"] == "hitler":
+                if speculating:
+                    president.cancel_speculation()
                 return {
                     "votes": votes,
                     "phase": "game_over",
                     "winner": "fascists",
                     "game_over_reason": "Hitler elected as Chancellor after 3 fascist policies!",
-                    "messages": state["messages"] + [msg, "GAME OVER: Hitler elected in Hitler Zone!"],
+                    "messages": [msg, "GAME OVER: Hitler elected in Hitler Zone!"],
                 }
-        return {"votes": votes, "phase": "legislate_president", "election_tracker": 0, "messages": state["messages"] + [msg]}
+        return {"votes": votes, "phase": "legislate_president", "election_tracker": 0, "messages": [msg]}
     else:
+        if speculating:
+            president.cancel_speculation()
         msg = f"Government REJECTED ({ja_votes}/{total_votes} Ja). Election tracker: {state['election_tracker'] + 1}/3"
         logger(f"\n[RESULT] {msg}")
         new_tracker = state["election_tracker"] + 1
         if new_tracker >= 3:
             policy = state["policy_deck"][0]
             new_deck = state["policy_deck"][1:]
+            deck_lib, deck_fas = pile_counts(state, "deck")
+            disc_lib, disc_fas = pile_counts(state, "discard")
+            deck_lib -= policy == "liberal"
+            deck_fas -= policy == "fascist"
             chaos_msg = f"CHAOS! Top policy enacted: {policy.upper()}"
             logger(f"\n[CHAOS] {chaos_msg}")
             new_liberal = state["liberal_policies"] + (1 if policy == "liberal" else 0)
             new_fascist = state["fascist_policies"] + (1 if policy == "fascist" else 0)
             if len(new_deck) < 3:
                 new_deck = new_deck + state["discard_pile"]
-                random.shuffle(new_deck)
+                _rng(runtime).shuffle(new_deck)
                 new_discard = []
+                deck_lib, deck_fas, disc_lib, disc_fas = deck_lib + disc_lib, deck_fas + disc_fas, 0, 0
             else:
                 new_discard = state["discard_pile"]
-            logger(f"[ROUND SUMMARY] Board: {new_liberal} Liberal, {new_fascist} Fascist — Deck: {new_deck.count('liberal')}L/{new_deck.count('fascist')}F  Discard: {len(new_discard)}")
             next_pres = (state["current_president_idx"] + 1) % PLAYER_COUNT
-            return {
+            update = {
                 "votes": votes,
                 "phase": "check_win",
                 "election_tracker": 0,
@@ -116,34 +170,48 @@ def voting_node(state: GameState, runtime) -> GameState:
                 "fascist_policies": new_fascist,
                 "policy_deck": new_deck,
                 "discard_pile": new_discard,
+                "deck_liberal": deck_lib,
+                "deck_fascist": deck_fas,
+                "discard_liberal": disc_lib,
+                "discard_fascist": disc_fas,
                 "current_president_idx": next_pres,
                 "nominated_chancellor_idx": None,
-                "messages": state["messages"] + [msg, chaos_msg],
+                "messages": [msg, chaos_msg],
             }
+            after = {**state, **update}
+            _print_round_summary(after)
+            _check_tiles(after)
+            return update
         else:
             next_pres = (state["current_president_idx"] + 1) % PLAYER_COUNT
-            logger(f"[ROUND SUMMARY] Board: {state.get('liberal_policies',0)} Liberal, {state.get('fascist_policies',0)} Fascist — Deck: {state.get('policy_deck',[]).count('liberal')}L/{state.get('policy_deck',[]).count('fascist')}F  Discard: {len(state.get('discard_pile',[]))}")
+            _print_round_summary(state)
             return {
                 "votes": votes,
                 "phase": "nominate",
                 "election_tracker": new_tracker,
                 "current_president_idx": next_pres,
                 "nominated_chancellor_idx": None,
-                "messages": state["messages"] + [msg],
+                "messages": [msg],
             }
 
 def president_legislative_node(state: GameState, runtime) -> GameState:
     logger(f"\n[LEGISLATIVE SESSION] President draws 3 policies...")
     drawn = state["policy_deck"][:3]
     remaining_deck = state["policy_deck"][3:]
+    drawn_lib = drawn.count("liberal")
+    deck_lib, deck_fas = pile_counts(state, "deck")
+    disc_lib, disc_fas = pile_counts(state, "discard")
+    deck_lib, deck_fas = deck_lib - drawn_lib, deck_fas - (len(drawn) - drawn_lib)
     if len(remaining_deck) < 3:
         remaining_deck = remaining_deck + state["discard_pile"]
-        random.shuffle(remaining_deck)
+        _rng(runtime).shuffle(remaining_deck)
         new_discard = []
+        deck_lib, deck_fas, disc_lib, disc_fas = deck_lib + disc_lib, deck_fas + disc_fas, 0, 0
     else:
         new_discard = state["discard_pile"]
-    logger(f"  (President sees: {drawn.count('liberal')} Liberal, {drawn.count('fascist')} Fascist)")
-    interim_state = {**state, "policy_deck": remaining_deck, "discard_pile": new_discard}
+    logger(f"  (President sees: {drawn_lib} Liberal, {len(drawn) - drawn_lib} Fascist)")
+    counters = {"deck_liberal": deck_lib, "deck_fascist": deck_fas, "discard_liberal": disc_lib, "discard_fascist": disc_fas}
+    interim_state = {**state, "policy_deck": remaining_deck, "discard_pile": new_discard, **counters}
     _print_round_summary(interim_state, note="(after President draw)")
     agents = runtime.context.get("agents") if getattr(runtime, "context", None) else runtime.get("context", {})
     president = agents[state["current_president_idx"]]
@@ -154,16 +222,22 @@ def president_legislative_node(state: GameState, runtime) -> GameState:
             rem.remove(p)
     discarded = rem[0] if rem else None
     updated_discard = new_discard + ([discarded] if discarded else [])
+    counters["discard_liberal"] += discarded == "liberal"
+    counters["discard_fascist"] += discarded == "fascist"
     logger(f"[PRESIDENT ACTION] Passed to Chancellor: {passed.count('liberal')} Liberal, {passed.count('fascist')} Fascist")
-    _print_round_summary({**state, "policy_deck": remaining_deck, "discard_pile": updated_discard}, note="(after President action)")
-    return {
+    update = {
         "drawn_policies": drawn,
         "passed_policies": passed,
         "policy_deck": remaining_deck,
         "discard_pile": updated_discard,
+        **counters,
         "phase": "legislate_chancellor",
-        "messages": state["messages"] + ["President drew 3 policies and passed 2 to Chancellor."],
+        "messages": ["President drew 3 policies and passed 2 to Chancellor."],
     }
+    after = {**state, **update}
+    _print_round_summary(after, note="(after President action)")
+    _check_tiles(after)
+    return update
 
 def chancellor_legislative_node(state: GameState, runtime) -> GameState:
     logger(f"\n[LEGISLATIVE SESSION] Chancellor receives 2 policies...")
@@ -179,20 +253,26 @@ def chancellor_legislative_node(state: GameState, runtime) -> GameState:
     new_liberal = state["liberal_policies"] + (1 if enacted == "liberal" else 0)
     new_fascist = state["fascist_policies"] + (1 if enacted == "fascist" else 0)
     msg = f"{enacted.upper()} policy enacted. Board: {new_liberal} Liberal, {new_fascist} Fascist."
-    deck_len = len(state.get("policy_deck", []))
-    discard_len = len(state.get("discard_pile", [])) + (1 if discarded else 0)
-    logger(f"[ROUND SUMMARY] Board: {new_liberal} Liberal, {new_fascist} Fascist — Deck size: {deck_len}  Discard size: {discard_len}")
-    return {
+    deck_len = sum(pile_counts(state, "deck"))
+    disc_lib, disc_fas = pile_counts(state, "discard")
+    disc_lib += discarded == "liberal"
+    disc_fas += discarded == "fascist"
+    logger(f"[ROUND SUMMARY] Board: {new_liberal} Liberal, {new_fascist} Fascist — Deck size: {deck_len}  Discard size: {disc_lib + disc_fas}")
+    update = {
         "liberal_policies": new_liberal,
         "fascist_policies": new_fascist,
         "discard_pile": state["discard_pile"] + ([discarded] if discarded else []),
+        "discard_liberal": disc_lib,
+        "discard_fascist": disc_fas,
         "previous_president_idx": state["current_president_idx"],
         "previous_chancellor_idx": state["nominated_chancellor_idx"],
         "drawn_policies": [],
         "passed_policies": [],
         "phase": "check_win",
-        "messages": state["messages"] + [msg],
+        "messages": [msg],
     }
+    _check_tiles({**state, **update})
+    return update
 
 def check_win_node(state: GameState) -> GameState:
     if state["liberal_policies"] >= 5:
@@ -200,23 +280,23 @@ def check_win_node(state: GameState) -> GameState:
             "phase": "game_over",
             "winner": "liberals",
             "game_over_reason": "5 Liberal policies enacted!",
-            "messages": state["messages"] + ["GAME OVER: Liberals win with 5 policies!"],
+            "messages": ["GAME OVER: Liberals win with 5 policies!"],
         }
     if state["fascist_policies"] >= 6:
         return {
             "phase": "game_over",
             "winner": "fascists",
             "game_over_reason": "6 Fascist policies enacted!",
-            "messages": state["messages"] + ["GAME OVER: Fascists win with 6 policies!"],
+            "messages": ["GAME OVER: Fascists win with 6 policies!"],
         }
     if state["fascist_policies"] == 3 and state.get("previous_president_idx") is not None:
         if state.get("drawn_policies", []) == [] and state.get("passed_policies", []) == []:
             has_uninvestigated = any(not p["investigated"] for p in state["players"] if p["alive"])
             if has_uninvestigated:
-                print(f"\n[EXECUTIVE POWER] Investigate Loyalty unlocked!")
-                return {"phase": "executive", "messages": state["messages"] + ["Executive power: Investigate Loyalty"]}
+                logger(f"\n[EXECUTIVE POWER] Investigate Loyalty unlocked!")
+                return {"phase": "executive", "messages": ["Executive power: Investigate Loyalty"]}
     next_pres = (state["current_president_idx"] + 1) % PLAYER_COUNT
-    return {"phase": "nominate", "current_president_idx": next_pres, "nominated_chancellor_idx": None, "messages": state["messages"] + [f"Next round: Player {next_pres} is President."]}
+    return {"phase": "nominate", "current_president_idx": next_pres, "nominated_chancellor_idx": None, "messages": [f"Next round: Player {next_pres} is President."]}
 
 def executive_action_node(state: GameState, runtime) -> GameState:
     agents = runtime.context.get("agents") if getattr(runtime, "context", None) else runtime.get("context", {})
@@ -229,7 +309,7 @@ def executive_action_node(state: GameState, runtime) -> GameState:
     players = state["players"].copy()
     players[target] = {**players[target], "investigated": True}
     next_pres = (state["current_president_idx"] + 1) % PLAYER_COUNT
-    return {"players": players, "phase": "nominate", "current_president_idx": next_pres, "nominated_chancellor_idx": None, "messages": state["messages"] + [f"President {state['previous_president_idx']} investigated Player {target} (result secret)."]}
+    return {"players": players, "phase": "nominate", "current_president_idx": next_pres, "nominated_chancellor_idx": None, "messages": [f"President {state['previous_president_idx']} investigated Player {target} (result secret)."]}
 
 def game_over_node(state: GameState) -> GameState:
     logger("\n" + "=" * 60)
@@ -242,7 +322,7 @@ def game_over_node(state: GameState) -> GameState:
     for p in state["players"]:
         logger(f"Player {p['id']}: {p['role'].upper()} ({p['team']})")
     logger("\n" + "=" * 60)
-    return state
+    return {"phase": "game_over"}
 
 def route_phase(state: GameState) -> str:
     return state["phase"]
\ No newline at end of file
@@ -1,6 +1,67 @@
-from typing import TypedDict, Literal, List, Any
+from typing import TypedDict, Literal, List, Any, Annotated, Iterable, Iterator, Sequence, Tuple
 
 PLAYER_COUNT = 5
+TOTAL_POLICY_TILES = 17
+
+class MessageLog(Sequence[str]):
+    """
+    Append-only message history. Snapshots share one backing list, so appending is O(1)
+    amortized instead of copying the whole history on every transition. Appending to an
+    older snapshot (one the buffer has already grown past) copies its prefix first, so
+    every snapshot stays unchanged.
+    """
+
+    __slots__ = ("_items", "_size")
+
+    def __init__(self, items: Iterable[str] = ()):
+        self._items = list(items)
+        self._size = len(self._items)
+
+    def appended(self, new: Iterable[str]) -> "MessageLog":
+        new = list(new)
+        if not new:
+            return self
+        items = self._items if len(self._items) == self._size else self._items[: self._size]
+        items.extend(new)
+        out = MessageLog.__new__(MessageLog)
+        out._items = items
+        out._size = self._size + len(new)
+        return out
+
+    def tail(self, n: int) -> List[str]:
+        """The last n messages, oldest first."""
+        return self._items[max(0, self._size - n): self._size]
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._items[i] for i in range(*index.indices(self._size))]
+        if index < 0:
+            index += self._size
+        if not 0 <= index < self._size:
+            raise IndexError("message index out of range")
+        return self._items[index]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._items[: self._size])
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, (MessageLog, list)):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"MessageLog({list(self)!r})"
+
+def append_messages(left: Sequence[str] | None, right: Iterable[str] | str | None) -> MessageLog:
+    """LangGraph reducer for GameState.messages: nodes return only their new messages."""
+    if not isinstance(left, MessageLog):
+        left = MessageLog(left or [])
+    if isinstance(right, str):
+        right = [right]
+    return left.appended(right or [])
 
 class GameState(TypedDict, total=False):
     players: List[dict]
@@ -8,6 +69,11 @@ class GameState(TypedDict, total=False):
     fascist_policies: int
     policy_deck: List[str]
     discard_pile: List[str]
+    # Running composition of the deck and discard pile, kept in step with the lists above.
+    deck_liberal: int
+    deck_fascist: int
+    discard_liberal: int
+    discard_fascist: int
     current_president_idx: int
     nominated_chancellor_idx: int | None
     previous_president_idx: int | None
@@ -25,7 +91,18 @@ class GameState(TypedDict, total=False):
     votes: dict
     drawn_policies: List[str]
     passed_policies: List[str]
-    messages: List[str]
+    messages: Annotated[MessageLog, append_messages]
     winner: str | None
     game_over_reason: str | None
-    agents: List[Any]
\ No newline at end of file
+    # State of the game RNG after the last node (checkpointed games only), so a resumed game draws the same tiles.
+    rng_state: Any
+    # Snapshot of the agents' shared GameMemory after the last node (checkpointed games only): claims and private notes.
+    memory_state: Any
+    agents: List[Any]
+
+def pile_counts(state: dict, pile: str) -> Tuple[int, int]:
+    """(liberal, fascist) tiles in the "deck" or "discard" pile, from the running counters when present."""
+    if f"{pile}_liberal" in state:
+        return state[f"{pile}_liberal"], state[f"{pile}_fascist"]
+    tiles = state.get("policy_deck" if pile == "deck" else "discard_pile", [])
+    return tiles.count("liberal"), tiles.count("fascist")
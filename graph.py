@@ -1,3 +1,8 @@
+import inspect
+import random
+import time
+from types import SimpleNamespace
+from typing import Dict, List, Optional, get_type_hints
 from langgraph.graph import StateGraph, END
 from game import (
     nomination_node,
@@ -10,26 +15,114 @@ from game import (
     route_phase,
 )
 from game_types import GameState
+from log import event as log_event, events_enabled
+from tracing import current_trace, get_tracer
+
+tracer = get_tracer(__name__)
+
+ENTRY = "nominate"
+NODES = {
+    "nominate": nomination_node,
+    "vote": voting_node,
+    "legislate_president": president_legislative_node,
+    "legislate_chancellor": chancellor_legislative_node,
+    "check_win": check_win_node,
+    "executive": executive_action_node,
+    "game_over": game_over_node,
+}
+EDGES = {
+    "nominate": "vote",
+    "legislate_president": "legislate_chancellor",
+    "legislate_chancellor": "check_win",
+    "executive": "nominate",
+    "game_over": END,
+}
+ROUTES = {
+    "vote": {"nominate": "nominate", "legislate_president": "legislate_president", "check_win": "check_win", "game_over": "game_over"},
+    "check_win": {"nominate": "nominate", "executive": "executive", "game_over": "game_over"},
+}
+_NEEDS_RUNTIME = {name for name, fn in NODES.items() if "runtime" in inspect.signature(fn).parameters}
+# Channels with a reducer (e.g. the append-only messages log), as declared on GameState.
+_REDUCERS = {
+    key: hint.__metadata__[0]
+    for key, hint in get_type_hints(GameState, include_extras=True).items()
+    if getattr(hint, "__metadata__", None)
+}
+
+def _emit_transition(name: str, state: GameState, update: dict) -> None:
+    if events_enabled():
+        log_event("transition", node=name, phase_before=state.get("phase"), update={k: v for k, v in update.items() if k not in ("rng_state", "memory_state")})
+
+def _with_rng_state(runtime, update: dict) -> dict:
+    context = getattr(runtime, "context", None) or {}
+    rng = context.get("rng")
+    if context.get("persist_rng") and isinstance(rng, random.Random):
+        update = {**update, "rng_state": rng.getstate()}
+        memory = context.get("memory")
+        if memory is not None:
+            update["memory_state"] = memory.snapshot()
+    return update
+
+def _node_span(name: str):
+    """Span for one node run, under the current round (a nomination opens the next round)."""
+    trace = current_trace()
+    parent = None if trace is None else trace.next_round() if name == ENTRY or trace.round is None else trace.round
+    return tracer.start_as_current_span(name, {"graph.node": name}, parent=parent)
+
+def _traced(name: str, fn):
+    """
+    Wrap a node so it runs in a tracing span, each state transition is written to the JSONL
+    event stream and, for checkpointed games (context["persist_rng"]), carries the game RNG's state
+    and a snapshot of the agents' memory (context["memory"]).
+    """
+    if name in _NEEDS_RUNTIME:
+        def node(state: GameState, runtime) -> dict:
+            with _node_span(name):
+                update = _with_rng_state(runtime, fn(state, runtime))
+            _emit_transition(name, state, update)
+            return update
+    else:
+        def node(state: GameState) -> dict:
+            with _node_span(name):
+                update = fn(state)
+            _emit_transition(name, state, update)
+            return update
+    node.__name__ = node.__qualname__ = fn.__name__
+    node.__doc__ = fn.__doc__
+    return node
+
+TRACED_NODES = {name: _traced(name, fn) for name, fn in NODES.items()}
 
 def build_workflow() -> StateGraph:
     g = StateGraph(GameState)
-    g.add_node("nominate", nomination_node)
-    g.add_node("vote", voting_node)
-    g.add_node("legislate_president", president_legislative_node)
-    g.add_node("legislate_chancellor", chancellor_legislative_node)
-    g.add_node("check_win", check_win_node)
-    g.add_node("executive", executive_action_node)
-    g.add_node("game_over", game_over_node)
-    g.set_entry_point("nominate")
-    g.add_edge("nominate", "vote")
-    g.add_conditional_edges(
-        "vote",
-        route_phase,
-        {"nominate": "nominate", "legislate_president": "legislate_president", "check_win": "check_win", "game_over": "game_over"},
-    )
-    g.add_edge("legislate_president", "legislate_chancellor")
-    g.add_edge("legislate_chancellor", "check_win")
-    g.add_conditional_edges("check_win", route_phase, {"nominate": "nominate", "executive": "executive", "game_over": "game_over"})
-    g.add_edge("executive", "nominate")
-    g.add_edge("game_over", END)
-    return g
\ No newline at end of file
+    for name, fn in TRACED_NODES.items():
+        g.add_node(name, fn)
+    g.set_entry_point(ENTRY)
+    for src, dst in EDGES.items():
+        g.add_edge(src, dst)
+    for src, mapping in ROUTES.items():
+        g.add_conditional_edges(src, route_phase, mapping)
+    return g
+
+def run_headless(state: GameState, context: dict, timings: Optional[Dict[str, List[float]]] = None) -> GameState:
+    """
+    Play a game to the end by walking the same nodes and edges without LangGraph (for bulk simulation).
+    If `timings` is given, each node's wall time is appended to timings[node].
+    """
+    runtime = SimpleNamespace(context=context)
+    node = ENTRY
+    while node != END:
+        fn = TRACED_NODES[node]
+        if timings is None:
+            update = fn(state, runtime) if node in _NEEDS_RUNTIME else fn(state)
+        else:
+            start = time.perf_counter()
+            update = fn(state, runtime) if node in _NEEDS_RUNTIME else fn(state)
+            timings.setdefault(node, []).append(time.perf_counter() - start)
+        merged = {**state, **update}
+        for key, reducer in _REDUCERS.items():
+            if key in update:
+                merged[key] = reducer(state.get(key), update[key])
+        state = merged
+        node = EDGES[node] if node in EDGES else ROUTES[node][route_phase(state)]
+    return state
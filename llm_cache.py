@@ -0,0 +1,183 @@
+"""Response cache for structured LLM calls.
+
+Entries are keyed by (model, output schema, prompt hash, temperature) and kept in an
+in-memory LRU in front of an on-disk SQLite store. The store is trimmed to a byte
+budget by evicting least recently used rows.
+
+Modes:
+- "rw": serve hits and store new responses
+- "ro": serve hits only (e.g. a shared, frozen regression cache)
+- "off": bypass entirely
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+from pydantic import BaseModel
+
+MODES = ("rw", "ro", "off")
+
+def _prompt_text(prompt: Any) -> str:
+    if isinstance(prompt, str):
+        return prompt
+    if isinstance(prompt, (list, tuple)) and all(hasattr(m, "content") for m in prompt):
+        # Chat messages: role and text only, so the key does not depend on message ids or metadata.
+        return "\n".join(f"{getattr(m, 'type', '')}: {m.content}" for m in prompt)
+    return repr(prompt)
+
+class ResponseCache:
+    def __init__(self, path: str = "cache/llm_cache.sqlite", mode: str = "rw", memory_entries: int = 2048, max_bytes: int = 256 * 1024 * 1024):
+        if mode not in MODES:
+            raise ValueError(f"Unknown cache mode {mode!r}; expected one of {MODES}")
+        self.path = path
+        self.mode = mode
+        self.memory_entries = memory_entries
+        self.max_bytes = max_bytes
+        self.hits_memory = 0
+        self.hits_disk = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        self._memory: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._bytes = 0
+        if mode != "off":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, schema TEXT, value TEXT, size INTEGER, created REAL, last_used REAL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses(last_used)")
+            self._db.commit()
+            self._bytes = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    @staticmethod
+    def key(model: Optional[str], schema: type, prompt: Any, temperature: Optional[float]) -> str:
+        schema_hash = hashlib.sha256(json.dumps(schema.model_json_schema(), sort_keys=True).encode()).hexdigest()
+        prompt_hash = hashlib.sha256(_prompt_text(prompt).encode()).hexdigest()
+        raw = json.dumps([model, schema.__name__, schema_hash, prompt_hash, temperature])
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        if self.mode == "off":
+            return None
+        with self._lock:
+            value = self._memory.get(key)
+            if value is not None:
+                self._memory.move_to_end(key)
+                self.hits_memory += 1
+                return value
+            row = self._db.execute("SELECT value FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits_disk += 1
+            if self.mode == "rw":
+                self._db.execute("UPDATE responses SET last_used = ? WHERE key = ?", (time.time(), key))
+                self._db.commit()
+            self._remember(key, row[0])
+            return row[0]
+
+    def put(self, key: str, schema_name: str, value: str) -> None:
+        if self.mode != "rw":
+            return
+        now = time.time()
+        size = len(value.encode())
+        with self._lock:
+            old = self._db.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self._bytes += size - (old[0] if old else 0)
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (key, schema, value, size, created, last_used) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, schema_name, value, size, now, now),
+            )
+            self.writes += 1
+            self._evict()
+            self._db.commit()
+            self._remember(key, value)
+
+    def _remember(self, key: str, value: str) -> None:
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _evict(self) -> None:
+        if self._bytes <= self.max_bytes:
+            return
+        # Trim to 90% of the budget so eviction does not run on every write.
+        target = int(self.max_bytes * 0.9)
+        for key, size in self._db.execute("SELECT key, size FROM responses ORDER BY last_used").fetchall():
+            if self._bytes <= target:
+                break
+            self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self._memory.pop(key, None)
+            self._bytes -= size
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        hits = self.hits_memory + self.hits_disk
+        lookups = hits + self.misses
+        return {
+            "mode": self.mode,
+            "hits_memory": self.hits_memory,
+            "hits_disk": self.hits_disk,
+            "misses": self.misses,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "writes": self.writes,
+            "evictions": self.evictions,
+        }
+
+    def close(self) -> None:
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+class CachedLLM:
+    """Wraps an LLM client so structured calls are served from a ResponseCache when possible."""
+
+    def __init__(self, llm: Any, cache: ResponseCache, model: Optional[str] = None):
+        self.llm = llm
+        self.cache = cache
+        self.model = model or getattr(llm, "model", None)
+        self.temperature = getattr(llm, "temperature", None)
+
+    def with_structured_output(self, schema, **kwargs):
+        return _CachedRunnable(self, schema, self.llm.with_structured_output(schema, **kwargs))
+
+    def __getattr__(self, name):
+        return getattr(self.llm, name)
+
+class _CachedRunnable:
+    def __init__(self, owner: CachedLLM, schema: type, runnable: Any):
+        self.owner = owner
+        self.schema = schema
+        self.runnable = runnable
+
+    def invoke(self, prompt, *args, **kwargs):
+        cache = self.owner.cache
+        if cache.mode == "off":
+            return self.runnable.invoke(prompt, *args, **kwargs)
+        key = cache.key(self.owner.model, self.schema, prompt, self.owner.temperature)
+        cached = cache.get(key)
+        if cached is not None:
+            return self.schema.model_validate_json(cached)
+        result = self.runnable.invoke(prompt, *args, **kwargs)
+        if isinstance(result, BaseModel):
+            cache.put(key, self.schema.__name__, result.model_dump_json())
+        return result
+
+def cache_from_env() -> ResponseCache:
+    """Build the cache from LLM_CACHE (rw/ro/off, default off), LLM_CACHE_PATH and LLM_CACHE_MAX_MB."""
+    return ResponseCache(
+        path=os.environ.get("LLM_CACHE_PATH", "cache/llm_cache.sqlite"),
+        mode=os.environ.get("LLM_CACHE", "off"),
+        max_bytes=int(float(os.environ.get("LLM_CACHE_MAX_MB", "256")) * 1024 * 1024),
+    )
@@ -1,41 +1,226 @@
+"""Game logging.
+
+Lines go to a GameLog: a text log file, an optional machine-readable JSONL event
+stream, and optionally stdout. All file and stdout writes happen on one background
+thread that drains a queue and flushes in batches, so the game threads never block
+on I/O. Each game can have its own GameLog (bound to the current thread/async task
+via a context variable); otherwise the process-wide default from init() is used.
+
+Levels: verbose [THOUGHTS]/[STRUCTURED OUTPUT] lines are DEBUG and can be turned off
+with LOG_LEVEL=INFO (or a per-game level).
+"""
+import atexit
+import json
 import os
+import queue
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
 from datetime import datetime
-from typing import Optional
+from typing import Any, Iterator, List, Optional, Tuple
+
+from game_types import MessageLog
+
+DEBUG, INFO, WARNING, ERROR = 10, 20, 30, 40
+LEVELS = {"DEBUG": DEBUG, "INFO": INFO, "WARNING": WARNING, "ERROR": ERROR}
 
-LOG_FH: Optional[object] = None
 LOG_PATH: Optional[str] = None
+EVENTS_PATH: Optional[str] = None
+_local = threading.local()
+
+def level_from_env(default: str = "DEBUG") -> int:
+    return LEVELS.get(os.environ.get("LOG_LEVEL", default).upper(), DEBUG)
+
+class _Writer(threading.Thread):
+    """Background thread that performs every log write and flushes touched files once per batch."""
+
+    def __init__(self, batch_size: int = 1024):
+        super().__init__(name="log-writer", daemon=True)
+        self.batch_size = batch_size
+        self.queue: "queue.Queue[Tuple[Any, Optional[str]]]" = queue.Queue()
+
+    def run(self) -> None:
+        while True:
+            batch = [self.queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            touched = set()
+            for fh, text in batch:
+                try:
+                    if text is None:
+                        # Close request: everything queued before it has been written.
+                        fh.flush()
+                        fh.close()
+                        touched.discard(fh)
+                    else:
+                        fh.write(text)
+                        touched.add(fh)
+                except Exception:
+                    pass
+            for fh in touched:
+                try:
+                    fh.flush()
+                except Exception:
+                    pass
+            for _ in batch:
+                self.queue.task_done()
+
+_writer: Optional[_Writer] = None
+_writer_lock = threading.Lock()
+
+def _enqueue(fh: Any, text: Optional[str]) -> None:
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = _Writer()
+                _writer.start()
+    _writer.queue.put((fh, text))
+
+def flush() -> None:
+    """Block until every queued line has been written and flushed."""
+    if _writer is not None:
+        _writer.queue.join()
+
+atexit.register(flush)
+
+def _json_default(value: Any) -> Any:
+    # Pydantic models are iterable too (as field/value pairs): check for them first.
+    if hasattr(value, "model_dump"):
+        return value.model_dump()
+    if isinstance(value, (set, frozenset, tuple, MessageLog)):
+        return list(value)
+    return str(value)
+
+class GameLog:
+    """Destination for one game's (or run's) log: text file, JSONL event stream and/or stdout."""
+
+    def __init__(self, path: Optional[str] = None, events_path: Optional[str] = None, echo: bool = True, level: int = DEBUG, game_id: Optional[Any] = None, append: bool = False):
+        self.path = path
+        self.events_path = events_path
+        self.echo = echo
+        self.level = level
+        self.game_id = game_id
+        self._text = self._open(path, append)
+        self._events = self._open(events_path, append)
+
+    @staticmethod
+    def _open(path: Optional[str], append: bool = False):
+        if not path:
+            return None
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        return open(path, "a" if append else "w", encoding="utf-8")
+
+    @property
+    def has_events(self) -> bool:
+        return self._events is not None
+
+    def write(self, msg: str, end: str, level: int) -> None:
+        if level < self.level:
+            return
+        text = msg + end if end else msg
+        if self.echo:
+            _enqueue(sys.stdout, text)
+        if self._text is not None:
+            _enqueue(self._text, text)
+
+    def event(self, kind: str, data: dict) -> None:
+        if self._events is None:
+            return
+        record = {"ts": time.time(), "game": self.game_id, "event": kind, **data}
+        _enqueue(self._events, json.dumps(record, default=_json_default) + "\n")
+
+    def close(self) -> None:
+        for fh in (self._text, self._events):
+            if fh is not None:
+                _enqueue(fh, None)
+        self._text = self._events = None
+
+_default = GameLog(level=level_from_env())
+_GAME_LOG: ContextVar[Optional[GameLog]] = ContextVar("game_log", default=None)
+
+def current() -> GameLog:
+    """The GameLog for the current thread/async task."""
+    return _GAME_LOG.get() or _default
 
 def init(log_dir: str = "logs") -> str:
-    """Initialize logging: create directory and open a timestamped log file. Returns path."""
-    global LOG_FH, LOG_PATH
-    os.makedirs(log_dir, exist_ok=True)
-    fname = datetime.utcnow().strftime("run_%Y%m%d_%H%M%S.txt")
-    path = os.path.join(log_dir, fname)
-    LOG_FH = open(path, "w", encoding="utf-8")
-    LOG_PATH = path
+    """Initialize logging: open a timestamped log file and JSONL event stream in log_dir. Returns the log path."""
+    global _default, LOG_PATH, EVENTS_PATH
+    stamp = datetime.utcnow().strftime("run_%Y%m%d_%H%M%S")
+    LOG_PATH = os.path.join(log_dir, stamp + ".txt")
+    EVENTS_PATH = os.path.join(log_dir, stamp + ".events.jsonl")
+    _default.close()
+    _default = GameLog(LOG_PATH, EVENTS_PATH, echo=True, level=level_from_env())
     log(f"[LOG INIT] {datetime.utcnow().isoformat()} UTC", end="\n")
-    return path
-
-def log(msg: str = "", end: str = "\n") -> None:
-    """Write message to stdout and append to the active log file if initialized."""
-    print(msg, end=end)
-    global LOG_FH
-    if LOG_FH:
-        try:
-            if end:
-                LOG_FH.write(msg + end)
-            else:
-                LOG_FH.write(msg)
-            LOG_FH.flush()
-        except Exception:
-            pass
+    return LOG_PATH
+
+def log(msg: str = "", end: str = "\n", level: int = INFO) -> None:
+    """Write a line to the current game's log (and stdout, if it echoes)."""
+    buffer = getattr(_local, "buffer", None)
+    if buffer is not None:
+        buffer.append(("log", msg, end, level))
+        return
+    current().write(msg, end, level)
+
+def event(kind: str, **data: Any) -> None:
+    """Append a structured record to the current game's JSONL event stream."""
+    buffer = getattr(_local, "buffer", None)
+    if buffer is not None:
+        buffer.append(("event", kind, data, None))
+        return
+    current().event(kind, data)
+
+def events_enabled() -> bool:
+    """Whether event() currently goes anywhere; lets callers skip building records."""
+    return current().has_events
+
+@contextmanager
+def game_log(path: Optional[str], echo: bool = False, events_path: Optional[str] = None, level: Optional[int] = None, game_id: Optional[Any] = None, append: bool = False) -> Iterator[GameLog]:
+    """Send log lines and events from the current thread/async task to their own files while the block runs."""
+    handle = GameLog(path, events_path, echo=echo, level=level_from_env() if level is None else level, game_id=game_id, append=append)
+    token = _GAME_LOG.set(handle)
+    try:
+        yield handle
+    finally:
+        _GAME_LOG.reset(token)
+        handle.close()
+
+@contextmanager
+def muted() -> Iterator[None]:
+    """Drop log lines and events from the current thread/async task while the block runs (bulk simulation)."""
+    token = _GAME_LOG.set(GameLog(echo=False, level=ERROR + 1))
+    try:
+        yield
+    finally:
+        _GAME_LOG.reset(token)
+
+@contextmanager
+def capture() -> Iterator[List[tuple]]:
+    """Buffer log lines and events emitted by the current thread instead of writing them; yields the buffer."""
+    buffer: List[tuple] = []
+    previous = getattr(_local, "buffer", None)
+    _local.buffer = buffer
+    try:
+        yield buffer
+    finally:
+        _local.buffer = previous
+
+def replay(buffer: List[tuple]) -> None:
+    """Write lines and events previously collected by capture() in their original order."""
+    for kind, a, b, level in buffer:
+        if kind == "log":
+            log(a, end=b, level=level)
+        else:
+            event(a, **b)
 
 def close() -> None:
-    """Close the active log file if open."""
-    global LOG_FH
-    if LOG_FH:
-        try:
-            LOG_FH.close()
-        except Exception:
-            pass
-        LOG_FH = None
\ No newline at end of file
+    """Close the default log files and wait for pending writes."""
+    global _default
+    _default.close()
+    _default = GameLog(level=level_from_env())
+    flush()
@@ -1,43 +1,137 @@
 from dotenv import load_dotenv
+import argparse
 import os
 import random
+from typing import Any, List
 from game import create_initial_state
-from agents import initialize_agents
+from agents import game_memory, initialize_agents
 from graph import build_workflow
 from log import init as init_log, log as logger, close as close_log
-from langchain_google_genai import ChatGoogleGenerativeAI
+from llm_cache import CachedLLM, cache_from_env
+from context_cache import find as find_context_cache
+from batching import batching_from_env, find as find_batching
+from ratelimit import get_limiter
+from replay import GameRecord, record_agents
+from checkpoint import DEFAULT_PATH as CHECKPOINT_PATH, GameStore, checkpoint_config, restore_rng
+from usage import escalation_rates, route_stats, export as export_usage, tracking as track_usage
+from tracing import game_trace
+from providers import chat_model, model_name
+from routing import find as find_router, routing_from_env
+from resilience import GuardedLLM, find as find_hedging, get_breaker, hedging_from_env
+
+SEED = 33
 
 load_dotenv()
-random.seed(33)
+random.seed(SEED)
+
+def make_llm(model: str) -> Any:
+    """
+    The configured provider's client (LLM_PROVIDER, see providers.py) with batching, hedged
+    calls with a timeout, the circuit breaker and rate limiter, and response caching in
+    front (hits skip the quota); one per route when LLM_ROUTES routes decisions to several models.
+    """
+    cache = cache_from_env()
+    client = lambda name, provider=None: batching_from_env(chat_model(name, provider))
+    build = lambda name, provider=None: CachedLLM(GuardedLLM(hedging_from_env(client(name, provider), name, provider, client)), cache, model=name)
+    return routing_from_env(model, build) or build(model)
+
+def clients(llm: Any) -> List[Any]:
+    """The per-route client stacks inside `llm` (just `llm` without routing)."""
+    router = find_router(llm)
+    return router.clients() if router is not None else [llm]
 
 def main():
+    parser = argparse.ArgumentParser(description="Play one Secret Hitler game between LLM agents.")
+    parser.add_argument("--resume", metavar="GAME_ID", default=None, help="continue a checkpointed game from its last completed node")
+    parser.add_argument("--checkpoints", default=CHECKPOINT_PATH, help="checkpoint database (default: %(default)s)")
+    parser.add_argument("--trace", action="store_true", help="record timing spans to <log dir>/<game id>.trace.jsonl (render with tracing.py)")
+    parser.add_argument("--speculate", action="store_true", help="start the President's legislative decision while the ballots are collected")
+    parser.add_argument("--tiered", action="store_true", help="let the scripted rules take the decisions they are confident about; the LLM takes the rest")
+    args = parser.parse_args()
+
     log_path = init_log()
-    state = create_initial_state()
-    model = os.environ.get("GEMINI_MODEL") or os.environ.get("MODEL") or "gemini-2.5-flash"
-    api_key = os.environ.get("GEMINI_API_KEY")
-    if not api_key:
-        raise RuntimeError("GEMINI_API_KEY environment variable must be set")
-    llm = ChatGoogleGenerativeAI(model=model, google_api_key=api_key)
-
-    agents = initialize_agents(state["players"], model=model, llm_client=llm)
-    app = build_workflow().compile()
+    store = GameStore(args.checkpoints)
+    if args.resume:
+        meta = store.meta(args.resume)
+        if meta is None:
+            raise SystemExit(f"No checkpointed game with id {args.resume!r} in {args.checkpoints}")
+        game_id, seed, model, backend = args.resume, meta["seed"], meta["model"], meta["backend"]
+    else:
+        game_id, seed, model = os.path.splitext(os.path.basename(log_path))[0], SEED, model_name()
+        backend = "tiered" if args.tiered else "llm"
+        store.register(game_id, seed, backend, model)
+    rng = random.Random(seed)
+    config = checkpoint_config(game_id)
+    app = build_workflow().compile(checkpointer=store.saver())
+    saved = app.get_state(config).values
+    record_path = os.path.join(os.path.dirname(log_path), game_id + ".decisions.json")
+    trace_path = os.path.join(os.path.dirname(log_path), game_id + ".trace.jsonl") if args.trace else None
+    if saved:
+        # Resume: same players and roles, RNG where the last completed node left it.
+        state, inputs = saved, None
+        restore_rng(rng, state)
+        record = GameRecord.load(record_path) if os.path.exists(record_path) else GameRecord(seed=seed, backend=backend, model=model)
+        logger(f"[RESUME] Game {game_id}: continuing from phase {state.get('phase')} ({len(record.decisions)} decisions recorded)")
+    else:
+        state = inputs = create_initial_state(rng)
+        state["rng_state"] = rng.getstate()
+        record = GameRecord(seed=seed, backend=backend, model=model)
+    llm = make_llm(model)
+
+    agents = record_agents(initialize_agents(state["players"], model=model, llm_client=llm, backend=backend, seed=seed), record)
     logger("\n" + "=" * 60)
     logger("STARTING GAME")
     logger("=" * 60)
+    logger(f"[CHECKPOINT] Game id {game_id} — resume with: python main.py --resume {game_id}")
     finished = False
-    for output in app.stream(state, stream_mode="updates", config={"recursion_limit": 1000}, context={"agents": agents}):
-        for node_name, node_state in output.items():
-            state = node_state
-            if len(state.get("messages", [])) > 500:
-                logger("\n[ERROR] Game exceeded 500 actions, terminating.")
-                finished = True
-            if node_state.get("phase") == "game_over" or node_state.get("winner") is not None:
-                finished = True
-        if finished:
-            break
+    context = {"agents": agents, "rng": rng, "persist_rng": True, "speculate": args.speculate, "memory": game_memory(agents)}
+    if saved and context["memory"] is not None:
+        context["memory"].restore(state.get("memory_state"))
+    with track_usage(game_id) as usage, game_trace(trace_path, id=game_id, seed=seed, resumed=bool(saved)):
+        for output in app.stream(inputs, stream_mode="updates", config=config, context=context, durability="sync"):
+            # Written after the node's checkpoint, so a resumed game continues this record.
+            record.save(record_path)
+            for node_name, node_state in output.items():
+                if node_state.get("phase") == "game_over" or node_state.get("winner") is not None:
+                    finished = True
+            if finished:
+                break
+    usage_path = os.path.join(os.path.dirname(log_path), game_id + ".usage.json")
+    usage_summary = usage.summary()
+    usage_total = export_usage(usage_path, {game_id: usage_summary}).get("total", {})
+    state = app.get_state(config).values
+    record.finish(state)
+    record.save(record_path)
+    if state.get("winner") is not None:
+        store.finish(game_id, {"winner": state["winner"], "reason": state.get("game_over_reason")})
+    store.close()
     logger("\n" + "=" * 60)
     logger("GAME SIMULATION COMPLETE")
     logger("=" * 60)
+    logger(f"[REPLAY] Decisions recorded to {record_path}")
+    logger(f"[USAGE] {usage_total} — per phase/role/player in {usage_path}")
+    if backend == "tiered":
+        logger(f"[ESCALATION] {escalation_rates(usage_summary)}")
+    if find_router(llm) is not None:
+        logger(f"[ROUTING] {route_stats(usage_summary)}")
+    if trace_path:
+        logger(f"[TRACE] Spans written to {trace_path} — python tracing.py {trace_path}")
+    logger(f"[RATE LIMIT] {get_limiter().stats()}")
+    logger(f"[CIRCUIT] {get_breaker().stats()}")
+    if llm.cache.mode != "off":
+        logger(f"[CACHE] {llm.cache.stats()}")
+    for client in clients(llm):
+        hedging = find_hedging(client)
+        if hedging is not None:
+            logger(f"[HEDGING] {hedging.stats()}")
+        batching = find_batching(client)
+        if batching is not None:
+            logger(f"[BATCHING] {batching.stats()}")
+        context_cache = find_context_cache(client)
+        if context_cache is not None:
+            logger(f"[CONTEXT CACHE] {context_cache.stats()}")
+            context_cache.release()
+    llm.cache.close()
     close_log()
 
 if __name__ == "__main__":
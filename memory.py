@@ -0,0 +1,247 @@
+"""Bounded game memory for agent prompts.
+
+GameMemory is shared by one game's agents (it lives in their PromptContext). It reads
+the public message log incrementally — each message is parsed once — into one record
+per round: the government nominated, the vote (with every player's ballot), the policy
+enacted, investigations and the public claims made. Each agent also keeps private notes:
+the tiles it saw as President or Chancellor and its investigation results.
+
+Prompts show the last RECENT_ROUNDS rounds in full and fold every older round, once,
+into per-player tallies (governments led, policies enacted under them, ballots cast), so
+their size stays bounded however long the game runs while still covering all of it.
+
+The summary is built from the log rather than written by the model: it costs no extra
+calls and the same game state always renders the same prompt, which keeps response
+caching and replays exact. Claims and notes become visible from the next state onwards,
+so ballots cast concurrently never see each other's statements; what the President and
+Chancellor say during the legislative session only once the policy is enacted, since
+they may not talk to each other before then.
+
+Checkpointed games carry `snapshot()` in GameState (`memory_state`, next to the RNG
+state), and a resumed game `restore()`s it: claims and private notes are not in the
+message log, so they could not be rebuilt from it. Inside `deferred()`
+(a speculative decision) claims and notes are held back until the caller applies them.
+"""
+import re
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field
+from typing import Dict, Iterator, List, Optional, Tuple
+
+RECENT_ROUNDS = 3
+CLAIM_CHARS = 160
+
+_NOMINATED = re.compile(r"Player (\d+) nominated Player (\d+) as Chancellor\.")
+_VOTED = re.compile(r"Government (ELECTED|REJECTED) \((\d+)/(\d+) Ja\)")
+_ENACTED = re.compile(r"(LIBERAL|FASCIST) policy enacted\.")
+_CHAOS = re.compile(r"CHAOS! Top policy enacted: (\w+)")
+_INVESTIGATED = re.compile(r"President (\d+) investigated Player (\d+)")
+
+_PENDING: ContextVar[Optional[list]] = ContextVar("memory_pending", default=None)
+
+@contextmanager
+def deferred() -> Iterator[list]:
+    """Hold back claims and notes made in the current thread/async task; yields them for apply()."""
+    pending: list = []
+    token = _PENDING.set(pending)
+    try:
+        yield pending
+    finally:
+        _PENDING.reset(token)
+
+def apply(pending: list) -> None:
+    for memory, method, args in pending:
+        getattr(memory, method)(*args)
+
+@dataclass
+class RoundRecord:
+    number: int
+    start: int  # index of the nomination message
+    president: int
+    chancellor: int
+    elected: Optional[bool] = None
+    ja: int = 0
+    total: int = 0
+    votes: Dict[int, bool] = field(default_factory=dict)
+    enacted: Optional[str] = None
+    chaos: Optional[str] = None
+    investigated: Optional[int] = None
+
+    def describe(self, claims: List[Tuple[int, str]]) -> str:
+        line = f"Round {self.number}: President {self.president} nominated Chancellor {self.chancellor}"
+        if self.elected is not None:
+            line += f" — {'elected' if self.elected else 'rejected'} {self.ja}/{self.total}"
+            if self.votes:
+                ja = ", ".join(str(p) for p, v in sorted(self.votes.items()) if v) or "none"
+                nein = ", ".join(str(p) for p, v in sorted(self.votes.items()) if not v) or "none"
+                line += f" (Ja: {ja}; Nein: {nein})"
+        if self.enacted:
+            line += f"; enacted {self.enacted}"
+        if self.chaos:
+            line += f"; chaos enacted {self.chaos}"
+        if self.investigated is not None:
+            line += f"; President {self.president} investigated Player {self.investigated}"
+        if claims:
+            line += "\n  Claims: " + " | ".join(f'Player {p}: "{text}"' for p, text in claims)
+        return line
+
+class GameMemory:
+    """Public round records, folded per-player tallies and per-agent private notes for one game."""
+
+    def __init__(self, player_ids: List[int]):
+        self._lock = threading.Lock()
+        self._seen = 0
+        self.rounds: List[RoundRecord] = []
+        self._folded = 0
+        # (message count when made, player, text); a claim belongs to the round whose nomination is at or before it.
+        self.claims: List[Tuple[int, int, str]] = []
+        # Legislative-session claims waiting for the enactment message that makes them public.
+        self._held: List[Tuple[int, str]] = []
+        self.tallies: Dict[int, Counter] = {pid: Counter() for pid in player_ids}
+        self.notes: Dict[int, List[Tuple[int, str]]] = {pid: [] for pid in player_ids}
+        self._rendered: Tuple[int, str] = (-1, "")
+
+    def observe(self, state: dict) -> None:
+        """Parse the messages added since the last call, and attach the latest ballots to their round."""
+        messages = state.get("messages", [])
+        with self._lock:
+            if len(messages) <= self._seen:
+                return
+            for index, msg in enumerate(messages[self._seen:], self._seen):
+                self._ingest(index, msg)
+            self._seen = len(messages)
+            current = self.rounds[-1] if self.rounds else None
+            if current is not None and current.elected is not None and not current.votes and state.get("votes"):
+                current.votes = {int(p): bool(v) for p, v in state["votes"].items()}
+            while len(self.rounds) - self._folded > RECENT_ROUNDS:
+                self._fold(self.rounds[self._folded])
+                self._folded += 1
+
+    def _ingest(self, index: int, msg: str) -> None:
+        m = _NOMINATED.match(msg)
+        if m:
+            self.rounds.append(RoundRecord(len(self.rounds) + 1, index, int(m.group(1)), int(m.group(2))))
+            return
+        current = self.rounds[-1] if self.rounds else None
+        if current is None:
+            return
+        m = _VOTED.match(msg)
+        if m:
+            current.elected, current.ja, current.total = m.group(1) == "ELECTED", int(m.group(2)), int(m.group(3))
+            return
+        m = _ENACTED.match(msg)
+        if m:
+            current.enacted = m.group(1)
+            self.claims.extend((index, player, text) for player, text in self._held)
+            self._held = []
+            return
+        m = _CHAOS.match(msg)
+        if m:
+            current.chaos = m.group(1).upper()
+            return
+        m = _INVESTIGATED.match(msg)
+        if m:
+            current.investigated = int(m.group(2))
+
+    def _fold(self, record: RoundRecord) -> None:
+        """Add a round that dropped out of the recent window to the per-player tallies."""
+        president, chancellor = self.tallies[record.president], self.tallies[record.chancellor]
+        president["president"] += 1
+        chancellor["chancellor"] += 1
+        if record.elected:
+            president["elected_president"] += 1
+            chancellor["elected_chancellor"] += 1
+        if record.enacted:
+            president[f"{record.enacted.lower()}_as_president"] += 1
+            chancellor[f"{record.enacted.lower()}_as_chancellor"] += 1
+        for pid, vote in record.votes.items():
+            self.tallies[pid]["ja" if vote else "nein"] += 1
+
+    def claim(self, player: int, text: str, state: dict, legislative: bool = False) -> None:
+        """
+        Record a public statement; it shows in prompts rendered from later states, or for a
+        legislative one (President or Chancellor during the session) once the policy is enacted.
+        """
+        text = (text or "").strip()
+        if not text:
+            return
+        pending = _PENDING.get()
+        if pending is not None:
+            pending.append((self, "claim", (player, text, state, legislative)))
+            return
+        with self._lock:
+            if legislative:
+                self._held.append((player, text[:CLAIM_CHARS]))
+            else:
+                self.claims.append((len(state.get("messages", [])), player, text[:CLAIM_CHARS]))
+
+    def note(self, player: int, text: str, state: dict) -> None:
+        """Record something only `player` knows (during the round in progress)."""
+        pending = _PENDING.get()
+        if pending is not None:
+            pending.append((self, "note", (player, text, state)))
+            return
+        self.observe(state)
+        with self._lock:
+            self.notes[player].append((len(state.get("messages", [])), f"Round {len(self.rounds)}: {text}"))
+
+    def snapshot(self) -> dict:
+        """Everything observed and recorded so far, as plain JSON-able data."""
+        with self._lock:
+            return {
+                "seen": self._seen,
+                "folded": self._folded,
+                "rounds": [{**asdict(r), "votes": {str(pid): vote for pid, vote in r.votes.items()}} for r in self.rounds],
+                "claims": [list(c) for c in self.claims],
+                "held": [list(c) for c in self._held],
+                "tallies": {str(pid): dict(t) for pid, t in self.tallies.items()},
+                "notes": {str(pid): [list(n) for n in notes] for pid, notes in self.notes.items()},
+            }
+
+    def restore(self, snapshot: Optional[dict]) -> None:
+        """Continue from a snapshot() (e.g. of a checkpointed game being resumed); None leaves the memory as it is."""
+        if not snapshot:
+            return
+        with self._lock:
+            self._seen = snapshot["seen"]
+            self._folded = snapshot["folded"]
+            self.rounds = [RoundRecord(**{**r, "votes": {int(p): v for p, v in r["votes"].items()}}) for r in snapshot["rounds"]]
+            self.claims = [(at, player, text) for at, player, text in snapshot["claims"]]
+            self._held = [(player, text) for player, text in snapshot["held"]]
+            self.tallies = {int(pid): Counter(t) for pid, t in snapshot["tallies"].items()}
+            self.notes = {int(pid): [(at, text) for at, text in notes] for pid, notes in snapshot["notes"].items()}
+            self._rendered = (-1, "")
+
+    def _public(self, visible_at: int) -> str:
+        if self._rendered[0] == visible_at:
+            return self._rendered[1]
+        lines = []
+        if self._folded:
+            lines.append(f"Rounds 1-{self._folded} by player:")
+            for pid, t in sorted(self.tallies.items()):
+                lines.append(
+                    f"- Player {pid}: President {t['president']}x ({t['elected_president']} elected; enacted "
+                    f"{t['liberal_as_president']}L/{t['fascist_as_president']}F), Chancellor {t['chancellor']}x "
+                    f"({t['elected_chancellor']} elected; enacted {t['liberal_as_chancellor']}L/{t['fascist_as_chancellor']}F), "
+                    f"votes {t['ja']} Ja / {t['nein']} Nein"
+                )
+        recent = self.rounds[self._folded:]
+        # Ballots are cast concurrently, so claims arrive in any order; sorting keeps the prompt stable.
+        claims = sorted(self.claims)
+        for record, following in zip(recent, recent[1:] + [None]):
+            end = min(visible_at, following.start) if following is not None else visible_at
+            lines.append(record.describe([(p, text) for at, p, text in claims if record.start <= at < end]))
+        text = "\n".join(lines) if lines else "No rounds played yet."
+        self._rendered = (visible_at, text)
+        return text
+
+    def render(self, agent_id: int, state: dict) -> Tuple[str, str]:
+        """(public game summary, the agent's private notes) as of `state`."""
+        self.observe(state)
+        visible_at = len(state.get("messages", []))
+        with self._lock:
+            public = self._public(visible_at)
+            notes = [text for at, text in self.notes.get(agent_id, []) if at < visible_at]
+        return public, "\n".join(f"- {n}" for n in notes) if notes else "Nothing yet."
@@ -0,0 +1,239 @@
+"""Batched Monte Carlo engine for the 5-player ruleset in game.py.
+
+Thousands of games advance in lockstep as NumPy arrays, one round per step,
+driven by vectorized versions of the scripted baseline policies in
+agents/scripted.py. The deck is tracked by composition (Liberal/Fascist
+counts): it is only ever drawn from the top after a full shuffle, so drawing
+the top cards is the same as sampling without replacement.
+
+The rules mirror game.py exactly, including its ordering quirks (the
+President's discard lands after a reshuffle, chaos advances the presidency in
+both voting_node and check_win_node). `compare_with_engine` checks the outcome
+distribution against games played through the real nodes.
+
+    python montecarlo.py --games 200000 --check 2000
+"""
+import argparse
+import json
+import math
+import time
+from typing import Dict, Optional
+
+import numpy as np
+
+from agents.scripted import DEFAULT_POLICIES, RolePolicy
+from game_types import PLAYER_COUNT
+from log import log as logger
+
+LIBERAL, FASCIST, HITLER = 0, 1, 2
+ROLE_CODES = {"liberal": LIBERAL, "fascist": FASCIST, "hitler": HITLER}
+# Indexed by reason code; the strings match game_over_reason in game.py.
+REASONS = (
+    "5 Liberal policies enacted!",
+    "6 Fascist policies enacted!",
+    "Hitler elected as Chancellor after 3 fascist policies!",
+)
+WINNERS = ("liberals", "fascists", "fascists")
+
+def _policy_table(policies: Optional[Dict[str, RolePolicy]]) -> Dict[str, np.ndarray]:
+    """Per-role policy knobs as arrays indexed by role code."""
+    merged = {**DEFAULT_POLICIES, **(policies or {})}
+    by_code = [merged[role] for role, _ in sorted(ROLE_CODES.items(), key=lambda kv: kv[1])]
+    return {field: np.array([getattr(p, field) for p in by_code]) for field in RolePolicy.__dataclass_fields__}
+
+def _draw(rng: np.random.Generator, lib: np.ndarray, fas: np.ndarray, k: int) -> np.ndarray:
+    """Number of Liberal tiles among k drawn without replacement from decks holding lib/fas tiles."""
+    got = np.zeros_like(lib)
+    lib, fas = lib.copy(), fas.copy()
+    for _ in range(k):
+        is_lib = rng.random(lib.shape) * np.maximum(lib + fas, 1) < lib
+        got += is_lib
+        lib -= is_lib
+        fas -= ~is_lib
+    return got
+
+def simulate_batch(games: int, seed: int = 0, policies: Optional[Dict[str, RolePolicy]] = None) -> Dict[str, np.ndarray]:
+    """Play `games` games in lockstep. Returns per-game reason code, winner flag (1 = fascists) and rounds."""
+    rng = np.random.default_rng(seed)
+    pol = _policy_table(policies)
+    n = games
+    ar = np.arange(n)
+    seats = np.arange(PLAYER_COUNT)
+
+    roles = rng.permuted(np.tile([LIBERAL, LIBERAL, LIBERAL, FASCIST, HITLER], (n, 1)), axis=1)
+    fascist_seat = (roles == FASCIST).argmax(1)
+    hitler_seat = (roles == HITLER).argmax(1)
+    # mate[g, s]: the known teammate of seat s (Fascist <-> Hitler), -1 for Liberals.
+    mate = np.full((n, PLAYER_COUNT), -1)
+    mate[ar, fascist_seat] = hitler_seat
+    mate[ar, hitler_seat] = fascist_seat
+
+    deck_lib = np.full(n, 6)
+    deck_fas = np.full(n, 11)
+    disc_lib = np.zeros(n, dtype=int)
+    disc_fas = np.zeros(n, dtype=int)
+    board_lib = np.zeros(n, dtype=int)
+    board_fas = np.zeros(n, dtype=int)
+    president = rng.integers(0, PLAYER_COUNT, n)
+    prev_pres = np.full(n, -1)
+    prev_chanc = np.full(n, -1)
+    tracker = np.zeros(n, dtype=int)
+    investigated = np.zeros(n, dtype=int)
+    rounds = np.zeros(n, dtype=int)
+    reason = np.full(n, -1)
+    active = np.ones(n, dtype=bool)
+
+    def reshuffle(mask: np.ndarray) -> None:
+        short = mask & (deck_lib + deck_fas < 3)
+        deck_lib[short] += disc_lib[short]
+        deck_fas[short] += disc_fas[short]
+        disc_lib[short] = 0
+        disc_fas[short] = 0
+
+    while active.any():
+        rounds += active
+
+        # Nomination: term limits, then a known teammate or a uniform pick among the eligible.
+        eligible = (seats != president[:, None]) & (seats != prev_pres[:, None]) & (seats != prev_chanc[:, None])
+        pres_role = roles[ar, president]
+        pres_mate = mate[ar, president]
+        mate_ok = (pres_mate >= 0) & eligible[ar, pres_mate.clip(0)]
+        use_mate = mate_ok & (rng.random(n) < pol["nominate_teammate"][pres_role])
+        uniform = np.where(eligible, rng.random((n, PLAYER_COUNT)), -1.0).argmax(1)
+        chancellor = np.where(use_mate, pres_mate, uniform)
+
+        # Vote: members of the government vote for themselves, the rest by role and board.
+        in_gov = (seats == president[:, None]) | (seats == chancellor[:, None])
+        mate_in_gov = (mate >= 0) & ((mate == president[:, None]) | (mate == chancellor[:, None]))
+        p_ja = np.where(board_fas[:, None] >= 3, pol["vote_ja_late"][roles], pol["vote_ja"][roles])
+        p_ja = np.where(mate_in_gov, pol["vote_ja_teammate"][roles], p_ja)
+        p_ja = np.where(in_gov, 1.0, p_ja)
+        elected = (rng.random((n, PLAYER_COUNT)) < p_ja).sum(1) > PLAYER_COUNT / 2
+
+        hitler_elected = active & elected & (board_fas >= 3) & (roles[ar, chancellor] == HITLER)
+        reason[hitler_elected] = 2
+        legislate = active & elected & ~hitler_elected
+        rejected = active & ~elected
+
+        # Legislative session: President draws 3 (reshuffling before discarding), discards 1, passes 2.
+        tracker[legislate] = 0
+        drawn_lib = np.where(legislate, _draw(rng, deck_lib, deck_fas, 3), 0)
+        deck_lib -= drawn_lib
+        deck_fas -= np.where(legislate, 3 - drawn_lib, 0)
+        reshuffle(legislate)
+        promote = rng.random(n) < pol["promote_own_team"][pres_role]
+        prefer_discard_lib = promote != (pres_role == LIBERAL)
+        discard_lib = np.where(prefer_discard_lib, drawn_lib > 0, drawn_lib == 3)
+        passed_lib = drawn_lib - discard_lib
+        disc_lib += legislate & discard_lib
+        disc_fas += legislate & ~discard_lib
+
+        # Chancellor enacts one of the two and discards the other.
+        chanc_role = roles[ar, chancellor]
+        promote = rng.random(n) < pol["promote_own_team"][chanc_role]
+        prefer_enact_lib = promote == (chanc_role == LIBERAL)
+        enact_lib = np.where(prefer_enact_lib, passed_lib > 0, passed_lib == 2)
+        board_lib += legislate & enact_lib
+        board_fas += legislate & ~enact_lib
+        disc_lib += legislate & (passed_lib - enact_lib).astype(bool)
+        disc_fas += legislate & (1 - passed_lib + enact_lib).astype(bool)
+        prev_pres = np.where(legislate, president, prev_pres)
+        prev_chanc = np.where(legislate, chancellor, prev_chanc)
+
+        # Failed election: advance the tracker; on the third failure the top policy is enacted.
+        tracker += rejected
+        chaos = rejected & (tracker >= 3)
+        top_lib = np.where(chaos, _draw(rng, deck_lib, deck_fas, 1), 0)
+        deck_lib -= top_lib
+        deck_fas -= chaos & (top_lib == 0)
+        board_lib += top_lib
+        board_fas += chaos & (top_lib == 0)
+        reshuffle(chaos)
+        tracker[chaos] = 0
+        president = np.where(rejected, (president + 1) % PLAYER_COUNT, president)
+
+        # check_win_node after a policy was enacted.
+        check = legislate | chaos
+        liberal_win = check & (board_lib >= 5)
+        fascist_win = check & ~liberal_win & (board_fas >= 6)
+        reason[liberal_win] = 0
+        reason[fascist_win] = 1
+        carry_on = check & ~liberal_win & ~fascist_win
+        investigate = carry_on & (board_fas == 3) & (prev_pres >= 0) & (investigated < PLAYER_COUNT)
+        investigated += investigate
+        president = np.where(carry_on, (president + 1) % PLAYER_COUNT, president)
+
+        active &= reason < 0
+
+    return {"reason": reason, "fascists_win": (reason > 0).astype(int), "rounds": rounds}
+
+def _wilson(successes: int, trials: int, z: float) -> tuple:
+    if trials == 0:
+        return 0.0, 0.0
+    p = successes / trials
+    centre = (p + z * z / (2 * trials)) / (1 + z * z / trials)
+    spread = z * math.sqrt(p * (1 - p) / trials + z * z / (4 * trials * trials)) / (1 + z * z / trials)
+    return centre - spread, centre + spread
+
+def estimate(games: int, seed: int = 0, policies: Optional[Dict[str, RolePolicy]] = None, z: float = 1.96) -> dict:
+    """Win-rate and win-reason estimates with Wilson confidence intervals (z = 1.96 for 95%)."""
+    start = time.perf_counter()
+    out = simulate_batch(games, seed, policies)
+    elapsed = time.perf_counter() - start
+    fascist_wins = int(out["fascists_win"].sum())
+    reason_counts = np.bincount(out["reason"], minlength=len(REASONS))
+    lo, hi = _wilson(games - fascist_wins, games, z)
+    return {
+        "games": games,
+        "seconds": elapsed,
+        "games_per_second": games / elapsed if elapsed else 0.0,
+        "win_rate": {"liberals": (games - fascist_wins) / games, "fascists": fascist_wins / games},
+        "liberal_win_ci": [lo, hi],
+        "win_reasons": {
+            text: {"rate": int(c) / games, "ci": list(_wilson(int(c), games, z))} for text, c in zip(REASONS, reason_counts)
+        },
+        "avg_rounds": float(out["rounds"].mean()),
+    }
+
+def compare_with_engine(games: int, seed: int = 0, policies: Optional[Dict[str, RolePolicy]] = None) -> dict:
+    """
+    Chi-square homogeneity test of win reasons between this engine and the per-game
+    engine (game.py nodes with scripted agents). With 3 reasons the test has 2 degrees
+    of freedom, whose survival function is exp(-x / 2).
+    """
+    from simulate import play_scripted
+    from log import muted
+
+    batch = np.bincount(simulate_batch(games, seed, policies)["reason"], minlength=len(REASONS))
+    nodes = np.zeros(len(REASONS), dtype=int)
+    with muted():
+        for i in range(games):
+            nodes[REASONS.index(play_scripted(seed + i, policies)["game_over_reason"])] += 1
+    table = np.vstack([batch, nodes]).astype(float)
+    expected = table.sum(0, keepdims=True) * table.sum(1, keepdims=True) / table.sum()
+    keep = expected.sum(0) > 0
+    chi2 = float((((table - expected) ** 2)[:, keep] / expected[:, keep]).sum())
+    dof = int(keep.sum()) - 1
+    p_value = math.exp(-chi2 / 2) if dof == 2 else (math.erfc(math.sqrt(chi2 / 2)) if dof == 1 else 1.0)
+    return {
+        "games": games,
+        "montecarlo": dict(zip(REASONS, batch.tolist())),
+        "engine": dict(zip(REASONS, nodes.tolist())),
+        "chi2": chi2,
+        "dof": dof,
+        "p_value": p_value,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Vectorized Monte Carlo estimates for scripted 5-player games.")
+    parser.add_argument("--games", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--check", type=int, default=0, help="also compare N games against the per-game engine")
+    args = parser.parse_args()
+    report = {"estimate": estimate(args.games, args.seed)}
+    if args.check:
+        report["check"] = compare_with_engine(args.check, args.seed)
+    logger(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -42,7 +42,11 @@ Legal/ethic note:
 - Players may lie about hidden information; the only forced truth scenarios are game-ending (Hitler revealed by execution or elected Chancellor after 3 fascist policies).
 """
 
-LIBERAL_PROMPT_TEMPLATE = """You are Player {agent_id} (Liberal). Use only the provided public context.
+# Prompts are a system message that is fixed for a player for the whole game (persona,
+# rules, strategy, what they know about the others) followed by a short per-turn user
+# message, so providers can cache the system part.
+
+LIBERAL_SYSTEM_TEMPLATE = """You are Player {agent_id} (Liberal). Use only the provided public context.
 
 RULES SUMMARY
 {rules}
@@ -53,28 +57,16 @@ SHORT STRATEGY - LIBERALS
 - Nomination: Prefer players with recent liberal outcomes; obey eligibility rules.
 - Voting: Pass reasonable governments to gather evidence; block suspicious governments.
 
-PUBLIC GAME STATE
-- Liberal policies enacted: {liberal_policies}
-- Fascist policies enacted: {fascist_policies}
-- Deck size: {deck_size}  Discard size: {discard_size}
-- Players (visible to you): {players_list}
-
-RECENT PUBLIC HISTORY (most recent messages first):
-{recent_history}
-
-TASK
-{action}
+PLAYERS (visible to you)
+{players_list}
 
 OUTPUT RULES
 - Do NOT reveal secret role cards.
 - Be realistic: do not claim you received or discarded cards that are impossible given the provided drawn/passed cards.
 - Use 'public_statement' for short table-facing claims and 'private_thoughts' for internal chain-of-thought.
-
-FORMAT INSTRUCTIONS
-{format_instructions}
 """
 
-FASCIST_PROMPT_TEMPLATE = """You are Player {agent_id} (Fascist). Use only the provided public context and your private knowledge of teammates.
+FASCIST_SYSTEM_TEMPLATE = """You are Player {agent_id} (Fascist). Use only the provided public context and your private knowledge of teammates.
 
 RULES SUMMARY
 {rules}
@@ -84,11 +76,25 @@ SHORT STRATEGY - FASCISTS
 - Playstyle: Blend in, sow doubt, protect Hitler; avoid blatantly impossible claims.
 - Nomination/Voting: Prefer plausible narratives; sacrifice short-term gains to build trust when useful.
 
-PUBLIC GAME STATE
+PLAYERS (visible to you)
+{players_list}
+
+OUTPUT RULES
+- You may use plausible deception, but DO NOT claim impossible receipts/discards; the system will validate and annotate inconsistent claims.
+- Do NOT reveal non-Fascist secret roles.
+"""
+
+TURN_TEMPLATE = """PUBLIC GAME STATE
 - Liberal policies enacted: {liberal_policies}
 - Fascist policies enacted: {fascist_policies}
 - Deck size: {deck_size}  Discard size: {discard_size}
-- Players (visible to you): {players_list}
+- Policy tiles not yet enacted (deck + discard + in hand): {unenacted_liberal} Liberal, {unenacted_fascist} Fascist
+
+GAME SO FAR (earlier rounds as per-player totals, recent rounds in full)
+{game_summary}
+
+YOUR PRIVATE KNOWLEDGE
+{private_notes}
 
 RECENT PUBLIC HISTORY (most recent messages first):
 {recent_history}
@@ -96,10 +102,14 @@ RECENT PUBLIC HISTORY (most recent messages first):
 TASK
 {action}
 
-OUTPUT RULES
-- You may use plausible deception, but DO NOT claim impossible receipts/discards; the system will validate and annotate inconsistent claims.
-- Do NOT reveal non-Fascist secret roles.
-
 FORMAT INSTRUCTIONS
 {format_instructions}
-"""
\ No newline at end of file
+"""
+
+# Public statements for decisions with a single legal outcome, which are made without the model.
+FORCED_STATEMENTS = {
+    "nominate": "Player {target} is the only eligible Chancellor.",
+    "legislate_president": "I drew three {policy} policies.",
+    "legislate_chancellor": "I received two {policy} policies.",
+    "executive": "Player {target} is the only player left to investigate.",
+}
@@ -0,0 +1,146 @@
+"""Chat-model providers, selected by configuration.
+
+PROVIDERS maps a name to a factory building the bare chat client for a model name;
+main.make_llm wraps it in the batching and response-cache layers either way. Every
+client exposes `with_structured_output(schema).invoke(prompt, config)`.
+
+- gemini: ChatGoogleGenerativeAI with provider context caching (GEMINI_API_KEY).
+- openai: any OpenAI-compatible chat-completions endpoint (vLLM, llama.cpp, Ollama,
+  OpenAI itself) at LLM_BASE_URL, with optional LLM_API_KEY. Structured output is
+  requested as a JSON schema response format.
+- local: the bundled stand-in server (fake_server.py) started in-process, talked to
+  over HTTP like "openai"; for offline and load-test runs. LOCAL_LLM_LATENCY,
+  LOCAL_LLM_429_RATE, LOCAL_LLM_FAILURE_RATE, LOCAL_LLM_RPM and LOCAL_LLM_SEED set
+  its latency distribution and injected faults (see fake_server.py).
+
+The provider comes from LLM_PROVIDER (default gemini) and the model name from
+LLM_MODEL (GEMINI_MODEL and MODEL are still read). HTTP errors are raised with their
+status code in the message, so ratelimit.classify() retries 429s and 5xx responses.
+"""
+import json
+import os
+import uuid
+from typing import Any, Callable, Dict, List, Optional
+
+import httpx
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, LLMResult
+
+DEFAULT_PROVIDER = "gemini"
+DEFAULT_MODEL = "gemini-2.5-flash"
+
+_ROLES = {"system": "system", "human": "user", "ai": "assistant"}
+
+class OpenAICompatibleLLM:
+    """Minimal structured-output client for an OpenAI-compatible chat-completions endpoint."""
+
+    def __init__(self, base_url: str, model: str, api_key: Optional[str] = None, timeout: float = 120.0, temperature: Optional[float] = None):
+        self.base_url = base_url.rstrip("/")
+        self.model = model
+        self.temperature = temperature
+        headers = {"Authorization": f"Bearer {api_key}"} if api_key else {}
+        self.client = httpx.Client(base_url=self.base_url, headers=headers, timeout=timeout)
+
+    def with_structured_output(self, schema, **kwargs):
+        return _OpenAIStructured(self, schema)
+
+    def complete(self, messages: List[dict], schema: type) -> dict:
+        body: Dict[str, Any] = {
+            "model": self.model,
+            "messages": messages,
+            "response_format": {"type": "json_schema", "json_schema": {"name": schema.__name__, "schema": schema.model_json_schema()}},
+        }
+        if self.temperature is not None:
+            body["temperature"] = self.temperature
+        try:
+            response = self.client.post("/chat/completions", json=body)
+        except httpx.TimeoutException as e:
+            raise TimeoutError(f"{self.base_url}: {e}") from e
+        except httpx.TransportError as e:
+            raise ConnectionError(f"{self.base_url}: {e}") from e
+        if response.status_code >= 400:
+            raise RuntimeError(f"HTTP {response.status_code} from {self.base_url}: {response.text[:300]}")
+        return response.json()
+
+class _OpenAIStructured:
+    def __init__(self, llm: OpenAICompatibleLLM, schema: type):
+        self.llm = llm
+        self.schema = schema
+
+    def invoke(self, prompt: Any, *args, **kwargs):
+        config = kwargs.get("config") or (args[0] if args else None) or {}
+        messages = [{"role": _ROLES.get(m.type, "user"), "content": m.content} for m in prompt] if isinstance(prompt, list) else [{"role": "user", "content": str(prompt)}]
+        data = self.llm.complete(messages, self.schema)
+        content = data["choices"][0]["message"].get("content") or ""
+        result = self.schema.model_validate(json.loads(_strip_fence(content)))
+        callbacks = config.get("callbacks") or []
+        if callbacks:
+            usage = data.get("usage") or {}
+            meta = {"input_tokens": usage.get("prompt_tokens", 0), "output_tokens": usage.get("completion_tokens", 0), "total_tokens": usage.get("total_tokens", 0)}
+            response = LLMResult(generations=[[ChatGeneration(message=AIMessage(content=content, usage_metadata=meta))]])
+            for callback in callbacks:
+                callback.on_llm_end(response, run_id=uuid.uuid4())
+        return result
+
+def _strip_fence(content: str) -> str:
+    """Some local servers wrap JSON answers in a Markdown code fence."""
+    text = content.strip()
+    if text.startswith("```"):
+        text = text.split("\n", 1)[1] if "\n" in text else ""
+        text = text.rsplit("```", 1)[0]
+    return text
+
+def _gemini(model: str) -> Any:
+    api_key = os.environ.get("GEMINI_API_KEY")
+    if not api_key:
+        raise RuntimeError("GEMINI_API_KEY environment variable must be set for the gemini provider")
+    from langchain_google_genai import ChatGoogleGenerativeAI
+    from context_cache import context_cache_from_env
+    return context_cache_from_env(ChatGoogleGenerativeAI(model=model, google_api_key=api_key))
+
+def _openai(model: str) -> Any:
+    base_url = os.environ.get("LLM_BASE_URL")
+    if not base_url:
+        raise RuntimeError("LLM_BASE_URL environment variable must be set for the openai provider (e.g. http://localhost:8000/v1)")
+    temperature = os.environ.get("LLM_TEMPERATURE")
+    return OpenAICompatibleLLM(base_url, model, api_key=os.environ.get("LLM_API_KEY"), timeout=float(os.environ.get("LLM_TIMEOUT", "120")), temperature=float(temperature) if temperature else None)
+
+_local_server = None
+
+def _local(model: str) -> Any:
+    global _local_server
+    if _local_server is None:
+        from fake_server import serve
+        _local_server = serve(
+            latency=os.environ.get("LOCAL_LLM_LATENCY", "fixed:0"),
+            rate_429=float(os.environ.get("LOCAL_LLM_429_RATE", "0")),
+            failure_rate=float(os.environ.get("LOCAL_LLM_FAILURE_RATE", "0")),
+            rpm=float(os.environ.get("LOCAL_LLM_RPM", "0")),
+            seed=int(os.environ.get("LOCAL_LLM_SEED", "0")),
+        )
+    host, port = _local_server.server_address[:2]
+    return OpenAICompatibleLLM(f"http://{host}:{port}/v1", model, timeout=float(os.environ.get("LLM_TIMEOUT", "120")))
+
+PROVIDERS: Dict[str, Callable[[str], Any]] = {
+    "gemini": _gemini,
+    "openai": _openai,
+    "local": _local,
+}
+
+def register(name: str, factory: Callable[[str], Any]) -> None:
+    """Add a provider: `factory(model)` returns a client with with_structured_output()."""
+    PROVIDERS[name] = factory
+
+def provider_name() -> str:
+    return os.environ.get("LLM_PROVIDER") or DEFAULT_PROVIDER
+
+def model_name() -> str:
+    return os.environ.get("LLM_MODEL") or os.environ.get("GEMINI_MODEL") or os.environ.get("MODEL") or DEFAULT_MODEL
+
+def chat_model(model: str, provider: Optional[str] = None) -> Any:
+    """The bare chat client for `model` from the configured (or given) provider."""
+    name = provider or provider_name()
+    factory = PROVIDERS.get(name)
+    if factory is None:
+        raise RuntimeError(f"Unknown LLM provider {name!r} (LLM_PROVIDER); choose from {', '.join(sorted(PROVIDERS))}")
+    return factory(model)
@@ -0,0 +1,177 @@
+"""Shared rate limiting and retry for model calls.
+
+One RateLimiter is shared by every agent (and every game in the process). It paces
+requests with a token bucket sized to the quota, retries failures with jittered
+exponential backoff chosen by error class, and gives each decision a deadline after
+which the caller falls back to a default move. A 429 pauses the whole bucket, not
+just the caller, so concurrent agents back off together.
+"""
+import os
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional
+
+from log import WARNING, log as logger
+from tracing import get_tracer
+
+tracer = get_tracer(__name__)
+
+class RetriesExhausted(Exception):
+    """Raised when a call could not succeed within its attempts or deadline; callers use a fallback."""
+
+def classify(error: Exception) -> str:
+    """'rate_limit', 'transient' or 'fatal'. Fatal errors are re-raised immediately."""
+    text = str(error).lower()
+    if "429" in text or "rate limit" in text or "resource_exhausted" in text or "resource exhausted" in text:
+        return "rate_limit"
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return "transient"
+    if any(marker in text for marker in ("500", "502", "503", "504", "unavailable", "deadline exceeded", "timed out", "timeout")):
+        return "transient"
+    return "fatal"
+
+@dataclass(frozen=True)
+class Backoff:
+    base: float
+    cap: float
+    factor: float = 2.0
+
+    def delay(self, attempt: int, rng: random.Random) -> float:
+        """Full-jitter exponential backoff for the given 0-based retry attempt."""
+        return rng.uniform(0, min(self.cap, self.base * self.factor ** attempt))
+
+BACKOFF = {
+    "rate_limit": Backoff(base=4.0, cap=60.0),
+    "transient": Backoff(base=1.0, cap=15.0),
+}
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens per second up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _wait_time(self, now: float) -> float:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        if now < self._paused_until:
+            return self._paused_until - now
+        if self._tokens >= 1:
+            return 0.0
+        return (1 - self._tokens) / self.rate
+
+    def acquire(self, deadline: Optional[float] = None) -> float:
+        """Take one token, sleeping as needed. Returns seconds waited; raises RetriesExhausted past the deadline."""
+        if self.rate <= 0:
+            return 0.0
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                wait = self._wait_time(now)
+                if wait <= 0:
+                    self._tokens -= 1
+                    return waited
+            if deadline is not None and now + wait > deadline:
+                raise RetriesExhausted("deadline reached while waiting for rate limit quota")
+            time.sleep(wait)
+            waited += wait
+
+    def pause(self, seconds: float) -> None:
+        """Stop handing out tokens for `seconds` (after a 429) and drop the burst allowance."""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self._tokens = min(self._tokens, 0.0)
+
+class RateLimiter:
+    def __init__(self, requests_per_minute: float = 60.0, burst: int = 5, max_attempts: int = 5, deadline: float = 180.0, seed: Optional[int] = None):
+        self.bucket = TokenBucket(requests_per_minute / 60.0, burst)
+        self.max_attempts = max_attempts
+        self.deadline = deadline
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.counters: Dict[str, float] = {
+            "calls": 0,
+            "retries": 0,
+            "rate_limited": 0,
+            "transient_errors": 0,
+            "exhausted": 0,
+            "throttled_seconds": 0.0,
+            "backoff_seconds": 0.0,
+        }
+
+    def _count(self, key: str, amount: float = 1) -> None:
+        with self._lock:
+            self.counters[key] += amount
+
+    def call(self, fn: Callable[[], Any], deadline: Optional[float] = None, report: Optional[Dict[str, float]] = None) -> Any:
+        """
+        Run fn under the shared quota, retrying rate-limit and transient errors until it
+        succeeds, attempts run out, or `deadline` seconds pass (default: self.deadline).
+        If `report` is given, this call's retries and throttled seconds are added to it.
+        """
+        stop = time.monotonic() + (self.deadline if deadline is None else deadline)
+        self._count("calls")
+        for attempt in range(self.max_attempts):
+            throttled = self.bucket.acquire(stop)
+            self._count("throttled_seconds", throttled)
+            if throttled:
+                tracer.start_span("llm.throttle", start_time=time.time_ns() - int(throttled * 1e9)).end()
+            if report is not None:
+                report["throttled_seconds"] = report.get("throttled_seconds", 0.0) + throttled
+            try:
+                with tracer.start_as_current_span("llm.attempt", {"llm.attempt": attempt + 1}):
+                    return fn()
+            except Exception as e:
+                kind = classify(e)
+                if kind == "fatal":
+                    raise
+                self._count("rate_limited" if kind == "rate_limit" else "transient_errors")
+                if attempt == self.max_attempts - 1:
+                    break
+                delay = BACKOFF[kind].delay(attempt, self._rng)
+                if time.monotonic() + delay > stop:
+                    break
+                if kind == "rate_limit":
+                    self.bucket.pause(delay)
+                logger(f"[RETRY] {kind.replace('_', ' ').capitalize()} error ({e.__class__.__name__}), waiting {delay:.1f}s before retry {attempt + 2}/{self.max_attempts}...", level=WARNING)
+                self._count("retries")
+                if report is not None:
+                    report["retries"] = report.get("retries", 0) + 1
+                self._count("backoff_seconds", delay)
+                with tracer.start_as_current_span("llm.backoff", {"llm.error": kind}):
+                    time.sleep(delay)
+        self._count("exhausted")
+        raise RetriesExhausted(f"no answer after {attempt + 1} attempt(s)")
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return dict(self.counters)
+
+_limiter: Optional[RateLimiter] = None
+_limiter_lock = threading.Lock()
+
+def get_limiter() -> RateLimiter:
+    """Process-wide limiter configured from LLM_RPM, LLM_BURST, LLM_MAX_ATTEMPTS and LLM_DECISION_DEADLINE."""
+    global _limiter
+    with _limiter_lock:
+        if _limiter is None:
+            _limiter = RateLimiter(
+                requests_per_minute=float(os.environ.get("LLM_RPM", "60")),
+                burst=int(os.environ.get("LLM_BURST", "5")),
+                max_attempts=int(os.environ.get("LLM_MAX_ATTEMPTS", "5")),
+                deadline=float(os.environ.get("LLM_DECISION_DEADLINE", "180")),
+            )
+        return _limiter
+
+def set_limiter(limiter: Optional[RateLimiter]) -> None:
+    global _limiter
+    with _limiter_lock:
+        _limiter = limiter
@@ -0,0 +1,301 @@
+"""Record agent decisions and replay games from the record without calling the LLM.
+
+A GameRecord holds the game's seed and every agent decision in the order it was made:
+nominee, ballot, president's passed policies, enacted policy and investigation target,
+plus the raw structured model output when there was one. Replaying re-creates the
+game from the seed and drives build_workflow() with ReplayAgents that answer from the
+record. With fork_at=N, decisions from step N onwards are made live by real agents.
+
+Decisions are looked up by (kind, player, occurrence) — "Player 2's third vote" — so
+ballots cast concurrently replay correctly whatever order they finished in.
+
+    python replay.py logs/run_20250101_120000.decisions.json
+    python replay.py game.decisions.json --fork-at 25 --backend scripted
+"""
+import argparse
+import json
+from abc import ABC, abstractmethod
+import random
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from game import create_initial_state
+from agents import initialize_agents
+from graph import build_workflow
+from log import log as logger
+
+class ReplayMismatch(Exception):
+    """Raised when a replayed game asks for a decision the record does not contain (or contradicts)."""
+
+@dataclass
+class Decision:
+    step: int
+    kind: str
+    player: int
+    occurrence: int
+    value: Any
+    raw: Optional[dict] = None
+
+@dataclass
+class GameRecord:
+    seed: int
+    backend: str = "llm"
+    model: Optional[str] = None
+    decisions: List[Decision] = field(default_factory=list)
+    winner: Optional[str] = None
+    reason: Optional[str] = None
+
+    def __post_init__(self):
+        self._lock = threading.Lock()
+        self._index: Dict[Tuple[str, int, int], Decision] = {(d.kind, d.player, d.occurrence): d for d in self.decisions}
+
+    def add(self, kind: str, player: int, occurrence: int, value: Any, raw: Optional[dict]) -> Decision:
+        with self._lock:
+            decision = Decision(len(self.decisions), kind, player, occurrence, value, raw)
+            self.decisions.append(decision)
+            self._index[(kind, player, occurrence)] = decision
+            # Ballots may be cast concurrently; keep each round's ballots in player order so step numbers are stable.
+            i = len(self.decisions) - 1
+            while i > 0 and kind == "vote" and self.decisions[i - 1].kind == "vote" and self.decisions[i - 1].player > player:
+                prev = self.decisions[i - 1]
+                self.decisions[i - 1], self.decisions[i] = decision, prev
+                decision.step, prev.step = prev.step, decision.step
+                i -= 1
+            return decision
+
+    def lookup(self, kind: str, player: int, occurrence: int) -> Optional[Decision]:
+        return self._index.get((kind, player, occurrence))
+
+    def finish(self, state: dict) -> None:
+        self.winner = state.get("winner")
+        self.reason = state.get("game_over_reason")
+
+    def to_dict(self) -> dict:
+        return {
+            "seed": self.seed,
+            "backend": self.backend,
+            "model": self.model,
+            "winner": self.winner,
+            "reason": self.reason,
+            "decisions": [asdict(d) for d in self.decisions],
+        }
+
+    def save(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as fh:
+            json.dump(self.to_dict(), fh, indent=1)
+
+    @classmethod
+    def load(cls, path: str) -> "GameRecord":
+        with open(path, encoding="utf-8") as fh:
+            data = json.load(fh)
+        decisions = [Decision(**d) for d in data.pop("decisions", [])]
+        return cls(decisions=decisions, **data)
+
+# Structured outputs of the decision in progress. A context variable rather than a thread
+# local: speculative decisions run on pool threads in a copy of the caller's context.
+_RAW: ContextVar[Optional[List[Any]]] = ContextVar("replay_raw", default=None)
+
+@contextmanager
+def _capturing() -> Iterator[List[Any]]:
+    """Collect the structured outputs of model calls made inside the block (and in contexts copied from it)."""
+    outputs: List[Any] = []
+    token = _RAW.set(outputs)
+    try:
+        yield outputs
+    finally:
+        _RAW.reset(token)
+
+class _RawCapture:
+    """Wraps an LLM client and reports each structured output to the enclosing _capturing() block."""
+
+    def __init__(self, llm: Any):
+        self.llm = llm
+
+    def with_structured_output(self, schema, **kwargs):
+        return _CapturingRunnable(self.llm.with_structured_output(schema, **kwargs))
+
+    def __getattr__(self, name):
+        return getattr(self.llm, name)
+
+class _CapturingRunnable:
+    def __init__(self, runnable: Any):
+        self.runnable = runnable
+
+    def invoke(self, *args, **kwargs):
+        result = self.runnable.invoke(*args, **kwargs)
+        outputs = _RAW.get()
+        if outputs is not None:
+            outputs.append(result.model_dump() if hasattr(result, "model_dump") else result)
+        return result
+
+class _DecisionAgent(ABC):
+    """Common plumbing: exposes the wrapped agent's identity and counts decisions per kind."""
+
+    def __init__(self, agent: Any):
+        self.agent = agent
+        self.agent_id = agent.agent_id
+        self.role = agent.role
+        self.team = agent.team
+        self._counts: Dict[str, int] = defaultdict(int)
+
+    def _next(self, kind: str) -> int:
+        occurrence = self._counts[kind]
+        self._counts[kind] += 1
+        return occurrence
+
+    @abstractmethod
+    def _decide(self, kind: str, state: dict) -> Any:
+        """Make (or look up) the `kind` decision ("vote", "nominate", ...) for `state`."""
+
+    def nominate(self, state: dict) -> int:
+        return self._decide("nominate", state)
+
+    def vote(self, state: dict) -> bool:
+        return self._decide("vote", state)
+
+    def president_legislate(self, state: dict) -> List[str]:
+        return self._decide("president_legislate", state)
+
+    def chancellor_legislate(self, state: dict) -> str:
+        return self._decide("chancellor_legislate", state)
+
+    def investigate_player(self, state: dict) -> int:
+        return self._decide("investigate_player", state)
+
+    def speculate_president_legislate(self, state: dict) -> None:
+        speculate = getattr(self.agent, "speculate_president_legislate", None)
+        if speculate is not None:
+            speculate(state)
+
+    def cancel_speculation(self) -> None:
+        cancel = getattr(self.agent, "cancel_speculation", None)
+        if cancel is not None:
+            cancel()
+
+class RecordingAgent(_DecisionAgent):
+    """Passes decisions through to an agent and appends each one to a GameRecord."""
+
+    def __init__(self, agent: Any, record: GameRecord):
+        super().__init__(agent)
+        self.record = record
+        # A resumed game continues the record: count this player's earlier decisions.
+        for d in record.decisions:
+            if d.player == self.agent_id:
+                self._counts[d.kind] = max(self._counts[d.kind], d.occurrence + 1)
+        inner = agent
+        while getattr(inner, "llm", None) is None and isinstance(inner, _DecisionAgent):
+            inner = inner.agent
+        if getattr(inner, "llm", None) is not None:
+            inner.llm = _RawCapture(inner.llm)
+        # (president_legislate occurrence, outputs) of the speculation in flight.
+        self._speculated: Optional[Tuple[int, List[Any]]] = None
+
+    def _decide(self, kind: str, state: dict) -> Any:
+        occurrence = self._next(kind)
+        with _capturing() as outputs:
+            value = getattr(self.agent, kind)(state)
+        if kind == "president_legislate":
+            speculated, self._speculated = self._speculated, None
+            if not outputs and speculated is not None and speculated[0] == occurrence:
+                # Prefetched during the vote: the model answered on the speculation's thread.
+                outputs = speculated[1]
+        self.record.add(kind, self.agent_id, occurrence, value, outputs[-1] if outputs else None)
+        return value
+
+    def speculate_president_legislate(self, state: dict) -> None:
+        with _capturing() as outputs:
+            super().speculate_president_legislate(state)
+        self._speculated = (self._counts["president_legislate"], outputs)
+
+    def cancel_speculation(self) -> None:
+        self._speculated = None
+        super().cancel_speculation()
+
+class ReplayAgent(_DecisionAgent):
+    """
+    Answers from a GameRecord for decisions recorded before step `fork_at`, and asks the
+    live agent for everything after. With check=True the live agent is also consulted for
+    replayed steps and must agree (scripted agents draw on the game RNG, so they have to
+    run to keep it in step).
+    """
+
+    def __init__(self, agent: Any, record: GameRecord, fork_at: Optional[int] = None, live: bool = False, check: bool = False):
+        super().__init__(agent)
+        self.source = record
+        self.fork_at = len(record.decisions) if fork_at is None else fork_at
+        self.live = live
+        self.check = check
+
+    def _decide(self, kind: str, state: dict) -> Any:
+        occurrence = self._next(kind)
+        decision = self.source.lookup(kind, self.agent_id, occurrence)
+        if decision is not None and decision.step < self.fork_at:
+            value = decision.value
+            if self.check:
+                live_value = getattr(self.agent, kind)(state)
+                if live_value != value:
+                    raise ReplayMismatch(f"step {decision.step}: Player {self.agent_id} {kind} was {value!r}, live agent chose {live_value!r}")
+            statement = (decision.raw or {}).get("public_statement")
+            logger(f"[REPLAY] Step {decision.step}: Player {self.agent_id} {kind} -> {value}" + (f" ({statement})" if statement else ""))
+            return value
+        if not self.live:
+            raise ReplayMismatch(f"no recorded decision for Player {self.agent_id} {kind} #{occurrence} and no live agent to fork to")
+        value = getattr(self.agent, kind)(state)
+        logger(f"[LIVE] Player {self.agent_id} {kind} -> {value}")
+        return value
+
+    def speculate_president_legislate(self, state: dict) -> None:
+        # Only decisions that will be made live are worth starting early.
+        decision = self.source.lookup("president_legislate", self.agent_id, self._counts["president_legislate"])
+        if self.live and (decision is None or decision.step >= self.fork_at):
+            super().speculate_president_legislate(state)
+
+def record_agents(agents: List[Any], record: GameRecord) -> List[RecordingAgent]:
+    return [RecordingAgent(agent, record) for agent in agents]
+
+def replay_game(record: GameRecord, fork_at: Optional[int] = None, llm_client: Any = None, backend: Optional[str] = None, new_record: Optional[GameRecord] = None) -> dict:
+    """
+    Re-run a recorded game through the compiled workflow. Decisions before step `fork_at`
+    (all of them by default) come from the record; later ones are made live by agents of
+    `backend` (default: the record's backend), which need `llm_client` for the LLM backend.
+    Returns the final state; if `new_record` is given the forked game's decisions go there.
+    """
+    backend = backend or record.backend
+    rng = random.Random(record.seed)
+    state = create_initial_state(rng)
+    live = fork_at is not None and fork_at < len(record.decisions)
+    agents = initialize_agents(state["players"], model=record.model, llm_client=llm_client, backend=backend, rng=rng, seed=record.seed)
+    # Scripted agents consume the game RNG, so they run (and are checked) even when their answer is replayed.
+    check = record.backend == "scripted" and backend == "scripted"
+    agents = [ReplayAgent(agent, record, fork_at, live=live, check=check) for agent in agents]
+    if new_record is not None:
+        agents = record_agents(agents, new_record)
+    app = build_workflow().compile()
+    return app.invoke(state, config={"recursion_limit": 1000}, context={"agents": agents, "rng": rng, "vote_workers": 1})
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a recorded game without calling the LLM.")
+    parser.add_argument("record", help="decisions file written by main.py or tournament.py")
+    parser.add_argument("--fork-at", type=int, default=None, help="make decisions from this step onwards live")
+    parser.add_argument("--backend", choices=["llm", "tiered", "scripted"], default=None, help="agents for the live part (default: the recorded backend)")
+    parser.add_argument("--out", default=None, help="write the forked game's decisions to this file")
+    args = parser.parse_args()
+    record = GameRecord.load(args.record)
+    backend = args.backend or record.backend
+    llm = None
+    if args.fork_at is not None and backend != "scripted":
+        from main import make_llm
+        llm = make_llm(record.model)
+    new_record = GameRecord(seed=record.seed, backend=backend, model=record.model) if args.out else None
+    final = replay_game(record, args.fork_at, llm_client=llm, backend=backend, new_record=new_record)
+    if new_record is not None:
+        new_record.finish(final)
+        new_record.save(args.out)
+    logger(f"[REPLAY] Winner: {final['winner']} — {final['game_over_reason']} (recorded: {record.winner} — {record.reason})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,316 @@
+"""Tail-latency and failure protection for model calls.
+
+HedgedLLM wraps a chat client. Every structured call runs on a worker thread; if it has
+not answered by the hedge deadline — the `quantile` (p95) of recent successful call
+latencies for that schema, or `initial` seconds until enough calls were seen — the same
+request is also sent to the hedge client (another model or provider) or, without one,
+sent again (another replica behind the endpoint), and the first answer wins. No answer
+from either within `timeout` seconds raises TimeoutError, which the rate limiter retries
+as a transient error, so one stuck response can no longer hold up a game. A hedge takes
+a token from the shared rate-limit bucket and is skipped when the quota is used up.
+
+GuardedLLM wraps the client below the response cache (cache hits cost no quota): each
+structured call goes through the circuit breaker and the shared rate limiter, which adds
+its retries and throttled seconds to the decision's `reporting()` dict.
+
+CircuitBreaker is process-wide (like the rate limiter) and watches model call attempts
+(429s excluded: quota is the limiter's business). When at least `min_calls` of the last
+`window` attempts were made and `threshold` of them failed, it opens: for `cooldown`
+seconds decisions skip the model and take the agent's local fallback policy (the
+scripted rules), recorded as fallbacks with `circuit_open` in usage. After the cooldown
+one probe call is let through; success closes the circuit, failure opens it again. Calls
+already in flight when the circuit opens or closes say nothing about the new state, and
+their outcomes are left out of it.
+
+Configured from LLM_CALL_TIMEOUT (seconds, default 60; 0 and LLM_HEDGE=off disable the
+wrapper), LLM_HEDGE (on/off, default on), LLM_HEDGE_QUANTILE (0.95), LLM_HEDGE_MODEL and
+LLM_HEDGE_PROVIDER (hedge target, default the same client), and LLM_BREAKER_WINDOW (20),
+LLM_BREAKER_THRESHOLD (0.5), LLM_BREAKER_MIN_CALLS (10), LLM_BREAKER_COOLDOWN (30 s).
+"""
+import contextvars
+import os
+from contextlib import contextmanager
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Deque, Dict, Iterator, Optional, Tuple
+
+from log import WARNING, log as logger
+from ratelimit import RetriesExhausted, classify, get_limiter
+from tracing import get_current_span
+
+_POOL = ThreadPoolExecutor(max_workers=128, thread_name_prefix="llm-call")
+
+class HedgedLLM:
+    """Wraps an LLM client: bounded call time, and a hedged second request past the p95 latency."""
+
+    def __init__(self, llm: Any, hedge: Optional[Any] = None, hedging: bool = True, quantile: float = 0.95, timeout: Optional[float] = 60.0,
+                 initial: float = 10.0, floor: float = 0.25, window: int = 200, min_samples: int = 20):
+        self.llm = llm
+        self.hedge = hedge
+        self.hedging = hedging
+        self.quantile = quantile
+        self.timeout = timeout
+        self.initial = initial
+        self.floor = floor
+        self.min_samples = min_samples
+        self._latencies: Dict[str, Deque[float]] = {}
+        self._window = window
+        self._lock = threading.Lock()
+        self.counts: Counter = Counter()
+
+    def with_structured_output(self, schema, **kwargs):
+        primary = self.llm.with_structured_output(schema, **kwargs)
+        second = self.hedge.with_structured_output(schema, **kwargs) if self.hedge is not None else primary
+        return _HedgedRunnable(self, schema.__name__, primary, second)
+
+    def deadline(self, key: str) -> float:
+        """Seconds to wait for the first request before hedging."""
+        with self._lock:
+            samples = sorted(self._latencies.get(key, ()))
+        if len(samples) < self.min_samples:
+            return self.initial
+        return max(self.floor, samples[min(len(samples) - 1, int(self.quantile * len(samples)))])
+
+    def observe(self, key: str, seconds: float) -> None:
+        with self._lock:
+            self._latencies.setdefault(key, deque(maxlen=self._window)).append(seconds)
+
+    def count(self, name: str) -> None:
+        with self._lock:
+            self.counts[name] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            keys = list(self._latencies)
+            counts = dict(self.counts)
+        return {
+            "calls": counts.get("calls", 0),
+            "hedged": counts.get("hedged", 0),
+            "hedge_wins": counts.get("hedge_wins", 0),
+            "hedges_skipped": counts.get("hedges_skipped", 0),
+            "timeouts": counts.get("timeouts", 0),
+            "deadlines": {key: round(self.deadline(key), 3) for key in sorted(keys)},
+        }
+
+    def __getattr__(self, name):
+        return getattr(self.llm, name)
+
+class _HedgedRunnable:
+    def __init__(self, owner: HedgedLLM, key: str, primary: Any, second: Any):
+        self.owner = owner
+        self.key = key
+        self.primary = primary
+        self.second = second
+
+    def _submit(self, runnable: Any, prompt: Any, args: tuple, kwargs: dict) -> Future:
+        return _POOL.submit(contextvars.copy_context().run, runnable.invoke, prompt, *args, **kwargs)
+
+    def invoke(self, prompt: Any, *args, **kwargs):
+        owner = self.owner
+        owner.count("calls")
+        start = time.monotonic()
+        first = self._submit(self.primary, prompt, args, kwargs)
+        # The primary's own latency feeds the deadline, whichever request wins.
+        first.add_done_callback(lambda f: f.exception() is None and owner.observe(self.key, time.monotonic() - start))
+        pending = {first}
+        if owner.hedging:
+            deadline = owner.deadline(self.key)
+            done, _ = wait(pending, timeout=deadline if owner.timeout is None else min(deadline, owner.timeout))
+            if not done:
+                try:
+                    get_limiter().bucket.acquire(deadline=time.monotonic())
+                except RetriesExhausted:
+                    owner.count("hedges_skipped")
+                else:
+                    owner.count("hedged")
+                    get_current_span().set_attribute("llm.hedged", True)
+                    pending.add(self._submit(self.second, prompt, args, kwargs))
+        error: Optional[BaseException] = None
+        stop = None if owner.timeout is None else start + owner.timeout
+        while pending:
+            done, pending = wait(pending, timeout=None if stop is None else max(0.0, stop - time.monotonic()), return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            for future in done:
+                if future.exception() is None:
+                    if future is not first:
+                        owner.count("hedge_wins")
+                        get_current_span().set_attribute("llm.hedge_won", True)
+                    return future.result()
+                error = future.exception()
+        if pending:
+            owner.count("timeouts")
+            raise TimeoutError(f"no model answer within {owner.timeout:.0f}s")
+        raise error
+
+def hedging_from_env(llm: Any, model: str, provider: Optional[str], client: Callable[[str, Optional[str]], Any]) -> Any:
+    """
+    Wrap `llm` in a HedgedLLM unless LLM_CALL_TIMEOUT is 0 and LLM_HEDGE is off. With
+    LLM_HEDGE_MODEL or LLM_HEDGE_PROVIDER, `client(model, provider)` builds the hedge target.
+    """
+    timeout = float(os.environ.get("LLM_CALL_TIMEOUT", "60"))
+    hedging = os.environ.get("LLM_HEDGE", "on").lower() not in ("off", "0", "false", "no")
+    if timeout <= 0 and not hedging:
+        return llm
+    hedge_model, hedge_provider = os.environ.get("LLM_HEDGE_MODEL"), os.environ.get("LLM_HEDGE_PROVIDER")
+    hedge = client(hedge_model or model, hedge_provider or provider) if hedging and (hedge_model or hedge_provider) else None
+    return HedgedLLM(llm, hedge, hedging=hedging, quantile=float(os.environ.get("LLM_HEDGE_QUANTILE", "0.95")), timeout=timeout if timeout > 0 else None)
+
+def find(llm: Any) -> Optional[HedgedLLM]:
+    """The HedgedLLM inside a stack of client wrappers (each keeps the next in `.llm`), if any."""
+    while llm is not None:
+        if isinstance(llm, HedgedLLM):
+            return llm
+        llm = llm.__dict__.get("llm") if hasattr(llm, "__dict__") else None
+    return None
+
+class CircuitOpen(Exception):
+    """Raised instead of calling the model while the circuit breaker is open; callers use a fallback."""
+
+class CircuitBreaker:
+    def __init__(self, window: int = 20, threshold: float = 0.5, min_calls: int = 10, cooldown: float = 30.0):
+        self.threshold = threshold
+        self.min_calls = min_calls
+        self.cooldown = cooldown
+        self._outcomes: Deque[bool] = deque(maxlen=window)
+        self._opened_at: Optional[float] = None
+        # Bumped whenever the circuit opens or closes; an outcome counts only within its call's generation.
+        self._generation = 0
+        # Token of the half-open probe call in flight.
+        self._probe: Optional[object] = None
+        self._lock = threading.Lock()
+        self.counters: Dict[str, int] = {"successes": 0, "failures": 0, "trips": 0, "rejected": 0}
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state(time.monotonic())
+
+    def _state(self, now: float) -> str:
+        if self._opened_at is None:
+            return "closed"
+        return "open" if now - self._opened_at < self.cooldown or self._probe is not None else "half_open"
+
+    def allow(self) -> bool:
+        """False (and counted as rejected) while calls are refused: open, or half-open with its probe in flight."""
+        with self._lock:
+            if self._state(time.monotonic()) != "open":
+                return True
+            self.counters["rejected"] += 1
+            return False
+
+    def _admit(self) -> Tuple[int, Optional[object]]:
+        """Let a call through, or raise CircuitOpen: its generation, and its probe token when it is the half-open probe."""
+        with self._lock:
+            state = self._state(time.monotonic())
+            if state == "closed":
+                return self._generation, None
+            if state == "half_open":
+                self._probe = object()
+                return self._generation, self._probe
+            self.counters["rejected"] += 1
+        raise CircuitOpen("circuit breaker open: model calls suspended after repeated failures")
+
+    def _record(self, success: bool, ticket: Tuple[int, Optional[object]]) -> None:
+        generation, probe = ticket
+        with self._lock:
+            self.counters["successes" if success else "failures"] += 1
+            if probe is not None:
+                if probe is not self._probe:
+                    return
+                self._probe = None
+                if success:
+                    self._opened_at = None
+                    self._generation += 1
+                    self._outcomes.clear()
+                    logger("[CIRCUIT] Probe call succeeded; model calls resumed")
+                else:
+                    self._opened_at = time.monotonic()
+                return
+            if generation != self._generation:
+                # Started before the circuit last opened or closed.
+                return
+            self._outcomes.append(success)
+            failures = self._outcomes.count(False)
+            if len(self._outcomes) >= self.min_calls and failures / len(self._outcomes) >= self.threshold:
+                self._opened_at = time.monotonic()
+                self._generation += 1
+                self.counters["trips"] += 1
+                logger(f"[CIRCUIT] {failures}/{len(self._outcomes)} recent model calls failed; using fallback policies for {self.cooldown:.0f}s", level=WARNING)
+
+    def call(self, fn: Callable[[], Any]) -> Any:
+        """Run one model call attempt if the circuit lets it through, and record how it went."""
+        ticket = self._admit()
+        try:
+            result = fn()
+        except Exception as e:
+            if classify(e) != "rate_limit":
+                self._record(False, ticket)
+            elif ticket[1] is not None:
+                with self._lock:
+                    if self._probe is ticket[1]:
+                        self._probe = None
+            raise
+        self._record(True, ticket)
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"state": self._state(time.monotonic()), **self.counters}
+
+_breaker: Optional[CircuitBreaker] = None
+_breaker_lock = threading.Lock()
+
+def get_breaker() -> CircuitBreaker:
+    """Process-wide circuit breaker configured from LLM_BREAKER_WINDOW, _THRESHOLD, _MIN_CALLS and _COOLDOWN."""
+    global _breaker
+    with _breaker_lock:
+        if _breaker is None:
+            _breaker = CircuitBreaker(
+                window=int(os.environ.get("LLM_BREAKER_WINDOW", "20")),
+                threshold=float(os.environ.get("LLM_BREAKER_THRESHOLD", "0.5")),
+                min_calls=int(os.environ.get("LLM_BREAKER_MIN_CALLS", "10")),
+                cooldown=float(os.environ.get("LLM_BREAKER_COOLDOWN", "30")),
+            )
+        return _breaker
+
+def set_breaker(breaker: Optional[CircuitBreaker]) -> None:
+    global _breaker
+    with _breaker_lock:
+        _breaker = breaker
+
+# Retries and throttled seconds of the decision in progress (see reporting()).
+_REPORT: contextvars.ContextVar[Optional[Dict[str, float]]] = contextvars.ContextVar("llm_report", default=None)
+
+@contextmanager
+def reporting(report: Dict[str, float]) -> Iterator[Dict[str, float]]:
+    """Add the rate limiter's retries and throttled seconds for guarded calls made inside the block to `report`."""
+    token = _REPORT.set(report)
+    try:
+        yield report
+    finally:
+        _REPORT.reset(token)
+
+class GuardedLLM:
+    """Wraps an LLM client: structured calls go through the circuit breaker and the shared rate limiter."""
+
+    def __init__(self, llm: Any):
+        self.llm = llm
+
+    def with_structured_output(self, schema, **kwargs):
+        return _GuardedRunnable(self.llm.with_structured_output(schema, **kwargs))
+
+    def __getattr__(self, name):
+        return getattr(self.llm, name)
+
+class _GuardedRunnable:
+    def __init__(self, runnable: Any):
+        self.runnable = runnable
+
+    def invoke(self, prompt: Any, *args, **kwargs):
+        breaker = get_breaker()
+        if not breaker.allow():
+            raise CircuitOpen("circuit breaker open")
+        return get_limiter().call(lambda: breaker.call(lambda: self.runnable.invoke(prompt, *args, **kwargs)), report=_REPORT.get())
@@ -0,0 +1,152 @@
+"""Per-decision model routing.
+
+RoutedLLM holds one client per named route (a model, optionally on another provider)
+and sends each structured call to the route chosen for the decision in progress: tools
+open `decision(phase, role, state)` around the model call, and the first rule whose
+conditions all hold picks the route; no match picks the default route. Conditions:
+
+- "phase", "role": a name or list of names (phases as in usage accounting: nominate,
+  vote, legislate_president, legislate_chancellor, executive)
+- "<field>_min" / "<field>_max": bounds on a numeric game-state field, e.g.
+  "fascist_policies_min": 3 or "election_tracker_min": 2
+- "budget_remaining_min" / "budget_remaining_max": bounds on the share of the per-game
+  token budget ("budget_tokens") not yet spent by the current game
+
+Rules come from the JSON file named by LLM_ROUTES (off when unset; routes.json is a
+starting point: a fast model by default, a strong one in the Hitler zone), e.g.
+
+    {"default": "fast", "budget_tokens": 400000,
+     "routes": {"fast": {"model": "gemini-2.5-flash-lite"}, "strong": {"model": "gemini-2.5-pro"}},
+     "rules": [{"route": "fast", "when": {"budget_remaining_max": 0.1}},
+               {"route": "strong", "when": {"phase": "vote", "fascist_policies_min": 3}}]}
+
+A route without "model" uses the model passed to make_llm, one without "provider" the
+configured provider (providers.py). The chosen route is recorded with the decision's
+usage, so usage summaries report tokens and latency per route (see usage.route_stats).
+"""
+import json
+import os
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from log import log as logger
+from usage import current as current_usage
+
+class Decision:
+    """The decision a model call belongs to, and the route it was sent to."""
+
+    def __init__(self, phase: str, role: str, state: dict):
+        self.phase = phase
+        self.role = role
+        self.state = state
+        self.route: Optional[str] = None
+        self.model: Optional[str] = None
+
+_DECISION: ContextVar[Optional[Decision]] = ContextVar("routing_decision", default=None)
+
+@contextmanager
+def decision(phase: str, role: str, state: dict) -> Iterator[Decision]:
+    """Mark model calls made inside the block as belonging to this decision."""
+    current = Decision(phase, role, state)
+    token = _DECISION.set(current)
+    try:
+        yield current
+    finally:
+        _DECISION.reset(token)
+
+def _matches(values: Any, value: Any) -> bool:
+    return value in values if isinstance(values, list) else value == values
+
+class RoutedLLM:
+    """Sends each structured call to the client of the route its decision's rules select."""
+
+    def __init__(self, routes: Dict[str, Any], default: str, rules: Optional[List[dict]] = None, budget_tokens: int = 0, models: Optional[Dict[str, str]] = None):
+        if default not in routes:
+            raise ValueError(f"Default route {default!r} is not among the routes ({', '.join(sorted(routes))})")
+        for rule in rules or []:
+            if rule.get("route") not in routes:
+                raise ValueError(f"Rule {rule} names an unknown route")
+        self.routes = routes
+        self.default = default
+        self.rules = rules or []
+        self.budget_tokens = budget_tokens
+        self.models = models or {}
+        # The default route's client, so wrapper lookups (batching.find, ...) and attributes pass through to it.
+        self.llm = routes[default]
+        self.cache = getattr(self.llm, "cache", None)
+
+    def budget_remaining(self) -> float:
+        """Share of the current game's token budget not yet spent (1.0 without a budget)."""
+        usage = current_usage()
+        if not self.budget_tokens or usage is None:
+            return 1.0
+        return max(0.0, 1 - usage.tokens() / self.budget_tokens)
+
+    def _holds(self, condition: str, bound: Any, current: Decision) -> bool:
+        if condition in ("phase", "role"):
+            return _matches(bound, getattr(current, condition))
+        field, _, side = condition.rpartition("_")
+        if side not in ("min", "max"):
+            raise ValueError(f"Unknown routing condition {condition!r}")
+        value = self.budget_remaining() if field == "budget_remaining" else current.state.get(field, 0)
+        return value >= bound if side == "min" else value <= bound
+
+    def select(self, current: Optional[Decision]) -> str:
+        if current is None:
+            return self.default
+        for rule in self.rules:
+            if all(self._holds(condition, bound, current) for condition, bound in rule.get("when", {}).items()):
+                return rule["route"]
+        return self.default
+
+    def with_structured_output(self, schema, **kwargs):
+        return _RoutedRunnable(self, {name: client.with_structured_output(schema, **kwargs) for name, client in self.routes.items()})
+
+    def clients(self) -> List[Any]:
+        return list(self.routes.values())
+
+    def __getattr__(self, name):
+        return getattr(self.llm, name)
+
+class _RoutedRunnable:
+    def __init__(self, owner: RoutedLLM, runnables: Dict[str, Any]):
+        self.owner = owner
+        self.runnables = runnables
+
+    def invoke(self, prompt: Any, *args, **kwargs):
+        current = _DECISION.get()
+        route = self.owner.select(current)
+        if current is not None:
+            current.route, current.model = route, self.owner.models.get(route)
+        return self.runnables[route].invoke(prompt, *args, **kwargs)
+
+def load_routes(path: str) -> dict:
+    with open(path, "r", encoding="utf-8") as fh:
+        config = json.load(fh)
+    if not config.get("routes"):
+        raise ValueError(f"{path}: no routes defined")
+    return config
+
+def routing_from_env(model: str, client: Callable[[str, Optional[str]], Any]) -> Optional[RoutedLLM]:
+    """
+    A RoutedLLM from the LLM_ROUTES file, or None when it is unset. `client(model, provider)`
+    builds one route's client.
+    """
+    path = os.environ.get("LLM_ROUTES")
+    if not path:
+        return None
+    config = load_routes(path)
+    models = {name: route.get("model") or model for name, route in config["routes"].items()}
+    routes = {name: client(models[name], route.get("provider")) for name, route in config["routes"].items()}
+    default = config.get("default") or next(iter(routes))
+    logger(f"[ROUTING] {len(routes)} routes from {path} ({', '.join(f'{n}: {m}' for n, m in models.items())}), default {default}")
+    return RoutedLLM(routes, default, config.get("rules"), int(config.get("budget_tokens", 0)), models)
+
+def find(llm: Any) -> Optional[RoutedLLM]:
+    """The RoutedLLM inside a stack of client wrappers (each keeps the next in `.llm`), if any."""
+    while llm is not None:
+        if isinstance(llm, RoutedLLM):
+            return llm
+        llm = llm.__dict__.get("llm") if hasattr(llm, "__dict__") else None
+    return None
@@ -0,0 +1,60 @@
+"""Offline bulk simulation with scripted agents: no LLM, no network.
+
+Drives the real game nodes through graph.run_headless, so it doubles as a
+throughput test of the engine and a baseline for comparing agent policies.
+
+    python simulate.py --games 100000 --seed 0
+"""
+import argparse
+import json
+import random
+import time
+from collections import Counter
+from typing import Dict, Optional
+
+from game import create_initial_state
+from game_types import GameState
+from agents import initialize_agents
+from agents.scripted import RolePolicy
+from graph import run_headless
+from compact import play_compact
+from log import muted, log as logger
+
+def play_scripted(seed: int, policies: Optional[Dict[str, RolePolicy]] = None, compact: bool = False) -> GameState:
+    """Play one seeded game between scripted agents and return the final state."""
+    rng = random.Random(seed)
+    state = create_initial_state(rng)
+    agents = initialize_agents(state["players"], backend="scripted", policies=policies, rng=rng)
+    if compact:
+        return play_compact(state, agents, rng)
+    return run_headless(state, {"agents": agents, "rng": rng, "vote_workers": 1})
+
+def simulate(games: int, seed: int = 0, policies: Optional[Dict[str, RolePolicy]] = None, compact: bool = False) -> dict:
+    """Play `games` scripted games with seeds seed, seed + 1, ... and return outcome counts and throughput."""
+    winners: Counter = Counter()
+    reasons: Counter = Counter()
+    start = time.perf_counter()
+    with muted():
+        for i in range(games):
+            final = play_scripted(seed + i, policies, compact)
+            winners[final["winner"]] += 1
+            reasons[final["game_over_reason"]] += 1
+    elapsed = time.perf_counter() - start
+    return {
+        "games": games,
+        "seconds": elapsed,
+        "games_per_second": games / elapsed if elapsed else 0.0,
+        "win_rate": {team: winners[team] / games if games else 0.0 for team in ("liberals", "fascists")},
+        "win_reasons": dict(reasons.most_common()),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate games between scripted agents.")
+    parser.add_argument("--games", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--compact", action="store_true", help="play on the compact array-backed state (compact.py)")
+    args = parser.parse_args()
+    logger(json.dumps(simulate(args.games, args.seed, compact=args.compact), indent=2))
+
+if __name__ == "__main__":
+    main()
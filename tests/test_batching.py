@@ -0,0 +1,91 @@
+"""BatchingLLM against stand-in models: batch sizes stay within the limits and every caller gets its own answer."""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from batching import BatchingLLM
+from fake_llm import FakeLLM
+from parsers import VoteOut
+
+class EchoLLM:
+    """Answers each prompt with itself as the public statement; batch() records its size."""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.batch_sizes = []
+        self._lock = threading.Lock()
+
+    def with_structured_output(self, schema, **kwargs):
+        return self
+
+    def _answer(self, prompt):
+        if prompt.startswith("fail"):
+            raise ValueError(f"cannot answer {prompt}")
+        return VoteOut(vote=True, public_statement=prompt, private_thoughts="")
+
+    def invoke(self, prompt, config=None, **kwargs):
+        time.sleep(self.latency)
+        return self._answer(prompt)
+
+    def batch(self, prompts, config=None, return_exceptions=False, **kwargs):
+        time.sleep(self.latency)
+        with self._lock:
+            self.batch_sizes.append(len(prompts))
+        results = []
+        for prompt in prompts:
+            try:
+                results.append(self._answer(prompt))
+            except Exception as e:
+                if not return_exceptions:
+                    raise
+                results.append(e)
+        return results
+
+def _call_concurrently(llm, prompts):
+    runnable = llm.with_structured_output(VoteOut)
+    barrier = threading.Barrier(len(prompts))
+
+    def call(prompt):
+        barrier.wait()
+        try:
+            return runnable.invoke(prompt)
+        except Exception as e:
+            return e
+
+    with ThreadPoolExecutor(max_workers=len(prompts)) as pool:
+        return list(pool.map(call, prompts))
+
+def test_concurrent_calls_are_grouped_up_to_max_batch():
+    fake = FakeLLM(latency=0.02)
+    llm = BatchingLLM(fake, window=0.2, max_batch=8)
+    results = _call_concurrently(llm, [f"game {i}" for i in range(40)])
+    assert all(isinstance(r, VoteOut) for r in results)
+    assert sum(fake.batch_sizes) + sum(n for size, n in llm.sizes.items() if size == 1) == 40
+    assert max(fake.batch_sizes) <= 8
+    assert len(fake.batch_sizes) < 40
+    assert llm.stats()["requests"] == 40
+
+def test_window_closes_a_partial_batch():
+    fake = FakeLLM()
+    llm = BatchingLLM(fake, window=0.05, max_batch=100)
+    start = time.perf_counter()
+    results = _call_concurrently(llm, [f"game {i}" for i in range(5)])
+    assert len(results) == 5
+    assert time.perf_counter() - start < 2.0
+    assert max(llm.sizes) <= 5
+
+def test_each_caller_gets_its_own_answer():
+    echo = EchoLLM(latency=0.01)
+    llm = BatchingLLM(echo, window=0.1, max_batch=6)
+    prompts = [f"game {i} prompt" for i in range(30)]
+    results = _call_concurrently(llm, prompts)
+    assert [r.public_statement for r in results] == prompts
+    assert max(echo.batch_sizes) <= 6
+    assert any(size > 1 for size in echo.batch_sizes)
+
+def test_a_failing_request_only_fails_its_caller():
+    llm = BatchingLLM(EchoLLM(), window=0.1, max_batch=10)
+    prompts = [f"game {i}" for i in range(9)] + ["fail game 9"]
+    results = _call_concurrently(llm, prompts)
+    assert isinstance(results[-1], ValueError)
+    assert [r.public_statement for r in results[:-1]] == prompts[:-1]
@@ -0,0 +1,62 @@
+"""Forced moves: a decision with a single legal outcome skips the model, and only then."""
+import random
+
+import pytest
+
+import tools
+from fake_llm import FakeLLM
+from game import create_initial_state
+from log import muted
+from prompts import FORCED_STATEMENTS
+
+@pytest.fixture
+def state():
+    with muted():
+        state = create_initial_state(random.Random(0))
+    state["current_president_idx"] = 0
+    return state
+
+def _decide(tool, agent_id, state, *args):
+    llm = FakeLLM(seed=0)
+    with muted():
+        result = tool(agent_id, *args, state, llm_client=llm, prompt_context=tools.PromptContext(state["players"]))
+    return result, sum(llm.calls.values())
+
+def test_one_eligible_nominee_is_forced(state):
+    state["previous_president_idx"], state["previous_chancellor_idx"] = 1, 2
+    state["players"][3]["alive"] = False
+    (cid, public, _), calls = _decide(tools.nominate_tool, 0, state, "liberal")
+    assert (cid, calls) == (4, 0)
+    assert FORCED_STATEMENTS["nominate"].format(target=4) in public
+
+def test_several_eligible_nominees_ask_the_model(state):
+    state["previous_president_idx"], state["previous_chancellor_idx"] = 1, 2
+    _, calls = _decide(tools.nominate_tool, 0, state, "liberal")
+    assert calls == 1
+
+@pytest.mark.parametrize("drawn, forced", [(["fascist"] * 3, True), (["liberal"] * 3, True), (["fascist", "fascist", "liberal"], False)])
+def test_president_is_forced_only_by_three_identical_cards(state, drawn, forced):
+    state["drawn_policies"] = list(drawn)
+    (passed, _, _), calls = _decide(tools.president_legislate_tool, 0, state)
+    assert calls == (0 if forced else 1)
+    if forced:
+        assert passed == drawn[1:]
+
+@pytest.mark.parametrize("received, forced", [(["liberal"] * 2, True), (["fascist"] * 2, True), (["liberal", "fascist"], False)])
+def test_chancellor_is_forced_only_by_two_identical_cards(state, received, forced):
+    state["passed_policies"] = list(received)
+    (enacted, _, _), calls = _decide(tools.chancellor_legislate_tool, 1, state)
+    assert calls == (0 if forced else 1)
+    if forced:
+        assert enacted == received[0]
+
+def test_one_investigable_player_is_forced(state):
+    for p in state["players"]:
+        p["investigated"] = p["id"] != 3
+    (target, public, _), calls = _decide(tools.investigate_tool, 0, state)
+    assert (target, calls) == (3, 0)
+    assert FORCED_STATEMENTS["executive"].format(target=3) in public
+
+def test_several_investigable_players_ask_the_model(state):
+    _, calls = _decide(tools.investigate_tool, 0, state)
+    assert calls == 1
@@ -0,0 +1,102 @@
+"""GameMemory over a scripted message log: round records, folded tallies, claim visibility and snapshots."""
+import json
+
+import memory
+from game_types import MessageLog
+from memory import RECENT_ROUNDS, GameMemory
+
+PLAYERS = [0, 1, 2, 3, 4]
+VOTES = {0: True, 1: True, 2: True, 3: False, 4: False}
+
+# Five rounds: an elected Liberal government, three rejections ending in chaos, then an
+# elected Fascist government whose President investigates.
+MESSAGES = [
+    "Player 0 nominated Player 1 as Chancellor.",
+    "Government ELECTED (3/5 Ja). President 0, Chancellor 1.",
+    "LIBERAL policy enacted. Board: 1 Liberal, 0 Fascist.",
+    "Player 1 nominated Player 2 as Chancellor.",
+    "Government REJECTED (2/5 Ja). Election tracker: 1/3",
+    "Player 2 nominated Player 3 as Chancellor.",
+    "Government REJECTED (1/5 Ja). Election tracker: 2/3",
+    "Player 3 nominated Player 4 as Chancellor.",
+    "Government REJECTED (0/5 Ja). Election tracker: 3/3",
+    "CHAOS! Top policy enacted: FASCIST",
+    "Player 4 nominated Player 0 as Chancellor.",
+    "Government ELECTED (4/5 Ja). President 4, Chancellor 0.",
+    "FASCIST policy enacted. Board: 1 Liberal, 2 Fascist.",
+    "President 4 investigated Player 2 (result secret).",
+]
+
+def _state(count: int, votes=None) -> dict:
+    state = {"messages": MessageLog(MESSAGES[:count])}
+    if votes is not None:
+        state["votes"] = votes
+    return state
+
+def _played() -> GameMemory:
+    mem = GameMemory(PLAYERS)
+    # Ballots are attached to the round they elected, as the graph's vote node leaves them in state.
+    mem.observe(_state(2, VOTES))
+    mem.observe(_state(12, {4: True, 0: True, 1: True, 2: True, 3: False}))
+    mem.observe(_state(len(MESSAGES)))
+    return mem
+
+def test_rounds_are_parsed_from_the_log():
+    rounds = _played().rounds
+    assert [(r.president, r.chancellor, r.elected) for r in rounds] == [(0, 1, True), (1, 2, False), (2, 3, False), (3, 4, False), (4, 0, True)]
+    assert (rounds[0].ja, rounds[0].total, rounds[0].enacted, rounds[0].votes) == (3, 5, "LIBERAL", VOTES)
+    assert rounds[1].votes == {}
+    assert rounds[3].chaos == "FASCIST" and rounds[3].enacted is None
+    assert rounds[4].enacted == "FASCIST" and rounds[4].investigated == 2
+
+def test_rounds_older_than_the_window_are_folded_once():
+    mem = _played()
+    assert mem._folded == len(mem.rounds) - RECENT_ROUNDS == 2
+    assert mem.tallies[0]["president"] == 1 and mem.tallies[0]["elected_president"] == 1 and mem.tallies[0]["liberal_as_president"] == 1
+    assert mem.tallies[1]["chancellor"] == 1 and mem.tallies[1]["liberal_as_chancellor"] == 1 and mem.tallies[1]["president"] == 1
+    assert mem.tallies[2]["chancellor"] == 1 and mem.tallies[2]["elected_chancellor"] == 0
+    assert [mem.tallies[p]["ja"] for p in PLAYERS] == [1, 1, 1, 0, 0]
+    assert [mem.tallies[p]["nein"] for p in PLAYERS] == [0, 0, 0, 1, 1]
+    # Observing the same log again changes nothing.
+    mem.observe(_state(len(MESSAGES)))
+    assert mem._folded == 2 and mem.tallies[0]["president"] == 1
+    summary, _ = mem.render(0, _state(len(MESSAGES)))
+    assert summary.startswith("Rounds 1-2 by player:")
+    assert "Round 3:" in summary and "Round 1:" not in summary
+
+def test_claims_show_from_the_next_state_and_legislative_ones_after_enactment():
+    mem = GameMemory(PLAYERS)
+    mem.claim(0, "Trust Player 1.", _state(1))
+    assert "Trust Player 1." not in mem.render(2, _state(1))[0]
+    assert "Trust Player 1." in mem.render(2, _state(2))[0]
+    mem.claim(0, "I drew three fascists.", _state(2), legislative=True)
+    mem.claim(1, "I got two fascists.", _state(2), legislative=True)
+    # The Chancellor decides after the President's claim, but must not see it.
+    assert "I drew three fascists." not in mem.render(1, _state(2))[0]
+    summary, _ = mem.render(3, _state(3))
+    assert 'Player 0: "I drew three fascists."' in summary and 'Player 1: "I got two fascists."' in summary
+
+def test_notes_are_private_and_deferred_writes_wait_for_apply():
+    mem = GameMemory(PLAYERS)
+    with memory.deferred() as pending:
+        mem.note(0, "you saw three liberals.", _state(2))
+        mem.claim(0, "Held back.", _state(2))
+    assert mem.notes[0] == [] and mem.claims == []
+    memory.apply(pending)
+    assert mem.render(0, _state(3))[1] == "- Round 1: you saw three liberals."
+    assert mem.render(1, _state(3))[1] == "Nothing yet."
+    assert "Held back." in mem.render(1, _state(3))[0]
+
+def test_snapshot_restores_an_identical_memory():
+    mem = _played()
+    mem.note(4, "you investigated Player 2: party LIBERAL.", _state(len(MESSAGES)))
+    mem.claim(4, "Player 2 is fine.", _state(len(MESSAGES) - 1))
+    mem.claim(0, "Held until enactment.", _state(len(MESSAGES)), legislative=True)
+    restored = GameMemory(PLAYERS)
+    restored.restore(json.loads(json.dumps(mem.snapshot())))
+    final = _state(len(MESSAGES))
+    assert restored.render(4, final) == mem.render(4, final)
+    assert restored.tallies == mem.tallies and restored.rounds == mem.rounds and restored._held == mem._held
+    # Without a snapshot (an older checkpoint) the memory is left as it is.
+    restored.restore(None)
+    assert restored.rounds == mem.rounds
@@ -0,0 +1,17 @@
+"""The vectorized Monte Carlo engine agrees with the per-game engine on win reasons."""
+import pytest
+
+from montecarlo import REASONS, compare_with_engine, estimate
+
+def test_win_reasons_match_the_per_game_engine():
+    check = compare_with_engine(500, seed=0)
+    assert sum(check["montecarlo"].values()) == sum(check["engine"].values()) == 500
+    # Seeded, so the statistic is fixed; a rules drift between the engines pushes it far past this.
+    assert check["p_value"] > 0.01, check
+
+def test_estimate_covers_every_game():
+    report = estimate(2000, seed=0)
+    assert sum(r["rate"] for r in report["win_reasons"].values()) == pytest.approx(1.0)
+    assert set(report["win_reasons"]) == set(REASONS)
+    lo, hi = report["liberal_win_ci"]
+    assert lo <= report["win_rate"]["liberals"] <= hi
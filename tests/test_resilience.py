@@ -0,0 +1,85 @@
+"""
+CircuitBreaker: only the half-open probe decides whether the circuit closes, and calls in
+flight when it trips are ignored. GuardedLLM: cache hits in front of it cost no quota.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from fake_llm import FakeLLM
+from llm_cache import CachedLLM, ResponseCache
+from parsers import VoteOut
+from ratelimit import RateLimiter, get_limiter, set_limiter
+from resilience import CircuitBreaker, CircuitOpen, GuardedLLM, reporting
+
+def _fail():
+    raise ValueError("model error")
+
+def _trip(breaker: CircuitBreaker) -> None:
+    for _ in range(breaker.min_calls):
+        with pytest.raises(ValueError):
+            breaker.call(_fail)
+    assert breaker.stats()["trips"] == 1
+
+def test_calls_in_flight_when_the_circuit_opens_do_not_close_it():
+    breaker = CircuitBreaker(window=4, threshold=0.5, min_calls=2, cooldown=0.0)
+    started, release = threading.Event(), threading.Event()
+
+    def slow():
+        started.set()
+        release.wait(5)
+        return "late"
+
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        late = pool.submit(breaker.call, slow)
+        started.wait(5)
+        _trip(breaker)
+        # Cooldown over: half-open. A probe is let through and fails.
+        with pytest.raises(ValueError):
+            breaker.call(_fail)
+        release.set()
+        assert late.result() == "late"
+    # The slow call started before the trip; its success must not close the circuit.
+    assert breaker.stats()["trips"] == 1
+    assert breaker._opened_at is not None
+
+def test_only_one_probe_while_half_open():
+    breaker = CircuitBreaker(window=4, threshold=0.5, min_calls=2, cooldown=0.0)
+    _trip(breaker)
+    entered, release = threading.Event(), threading.Event()
+
+    def probe():
+        entered.set()
+        release.wait(5)
+        return "ok"
+
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        result = pool.submit(breaker.call, probe)
+        entered.wait(5)
+        assert not breaker.allow()
+        with pytest.raises(CircuitOpen):
+            breaker.call(lambda: "second")
+        release.set()
+        assert result.result() == "ok"
+    assert breaker.state == "closed"
+
+def test_cache_hits_take_no_rate_limit_tokens(tmp_path):
+    previous = get_limiter()
+    limiter = RateLimiter(requests_per_minute=60, burst=1)
+    set_limiter(limiter)
+    try:
+        llm = CachedLLM(GuardedLLM(FakeLLM(seed=1)), ResponseCache(str(tmp_path / "cache.sqlite")), model="fake")
+        runnable = llm.with_structured_output(VoteOut)
+        reports = []
+        for _ in range(5):
+            with reporting({}) as report:
+                runnable.invoke("Vote on the same government.")
+            reports.append(report)
+    finally:
+        set_limiter(previous)
+    assert limiter.stats()["calls"] == 1
+    assert limiter.stats()["throttled_seconds"] == 0
+    assert all(not report.get("throttled_seconds") for report in reports)
+    assert llm.cache.stats()["hits_memory"] == 4
+
@@ -1,145 +1,305 @@
-from typing import List, Optional, Tuple, Any
+import functools
 import time
-import random
+from typing import Callable, Dict, List, Optional, Tuple, Any
 from parsers import NominationOut, VoteOut, PresidentLegislateOut, ChancellorLegislateOut, InvestigateOut
-from prompts import LIBERAL_PROMPT_TEMPLATE, FASCIST_PROMPT_TEMPLATE, RULES_SUMMARY
-from log import log as logger
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
+from prompts import LIBERAL_SYSTEM_TEMPLATE, FASCIST_SYSTEM_TEMPLATE, TURN_TEMPLATE, RULES_SUMMARY, FORCED_STATEMENTS
+from game_types import MessageLog, pile_counts
+from log import DEBUG, ERROR, WARNING, event as log_event, log as logger
+from resilience import CircuitOpen, reporting
+from usage import UsageCallback, record as record_usage, record_tier
+from tracing import get_current_span, get_tracer
+from memory import GameMemory
+import routing
 
 RECENT_HISTORY_LINES = 6
+tracer = get_tracer(__name__)
+# Game phase each decision belongs to, for usage accounting.
+PHASES = {
+    NominationOut: "nominate",
+    VoteOut: "vote",
+    PresidentLegislateOut: "legislate_president",
+    ChancellorLegislateOut: "legislate_chancellor",
+    InvestigateOut: "executive",
+}
 
-def _players_list(state: dict, requester_id: int) -> str:
+def _visibility(players: List[dict]) -> Dict[int, Dict[int, bool]]:
     """
-    Return a players list string appropriate for the requesting agent.
-    - Always show "Player N (role)" for the requester themself.
-    - Liberals see only player ids.
+    visibility[i][j]: whether player i knows player j's role.
+    - Every player knows their own role.
+    - Liberals see no one else's.
     - Fascists see other fascists; in small games (<=6) fascists also see Hitler.
     - Hitler in 5-player games sees fascist(s); in 6-player games Hitler sees only themself.
     """
-    players = state.get("players", [])
     num_players = len(players)
-    # find requester role
-    requester = next((p for p in players if p["id"] == requester_id), None)
-    requester_role = requester.get("role") if requester else None
-
     reveal_hitler_to_fascists = num_players <= 6  # in 5 and 6 player games fascists know Hitler
-    parts = []
-    for p in players:
-        pid = p["id"]
-        prot = p.get("role")
-        if pid == requester_id:
-            parts.append(f"Player {pid} ({prot})")
-            continue
-        # if requester is fascist, reveal other fascists; reveal Hitler for small games
-        if requester_role == "fascist":
-            if prot == "fascist" or (prot == "hitler" and reveal_hitler_to_fascists):
-                parts.append(f"Player {pid} ({prot})")
-            else:
-                parts.append(f"Player {pid}")
-            continue
-        # if requester is hitler
-        if requester_role == "hitler":
-            # in 5-player game Hitler knows fascists; in 6+ they do not
-            if num_players == 5 and prot == "fascist":
-                parts.append(f"Player {pid} ({prot})")
+    matrix = {}
+    for requester in players:
+        rid, requester_role = requester["id"], requester.get("role")
+        row = {}
+        for p in players:
+            prot = p.get("role")
+            if p["id"] == rid:
+                row[p["id"]] = True
+            elif requester_role == "fascist":
+                row[p["id"]] = prot == "fascist" or (prot == "hitler" and reveal_hitler_to_fascists)
+            elif requester_role == "hitler":
+                row[p["id"]] = num_players == 5 and prot == "fascist"
             else:
-                parts.append(f"Player {pid}")
-            continue
-        # default (liberals): never reveal roles
-        parts.append(f"Player {pid}")
-    return ", ".join(parts)
+                row[p["id"]] = False
+        matrix[rid] = row
+    return matrix
+
+def _players_list(ctx: "PromptContext", requester_id: int) -> str:
+    """Players line for the requesting agent: "Player N (role)" where they know the role, "Player N" otherwise."""
+    visible = ctx.visibility[requester_id]
+    return ", ".join(f"Player {pid} ({role})" if visible[pid] else f"Player {pid}" for pid, role in ctx.roles.items())
 
 def _recent_history(state: dict) -> str:
-    msgs = state.get("messages", [])[-RECENT_HISTORY_LINES:]
+    msgs = state.get("messages", [])
+    msgs = msgs.tail(RECENT_HISTORY_LINES) if isinstance(msgs, MessageLog) else msgs[-RECENT_HISTORY_LINES:]
     return "\n".join(reversed(msgs)) if msgs else "No history yet."
 
 def _state_summary(state: dict) -> dict:
+    deck_lib, deck_fas = pile_counts(state, "deck")
+    disc_lib, disc_fas = pile_counts(state, "discard")
+    hand = state.get("passed_policies", [])
+    hand_lib = hand.count("liberal")
     return {
         "liberal_policies": state.get("liberal_policies", 0),
         "fascist_policies": state.get("fascist_policies", 0),
-        "deck_size": len(state.get("policy_deck", [])),
-        "discard_size": len(state.get("discard_pile", [])),
+        "deck_size": deck_lib + deck_fas,
+        "discard_size": disc_lib + disc_fas,
+        # Public: every tile not on the board is in the deck, the discard pile or a hand.
+        "unenacted_liberal": deck_lib + disc_lib + hand_lib,
+        "unenacted_fascist": deck_fas + disc_fas + len(hand) - hand_lib,
     }
 
-def nominate_tool(agent_id: int, role: str, state: dict, model: Optional[str] = None, llm_client: Optional[Any] = None) -> Tuple[int, str, str]:
-    ss = _state_summary(state)
-    tmpl = LIBERAL_PROMPT_TEMPLATE if role == "liberal" else FASCIST_PROMPT_TEMPLATE
+class PromptContext:
+    """
+    Prompt scaffolding for one game, built once from the dealt roles: the visibility matrix,
+    each player's pre-rendered system message (persona, rules, strategy, visible roles) and
+    eligibility sets memoized on the term limits and who is alive. A decision's prompt is
+    that system message plus a short user message with the board, the game memory
+    (bounded summary of every round so far and the player's private notes), the latest
+    messages and the task.
+    """
+
+    def __init__(self, players: List[dict]):
+        self.visibility = _visibility(players)
+        self.roles = {p["id"]: p.get("role") for p in players}
+        self.system: Dict[int, SystemMessage] = {}
+        for pid, role in self.roles.items():
+            tmpl = LIBERAL_SYSTEM_TEMPLATE if role == "liberal" else FASCIST_SYSTEM_TEMPLATE
+            text = tmpl.format(agent_id=pid, rules=RULES_SUMMARY, players_list=_players_list(self, pid))
+            self.system[pid] = SystemMessage(content=text)
+        self._nominees: Dict[tuple, List[int]] = {}
+        self._investigable: Dict[tuple, List[int]] = {}
+        self.memory = GameMemory(list(self.roles))
 
-    # Align eligibility logic with agent rules: exclude self, previous chancellor, previous president
-    eligible_ids = [
-        p["id"]
-        for p in state["players"]
-        if p["alive"]
-        and p["id"] != agent_id
-        and (state.get("previous_chancellor_idx") is None or p["id"] != state.get("previous_chancellor_idx"))
-        and (state.get("previous_president_idx") is None or p["id"] != state.get("previous_president_idx"))
-    ]
-    eligible_str = ", ".join(str(e) for e in eligible_ids) if eligible_ids else "none"
+    def render(self, agent_id: int, state: dict, action: str, format_instructions: str) -> List[BaseMessage]:
+        game_summary, private_notes = self.memory.render(agent_id, state)
+        turn = TURN_TEMPLATE.format(
+            game_summary=game_summary,
+            private_notes=private_notes,
+            recent_history=_recent_history(state),
+            action=action,
+            format_instructions=format_instructions,
+            **_state_summary(state),
+        )
+        return [self.system[agent_id], HumanMessage(content=turn)]
+
+    def nominees(self, state: dict, president: int) -> List[int]:
+        """Players `president` may nominate as Chancellor: alive, not themself and not term-limited."""
+        alive = tuple(p["alive"] for p in state["players"])
+        key = (president, state.get("previous_chancellor_idx"), state.get("previous_president_idx"), alive)
+        eligible = self._nominees.get(key)
+        if eligible is None:
+            excluded = {president, key[1], key[2]}
+            eligible = self._nominees[key] = [p["id"] for p in state["players"] if p["alive"] and p["id"] not in excluded]
+        return eligible
+
+    def investigable(self, state: dict) -> List[int]:
+        """Players who may be investigated: alive and not investigated before."""
+        key = tuple((p["alive"], p.get("investigated", False)) for p in state["players"])
+        eligible = self._investigable.get(key)
+        if eligible is None:
+            eligible = self._investigable[key] = [p["id"] for p in state["players"] if p["alive"] and not p.get("investigated", False)]
+        return eligible
 
-    prompt = tmpl.format(
-        agent_id=agent_id,
+def _account(agent_id: int, role: str, schema: type, callback: UsageCallback, latency: float, report: Dict[str, float], fallback: bool, route: Optional[str] = None, circuit_open: bool = False) -> None:
+    """Record tokens, latency and retries of one decision for the current game, and emit them as an event."""
+    entry = dict(
+        player=agent_id,
         role=role,
-        rules=RULES_SUMMARY,
-        liberal_policies=ss["liberal_policies"],
-        fascist_policies=ss["fascist_policies"],
-        deck_size=ss["deck_size"],
-        discard_size=ss["discard_size"],
-        players_list=_players_list(state, agent_id),
-        recent_history=_recent_history(state),
-        action=f"Nominate a Chancellor from eligible players: {eligible_str}.",
-        format_instructions="Return a JSON object with: nominate_player (int), public_statement (string), private_thoughts (string)",
+        phase=PHASES.get(schema, schema.__name__),
+        prompt_tokens=callback.prompt_tokens,
+        cached_prompt_tokens=callback.cached_prompt_tokens,
+        output_tokens=callback.output_tokens,
+        latency=latency,
+        retries=int(report.get("retries", 0)),
+        fallback=fallback,
+        # No model run reported back: the answer came from the response cache.
+        cached=callback.calls == 0 and not fallback,
+        route=route or "",
+        circuit_open=circuit_open,
     )
-    
-    # Use LangChain's native structured output with retry logic
-    structured_model = llm_client.with_structured_output(NominationOut)
-    
+    record_usage(**entry)
+    log_event("llm_usage", **entry)
+    get_current_span().set_attributes({
+        "gen_ai.usage.input_tokens": callback.prompt_tokens,
+        "gen_ai.usage.cache_read_input_tokens": callback.cached_prompt_tokens,
+        "gen_ai.usage.output_tokens": callback.output_tokens,
+        "llm.retries": entry["retries"],
+        "llm.fallback": fallback,
+        "llm.cached": entry["cached"],
+        "llm.route": entry["route"],
+        "llm.circuit_open": circuit_open,
+    })
+
+def _decision(schema: type):
+    """Run a tool in a "decision" span; its prompt construction and model attempts become child spans."""
+    def wrap(fn):
+        @functools.wraps(fn)
+        def tool(agent_id: int, *args, **kwargs):
+            with tracer.start_as_current_span("decision", {"player": agent_id, "phase": PHASES[schema]}):
+                return fn(agent_id, *args, **kwargs)
+        return tool
+    return wrap
+
+def _remember(ctx: PromptContext, schema: type, agent_id: int, state: dict, value: Any) -> None:
+    """Add what the decision showed the player privately (tiles in hand, investigation result) to its memory."""
+    if schema is PresidentLegislateOut:
+        ctx.memory.note(agent_id, f"as President you drew {state.get('drawn_policies', [])} and passed {value}.", state)
+    elif schema is ChancellorLegislateOut:
+        ctx.memory.note(agent_id, f"as Chancellor you received {state.get('passed_policies', [])} and enacted {value}.", state)
+    elif schema is InvestigateOut:
+        ctx.memory.note(agent_id, f"you investigated Player {value}: party {state['players'][value]['team'].upper()}.", state)
+
+def _context(prompt_context: Optional[PromptContext], agent_id: int, state: dict) -> PromptContext:
+    """The game's PromptContext; without one, a throwaway context whose memory starts empty (and is lost after the call)."""
+    if prompt_context is not None:
+        return prompt_context
+    logger(f"[PROMPT] Player {agent_id}: no prompt context passed; building one with an empty game memory", level=WARNING)
+    return PromptContext(state["players"])
+
+def heuristic_decision(schema: type, agent_id: int, role: str, state: dict, prompt_context: Optional[PromptContext], value: Any, confidence: float) -> Any:
+    """Record a decision the heuristic tier took without the model (confident enough for its phase and role)."""
+    phase = PHASES[schema]
+    with tracer.start_as_current_span("decision", {"player": agent_id, "phase": phase, "decision.heuristic": True, "decision.confidence": confidence}):
+        ctx = _context(prompt_context, agent_id, state)
+        _remember(ctx, schema, agent_id, state, value)
+        record_usage(player=agent_id, role=role, phase=phase, prompt_tokens=0, cached_prompt_tokens=0, output_tokens=0,
+                     latency=0.0, retries=0, fallback=False, cached=False, heuristic=True)
+        record_tier(phase, role, escalated=False)
+        log_event("decision", player=agent_id, role=role, schema=schema.__name__, output=value, fallback=False, heuristic=True, confidence=confidence)
+        logger(f"[HEURISTIC] Player {agent_id} ({phase}): {value} (confidence {confidence:.2f})", level=DEBUG)
+    return value
+
+def _forced(schema: type, agent_id: int, role: str, output: Any, **fields: Any) -> str:
+    """
+    Record a decision with a single legal outcome, made without the model, and return its
+    templated public statement.
+    """
+    phase = PHASES[schema]
+    statement = FORCED_STATEMENTS[phase].format(**fields)
+    record_usage(player=agent_id, role=role, phase=phase, prompt_tokens=0, cached_prompt_tokens=0, output_tokens=0,
+                 latency=0.0, retries=0, fallback=False, cached=False, forced=True)
+    log_event("decision", player=agent_id, role=role, schema=schema.__name__, output=output, fallback=False, forced=True)
+    get_current_span().set_attribute("decision.forced", True)
+    logger(f"[FORCED] Player {agent_id} ({phase}): {output}", level=DEBUG)
+    return statement
+
+def _discarded(drawn: List[str], kept: List[str]) -> str:
+    """The card a President discarded to pass `kept` from `drawn`."""
+    rest = list(drawn)
+    for card in kept:
+        if card in rest:
+            rest.remove(card)
+    return rest[0] if rest else "fascist"
+
+def _invoke_structured(llm_client: Any, schema: type, prompt: List[BaseMessage], agent_id: int, role: str, state: dict, fallback: Callable[[], Any], what: str) -> Any:
+    """
+    Run one structured decision and log the agent's thoughts. Returns fallback() when the
+    call is still failing at the decision deadline, fails with an error that is not retried,
+    or the circuit is open (the breaker and rate limiter sit below the response cache, see
+    resilience.GuardedLLM). With model routing, `state` decides which model takes the call.
+    """
+    decision = get_current_span()
+    if decision.is_recording():
+        # Everything the tool did before getting here was building the prompt.
+        tracer.start_span("prompt", {"prompt.chars": sum(len(m.content) for m in prompt)}, start_time=decision.start_time).end()
+    structured_model = llm_client.with_structured_output(schema)
+
     # Stream reasoning for display
     role_display = role.capitalize() if role else "Unknown"
-    logger(f"[THOUGHTS][Player {agent_id} ({role_display})]: ", end="")
-    
-    # Retry logic for API rate limits
-    max_retries = 3
-    retry_delay = 60  # seconds
-    
-    for attempt in range(max_retries):
+    logger(f"[THOUGHTS][Player {agent_id} ({role_display})]: ", end="", level=DEBUG)
+
+    callback = UsageCallback()
+    report: Dict[str, float] = {}
+    start = time.perf_counter()
+    with routing.decision(PHASES.get(schema, schema.__name__), role, state) as routed, reporting(report):
         try:
-            # Get structured result directly without streaming first
-            result = structured_model.invoke(prompt)
-            
-            # Stream the reasoning for display
-            if hasattr(result, 'private_thoughts') and result.private_thoughts:
-                logger(result.private_thoughts, end="")
-            elif hasattr(result, 'content'):
-                logger(result.content or "", end="")
-            else:
-                # Fallback: stream the raw result as string
-                logger(str(result), end="")
-            
-            # Also print the structured output (for debugging / spectator)
-            try:
-                structured_repr = result.dict() if hasattr(result, "dict") else (result.content if hasattr(result, "content") else str(result))
-            except Exception:
-                structured_repr = str(result)
-            logger(f"[STRUCTURED OUTPUT] {structured_repr}")
-            
-            logger("", end="\n")
-            break
-            
+            result = structured_model.invoke(prompt, config={"callbacks": [callback]})
         except Exception as e:
-            if "429" in str(e) or "rate limit" in str(e).lower():
-                if attempt < max_retries - 1:
-                    logger(f"[RETRY] Rate limit hit, waiting {retry_delay} seconds before retry {attempt + 2}/{max_retries}...")
-                    time.sleep(retry_delay)
-                    retry_delay *= 1.5  # Exponential backoff
-                else:
-                    logger(f"[ERROR] Max retries exceeded for rate limit. Using fallback nomination.")
-                    # Fallback: return a default nomination
-                    result = NominationOut(
-                        nominate_player=eligible_ids[0] if eligible_ids else 0,
-                        public_statement="Rate limit exceeded, using default nomination",
-                        private_thoughts="API rate limit prevented full reasoning"
-                    )
+            circuit_open = isinstance(e, CircuitOpen)
+            if circuit_open:
+                logger(f"[CIRCUIT OPEN] Skipping the model for Player {agent_id}. Using fallback {what}.", level=WARNING)
             else:
-                raise e
+                logger(f"[ERROR] Model call failed ({e.__class__.__name__}: {e}). Using fallback {what}.", level=ERROR)
+            result = fallback()
+            _account(agent_id, role, schema, callback, time.perf_counter() - start, report, fallback=True, route=routed.route, circuit_open=circuit_open)
+            log_event("decision", player=agent_id, role=role, schema=schema.__name__, output=result.model_dump(), fallback=True, circuit_open=circuit_open)
+            return result
+    _account(agent_id, role, schema, callback, time.perf_counter() - start, report, fallback=False, route=routed.route)
+
+    # Stream the reasoning for display
+    if hasattr(result, 'private_thoughts') and result.private_thoughts:
+        logger(result.private_thoughts, end="", level=DEBUG)
+    elif hasattr(result, 'content'):
+        logger(result.content or "", end="", level=DEBUG)
+    else:
+        # Fallback: stream the raw result as string
+        logger(str(result), end="", level=DEBUG)
+
+    # Also print the structured output (for debugging / spectator)
+    try:
+        structured_repr = result.dict() if hasattr(result, "dict") else (result.content if hasattr(result, "content") else str(result))
+    except Exception:
+        structured_repr = str(result)
+    logger(f"[STRUCTURED OUTPUT] {structured_repr}", level=DEBUG)
+
+    logger("", end="\n", level=DEBUG)
+    log_event("decision", player=agent_id, role=role, schema=schema.__name__, output=structured_repr, fallback=False)
+    return result
+
+@_decision(NominationOut)
+def nominate_tool(agent_id: int, role: str, state: dict, model: Optional[str] = None, llm_client: Optional[Any] = None, prompt_context: Optional[PromptContext] = None, fallback_agent: Optional[Any] = None) -> Tuple[int, str, str]:
+    ctx = _context(prompt_context, agent_id, state)
+
+    # Align eligibility logic with agent rules: exclude self, previous chancellor, previous president
+    eligible_ids = ctx.nominees(state, agent_id)
+    if len(eligible_ids) == 1:
+        cid = eligible_ids[0]
+        public_statement = _forced(NominationOut, agent_id, role, cid, target=cid)
+        ctx.memory.claim(agent_id, public_statement, state)
+        public = f"I nominate Player {cid}: {public_statement}"
+        logger(f"[NOMINATION] Player {agent_id}: {public}")
+        return cid, public, ""
+    eligible_str = ", ".join(str(e) for e in eligible_ids) if eligible_ids else "none"
+
+    prompt = ctx.render(
+        agent_id,
+        state,
+        action=f"Nominate a Chancellor from eligible players: {eligible_str}.",
+        format_instructions="Return a JSON object with: nominate_player (int), public_statement (string), private_thoughts (string)",
+    )
+    
+    # Fallback: the agent's fallback policy, or the first eligible player
+    def fallback() -> NominationOut:
+        cid = fallback_agent.nominate(state) if fallback_agent else (eligible_ids[0] if eligible_ids else 0)
+        return NominationOut(nominate_player=cid, public_statement=f"No answer from model, nominating Player {cid}", private_thoughts="Model call was rate limited or failed until the decision deadline")
+    result = _invoke_structured(llm_client, NominationOut, prompt, agent_id, role, state, fallback, "nomination")
     
     # Extract the nominated player ID
     cid = result.nominate_player
@@ -149,12 +309,13 @@ def nominate_tool(agent_id: int, role: str, state: dict, model: Optional[str] =
     # Validate nomination against eligibility; if invalid, log and adjust with provenance
     if cid not in eligible_ids:
         adjusted = eligible_ids[0] if eligible_ids else 0
-        logger(f"[PARSE WARNING] Player {agent_id} nominated invalid Player {cid}; adjusting to eligible Player {adjusted}. Eligible: {eligible_ids}")
+        logger(f"[PARSE WARNING] Player {agent_id} nominated invalid Player {cid}; adjusting to eligible Player {adjusted}. Eligible: {eligible_ids}", level=WARNING)
         # annotate public statement to keep provenance visible
         public_statement = (public_statement + " ") if public_statement else ""
         public_statement += f"(adjusted nomination to Player {adjusted} due to invalid nominee)"
         cid = adjusted
 
+    ctx.memory.claim(agent_id, public_statement, state)
     public = f"I nominate Player {cid}"
     if public_statement:
         public += f": {public_statement}"
@@ -162,79 +323,27 @@ def nominate_tool(agent_id: int, role: str, state: dict, model: Optional[str] =
     logger(f"[NOMINATION] Player {agent_id}: {public}")
     return cid, public, private_thoughts
 
-def vote_tool(agent_id: int, role: str, state: dict, model: Optional[str] = None, llm_client: Optional[Any] = None) -> Tuple[bool, str, str]:
-    ss = _state_summary(state)
-    tmpl = LIBERAL_PROMPT_TEMPLATE if role == "liberal" else FASCIST_PROMPT_TEMPLATE
-    prompt = tmpl.format(
-        agent_id=agent_id,
-        role=role,
-        rules=RULES_SUMMARY,
-        liberal_policies=ss["liberal_policies"],
-        fascist_policies=ss["fascist_policies"],
-        deck_size=ss["deck_size"],
-        discard_size=ss["discard_size"],
-        players_list=_players_list(state, agent_id),
-        recent_history=_recent_history(state),
+@_decision(VoteOut)
+def vote_tool(agent_id: int, role: str, state: dict, model: Optional[str] = None, llm_client: Optional[Any] = None, prompt_context: Optional[PromptContext] = None, fallback_agent: Optional[Any] = None) -> Tuple[bool, str, str]:
+    ctx = _context(prompt_context, agent_id, state)
+    prompt = ctx.render(
+        agent_id,
+        state,
         action=f"Vote on government: President {state['current_president_idx']}, Chancellor {state['nominated_chancellor_idx']}.",
         format_instructions="Return a JSON object with: vote (boolean), public_statement (string), private_thoughts (string)",
     )
     
-    # Use LangChain's native structured output with retry logic
-    structured_model = llm_client.with_structured_output(VoteOut)
-    
-    # Stream reasoning for display
-    role_display = role.capitalize() if role else "Unknown"
-    logger(f"[THOUGHTS][Player {agent_id} ({role_display})]: ", end="")
-    
-    # Retry logic for API rate limits
-    max_retries = 3
-    retry_delay = 60  # seconds
-    
-    for attempt in range(max_retries):
-        try:
-            # Get structured result directly without streaming first
-            result = structured_model.invoke(prompt)
-            
-            # Stream the reasoning for display
-            if hasattr(result, 'private_thoughts') and result.private_thoughts:
-                logger(result.private_thoughts, end="")
-            elif hasattr(result, 'content'):
-                logger(result.content or "", end="")
-            else:
-                # Fallback: stream the raw result as string
-                logger(str(result), end="")
-            
-            # Also print the structured output (for debugging / spectator)
-            try:
-                structured_repr = result.dict() if hasattr(result, "dict") else (result.content if hasattr(result, "content") else str(result))
-            except Exception:
-                structured_repr = str(result)
-            logger(f"[STRUCTURED OUTPUT] {structured_repr}")
-            
-            logger("", end="\n")
-            break
-            
-        except Exception as e:
-            if "429" in str(e) or "rate limit" in str(e).lower():
-                if attempt < max_retries - 1:
-                    logger(f"[RETRY] Rate limit hit, waiting {retry_delay} seconds before retry {attempt + 2}/{max_retries}...")
-                    time.sleep(retry_delay)
-                    retry_delay *= 1.5  # Exponential backoff
-                else:
-                    logger(f"[ERROR] Max retries exceeded for rate limit. Using fallback vote.")
-                    # Fallback: return a default vote (Ja for first government)
-                    result = VoteOut(
-                        vote=True,
-                        public_statement="Rate limit exceeded, voting Ja by default",
-                        private_thoughts="API rate limit prevented full reasoning"
-                    )
-            else:
-                raise e
+    # Fallback: the agent's fallback policy, or Ja
+    def fallback() -> VoteOut:
+        vote = fallback_agent.vote(state) if fallback_agent else True
+        return VoteOut(vote=vote, public_statement=f"No answer from model, voting {'Ja' if vote else 'Nein'}", private_thoughts="Model call was rate limited or failed until the decision deadline")
+    result = _invoke_structured(llm_client, VoteOut, prompt, agent_id, role, state, fallback, "vote")
     
     vote = result.vote
     public_statement = result.public_statement
     private_thoughts = result.private_thoughts
     
+    ctx.memory.claim(agent_id, public_statement, state)
     public = "Ja" if vote else "Nein"
     if public_statement:
         public += f" ({public_statement})"
@@ -242,76 +351,34 @@ def vote_tool(agent_id: int, role: str, state: dict, model: Optional[str] = None
     logger(f"[VOTE] Player {agent_id}: {public}")
     return vote, public, private_thoughts
 
-def president_legislate_tool(agent_id: int, state: dict, model: Optional[str] = None, llm_client: Optional[Any] = None) -> Tuple[List[str], str, str]:
-    ss = _state_summary(state)
+@_decision(PresidentLegislateOut)
+def president_legislate_tool(agent_id: int, state: dict, model: Optional[str] = None, llm_client: Optional[Any] = None, prompt_context: Optional[PromptContext] = None, fallback_agent: Optional[Any] = None) -> Tuple[List[str], str, str]:
+    ctx = _context(prompt_context, agent_id, state)
     drawn = state.get("drawn_policies", [])
     role_local = state["players"][agent_id]["role"]
-    tmpl = LIBERAL_PROMPT_TEMPLATE if role_local == "liberal" else FASCIST_PROMPT_TEMPLATE
-    prompt = tmpl.format(
-        agent_id=agent_id,
-        role=role_local,
-        rules=RULES_SUMMARY,
-        liberal_policies=ss["liberal_policies"],
-        fascist_policies=ss["fascist_policies"],
-        deck_size=ss["deck_size"],
-        discard_size=ss["discard_size"],
-        players_list=_players_list(state, agent_id),
-        recent_history=_recent_history(state),
+    if len(drawn) == 3 and len(set(drawn)) == 1:
+        rem = drawn[1:]
+        public_claim = _forced(PresidentLegislateOut, agent_id, role_local, rem, policy=drawn[0])
+        ctx.memory.claim(agent_id, public_claim, state, legislative=True)
+        _remember(ctx, PresidentLegislateOut, agent_id, state, rem)
+        public = f"I discard {drawn[0]}: {public_claim}"
+        logger(f"[PRESIDENT] Player {agent_id}: {public}")
+        return rem, public, ""
+    prompt = ctx.render(
+        agent_id,
+        state,
         action=f"You are President and you drew: {drawn}.",
         format_instructions="Return a JSON object with: discard_policy ('liberal' or 'fascist'), public_statement (string), private_thoughts (string)",
     )
     
-    # Use LangChain's native structured output with retry logic
-    structured_model = llm_client.with_structured_output(PresidentLegislateOut)
-    
-    # Stream reasoning for display
-    role_display = role_local.capitalize() if role_local else "Unknown"
-    logger(f"[THOUGHTS][Player {agent_id} ({role_display})]: ", end="")
-    
-    # Retry logic for API rate limits
-    max_retries = 3
-    retry_delay = 60  # seconds
-    
-    for attempt in range(max_retries):
-        try:
-            # Get structured result directly without streaming first
-            result = structured_model.invoke(prompt)
-            
-            # Stream the reasoning for display
-            if hasattr(result, 'private_thoughts') and result.private_thoughts:
-                logger(result.private_thoughts, end="")
-            elif hasattr(result, 'content'):
-                logger(result.content or "", end="")
-            else:
-                # Fallback: stream the raw result as string
-                logger(str(result), end="")
-            
-            # Also print the structured output (for debugging / spectator)
-            try:
-                structured_repr = result.dict() if hasattr(result, "dict") else (result.content if hasattr(result, "content") else str(result))
-            except Exception:
-                structured_repr = str(result)
-            logger(f"[STRUCTURED OUTPUT] {structured_repr}")
-            
-            logger("", end="\n")
-            break
-            
-        except Exception as e:
-            if "429" in str(e) or "rate limit" in str(e).lower():
-                if attempt < max_retries - 1:
-                    logger(f"[RETRY] Rate limit hit, waiting {retry_delay} seconds before retry {attempt + 2}/{max_retries}...")
-                    time.sleep(retry_delay)
-                    retry_delay *= 1.5  # Exponential backoff
-                else:
-                    logger(f"[ERROR] Max retries exceeded for rate limit. Using fallback legislation.")
-                    # Fallback: return a default legislation (discard fascist)
-                    result = PresidentLegislateOut(
-                        discard_policy="fascist",
-                        public_statement="Rate limit exceeded, discarding fascist by default",
-                        private_thoughts="API rate limit prevented full reasoning"
-                    )
-            else:
-                raise e
+    # Fallback: the agent's fallback policy, or discard fascist
+    fallback = lambda: PresidentLegislateOut(
+        discard_policy=_discarded(drawn, fallback_agent.president_legislate(state)) if fallback_agent else "fascist",
+        # Neutral: the statement becomes the President's public claim, and must not reveal the cards.
+        public_statement="No answer from model; fallback policy decided",
+        private_thoughts="Model call was rate limited or failed until the decision deadline"
+    )
+    result = _invoke_structured(llm_client, PresidentLegislateOut, prompt, agent_id, role_local, state, fallback, "legislation")
     
     discard = result.discard_policy
     public_claim = result.public_statement
@@ -323,6 +390,8 @@ def president_legislate_tool(agent_id: int, state: dict, model: Optional[str] =
     else:
         rem = rem[1:] if len(rem) > 1 else []
     
+    ctx.memory.claim(agent_id, public_claim, state, legislative=True)
+    _remember(ctx, PresidentLegislateOut, agent_id, state, rem)
     public = f"I discard {discard}"
     if public_claim:
         public += f": {public_claim}"
@@ -330,76 +399,33 @@ def president_legislate_tool(agent_id: int, state: dict, model: Optional[str] =
     logger(f"[PRESIDENT] Player {agent_id}: {public}")
     return rem, public, private_thoughts
 
-def chancellor_legislate_tool(agent_id: int, state: dict, model: Optional[str] = None, llm_client: Optional[Any] = None) -> Tuple[str, str, str]:
-    ss = _state_summary(state)
+@_decision(ChancellorLegislateOut)
+def chancellor_legislate_tool(agent_id: int, state: dict, model: Optional[str] = None, llm_client: Optional[Any] = None, prompt_context: Optional[PromptContext] = None, fallback_agent: Optional[Any] = None) -> Tuple[str, str, str]:
+    ctx = _context(prompt_context, agent_id, state)
     passed = state.get("passed_policies", [])
     role_local = state["players"][agent_id]["role"]
-    tmpl = LIBERAL_PROMPT_TEMPLATE if role_local == "liberal" else FASCIST_PROMPT_TEMPLATE
-    prompt = tmpl.format(
-        agent_id=agent_id,
-        role=role_local,
-        rules=RULES_SUMMARY,
-        liberal_policies=ss["liberal_policies"],
-        fascist_policies=ss["fascist_policies"],
-        deck_size=ss["deck_size"],
-        discard_size=ss["discard_size"],
-        players_list=_players_list(state, agent_id),
-        recent_history=_recent_history(state),
+    if len(passed) == 2 and len(set(passed)) == 1:
+        enact = passed[0]
+        public_claim = _forced(ChancellorLegislateOut, agent_id, role_local, enact, policy=enact)
+        ctx.memory.claim(agent_id, public_claim, state, legislative=True)
+        _remember(ctx, ChancellorLegislateOut, agent_id, state, enact)
+        public = f"I enact {enact}: {public_claim}"
+        logger(f"[CHANCELLOR] Player {agent_id}: {public}")
+        return enact, public, ""
+    prompt = ctx.render(
+        agent_id,
+        state,
         action=f"You are Chancellor and received: {passed}.",
         format_instructions="Return a JSON object with: policy_to_enact ('liberal' or 'fascist'), public_statement (string), private_thoughts (string)",
     )
     
-    # Use LangChain's native structured output with retry logic
-    structured_model = llm_client.with_structured_output(ChancellorLegislateOut)
-    
-    # Stream reasoning for display
-    role_display = role_local.capitalize() if role_local else "Unknown"
-    logger(f"[THOUGHTS][Player {agent_id} ({role_display})]: ", end="")
-    
-    # Retry logic for API rate limits
-    max_retries = 3
-    retry_delay = 60  # seconds
-    
-    for attempt in range(max_retries):
-        try:
-            # Get structured result directly without streaming first
-            result = structured_model.invoke(prompt)
-            
-            # Stream the reasoning for display
-            if hasattr(result, 'private_thoughts') and result.private_thoughts:
-                logger(result.private_thoughts, end="")
-            elif hasattr(result, 'content'):
-                logger(result.content or "", end="")
-            else:
-                # Fallback: stream the raw result as string
-                logger(str(result), end="")
-            
-            # Also print the structured output (for debugging / spectator)
-            try:
-                structured_repr = result.dict() if hasattr(result, "dict") else (result.content if hasattr(result, "content") else str(result))
-            except Exception:
-                structured_repr = str(result)
-            logger(f"[STRUCTURED OUTPUT] {structured_repr}")
-            
-            logger("", end="\n")
-            break
-            
-        except Exception as e:
-            if "429" in str(e) or "rate limit" in str(e).lower():
-                if attempt < max_retries - 1:
-                    logger(f"[RETRY] Rate limit hit, waiting {retry_delay} seconds before retry {attempt + 2}/{max_retries}...")
-                    time.sleep(retry_delay)
-                    retry_delay *= 1.5  # Exponential backoff
-                else:
-                    logger(f"[ERROR] Max retries exceeded for rate limit. Using fallback enactment.")
-                    # Fallback: return a default enactment (liberal)
-                    result = ChancellorLegislateOut(
-                        policy_to_enact="liberal",
-                        public_statement="Rate limit exceeded, enacting liberal by default",
-                        private_thoughts="API rate limit prevented full reasoning"
-                    )
-            else:
-                raise e
+    # Fallback: the agent's fallback policy, or liberal
+    fallback = lambda: ChancellorLegislateOut(
+        policy_to_enact=fallback_agent.chancellor_legislate(state) if fallback_agent else "liberal",
+        public_statement="No answer from model; fallback policy decided",
+        private_thoughts="Model call was rate limited or failed until the decision deadline"
+    )
+    result = _invoke_structured(llm_client, ChancellorLegislateOut, prompt, agent_id, role_local, state, fallback, "enactment")
     
     enact = result.policy_to_enact
     public_claim = result.public_statement
@@ -409,6 +435,8 @@ def chancellor_legislate_tool(agent_id: int, state: dict, model: Optional[str] =
     if enact not in passed:
         enact = passed[0] if passed else enact
     
+    ctx.memory.claim(agent_id, public_claim, state, legislative=True)
+    _remember(ctx, ChancellorLegislateOut, agent_id, state, enact)
     public = f"I enact {enact}"
     if public_claim:
         public += f": {public_claim}"
@@ -416,76 +444,31 @@ def chancellor_legislate_tool(agent_id: int, state: dict, model: Optional[str] =
     logger(f"[CHANCELLOR] Player {agent_id}: {public}")
     return enact, public, private_thoughts
 
-def investigate_tool(agent_id: int, state: dict, model: Optional[str] = None, llm_client: Optional[Any] = None) -> Tuple[int, str, str]:
-    ss = _state_summary(state)
-    eligible = [p["id"] for p in state["players"] if p["alive"] and not p.get("investigated", False)]
+@_decision(InvestigateOut)
+def investigate_tool(agent_id: int, state: dict, model: Optional[str] = None, llm_client: Optional[Any] = None, prompt_context: Optional[PromptContext] = None, fallback_agent: Optional[Any] = None) -> Tuple[int, str, str]:
+    ctx = _context(prompt_context, agent_id, state)
+    eligible = ctx.investigable(state)
     role_local = state["players"][agent_id]["role"]
-    tmpl = LIBERAL_PROMPT_TEMPLATE if role_local == "liberal" else FASCIST_PROMPT_TEMPLATE
-    prompt = tmpl.format(
-        agent_id=agent_id,
-        role=role_local,
-        rules=RULES_SUMMARY,
-        liberal_policies=ss["liberal_policies"],
-        fascist_policies=ss["fascist_policies"],
-        deck_size=ss["deck_size"],
-        discard_size=ss["discard_size"],
-        players_list=_players_list(state, agent_id),
-        recent_history=_recent_history(state),
+    if len(eligible) == 1:
+        target = eligible[0]
+        reason = _forced(InvestigateOut, agent_id, role_local, target, target=target)
+        ctx.memory.claim(agent_id, reason, state)
+        _remember(ctx, InvestigateOut, agent_id, state, target)
+        public = f"I investigate Player {target}: {reason}"
+        logger(f"[INVESTIGATE] Player {agent_id} reason: {public}")
+        return target, public, ""
+    prompt = ctx.render(
+        agent_id,
+        state,
         action=f"You may investigate one player. Eligible: {eligible}.",
         format_instructions="Return a JSON object with: player_to_investigate (int), public_statement (string), private_thoughts (string)",
     )
     
-    # Use LangChain's native structured output with retry logic
-    structured_model = llm_client.with_structured_output(InvestigateOut)
-    
-    # Stream reasoning for display
-    role_display = role_local.capitalize() if role_local else "Unknown"
-    logger(f"[THOUGHTS][Player {agent_id} ({role_display})]: ", end="")
-    
-    # Retry logic for API rate limits
-    max_retries = 3
-    retry_delay = 60  # seconds
-    
-    for attempt in range(max_retries):
-        try:
-            # Get structured result directly without streaming first
-            result = structured_model.invoke(prompt)
-            
-            # Stream the reasoning for display
-            if hasattr(result, 'private_thoughts') and result.private_thoughts:
-                logger(result.private_thoughts, end="")
-            elif hasattr(result, 'content'):
-                logger(result.content or "", end="")
-            else:
-                # Fallback: stream the raw result as string
-                logger(str(result), end="")
-            
-            # Also print the structured output (for debugging / spectator)
-            try:
-                structured_repr = result.dict() if hasattr(result, "dict") else (result.content if hasattr(result, "content") else str(result))
-            except Exception:
-                structured_repr = str(result)
-            logger(f"[STRUCTURED OUTPUT] {structured_repr}")
-            
-            logger("", end="\n")
-            break
-            
-        except Exception as e:
-            if "429" in str(e) or "rate limit" in str(e).lower():
-                if attempt < max_retries - 1:
-                    logger(f"[RETRY] Rate limit hit, waiting {retry_delay} seconds before retry {attempt + 2}/{max_retries}...")
-                    time.sleep(retry_delay)
-                    retry_delay *= 1.5  # Exponential backoff
-                else:
-                    logger(f"[ERROR] Max retries exceeded for rate limit. Using fallback investigation.")
-                    # Fallback: return a default investigation
-                    result = InvestigateOut(
-                        player_to_investigate=eligible[0] if eligible else 0,
-                        public_statement="Rate limit exceeded, investigating first eligible player by default",
-                        private_thoughts="API rate limit prevented full reasoning"
-                    )
-            else:
-                raise e
+    # Fallback: the agent's fallback policy, or the first eligible player
+    def fallback() -> InvestigateOut:
+        target = fallback_agent.investigate_player(state) if fallback_agent else (eligible[0] if eligible else 0)
+        return InvestigateOut(player_to_investigate=target, public_statement=f"No answer from model, investigating Player {target}", private_thoughts="Model call was rate limited or failed until the decision deadline")
+    result = _invoke_structured(llm_client, InvestigateOut, prompt, agent_id, role_local, state, fallback, "investigation")
     
     target = result.player_to_investigate
     reason = result.public_statement
@@ -495,6 +478,8 @@ def investigate_tool(agent_id: int, state: dict, model: Optional[str] = None, ll
     if target not in eligible:
         target = eligible[0] if eligible else 0
     
+    ctx.memory.claim(agent_id, reason, state)
+    _remember(ctx, InvestigateOut, agent_id, state, target)
     public = f"I investigate Player {target}"
     if reason:
         public += f": {reason}"
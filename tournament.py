@@ -0,0 +1,297 @@
+"""Run many games concurrently and aggregate the results.
+
+Games are spread over a process pool; each worker plays its share as concurrent
+asyncio tasks. Every game gets its own seed, agents and log file.
+
+    python tournament.py --games 200 --workers 8 --concurrency 4 --seed 1000
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import random
+import statistics
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, asdict, field
+from datetime import datetime
+from typing import Any, List, Optional
+
+from game import create_initial_state
+from agents import game_memory, initialize_agents
+from graph import build_workflow
+from log import LEVELS, event as log_event, flush as flush_log, game_log, log as logger
+from main import clients, make_llm, model_name
+from context_cache import find as find_context_cache
+from batching import find as find_batching
+from resilience import find as find_hedging, get_breaker
+from ratelimit import RateLimiter, get_limiter, set_limiter
+from replay import GameRecord, record_agents
+from checkpoint import GameStore, async_saver, checkpoint_config, restore_rng
+from usage import escalation_rates, route_stats, export as export_usage, tracking as track_usage
+from tracing import game_trace
+
+@dataclass
+class GameResult:
+    game_id: int
+    seed: int
+    winner: Optional[str] = None
+    reason: Optional[str] = None
+    rounds: int = 0
+    llm_calls: int = 0
+    llm_latency: float = 0.0
+    duration: float = 0.0
+    log_path: str = ""
+    events_path: str = ""
+    decisions_path: str = ""
+    trace_path: str = ""
+    error: Optional[str] = None
+    usage: dict = field(default_factory=dict)
+
+class MeteredLLM:
+    """Wraps an LLM client and counts structured calls and their latency for one game."""
+
+    def __init__(self, llm: Any):
+        self.llm = llm
+        self.calls = 0
+        self.latency = 0.0
+        self._lock = threading.Lock()
+
+    def with_structured_output(self, schema, **kwargs):
+        return _MeteredRunnable(self, self.llm.with_structured_output(schema, **kwargs))
+
+    def record(self, elapsed: float) -> None:
+        with self._lock:
+            self.calls += 1
+            self.latency += elapsed
+
+    def __getattr__(self, name):
+        return getattr(self.llm, name)
+
+class _MeteredRunnable:
+    def __init__(self, meter: MeteredLLM, runnable: Any):
+        self.meter = meter
+        self.runnable = runnable
+
+    def invoke(self, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return self.runnable.invoke(*args, **kwargs)
+        finally:
+            self.meter.record(time.perf_counter() - start)
+
+def game_key(game_id: int, seed: int) -> str:
+    """File stem and checkpoint id of one tournament game."""
+    return f"game_{game_id:04d}_seed{seed}"
+
+async def play_game(game_id: int, seed: int, log_dir: str, llm: Any, model: str, backend: str = "llm", saver: Any = None, store: Optional[GameStore] = None, trace: bool = False, speculate: bool = False) -> GameResult:
+    """
+    Play one game to completion in the current event loop, resuming from its checkpoint if `saver` has one.
+    With trace=True the game's timing spans are appended to <key>.trace.jsonl. With speculate=True the
+    President's legislative decision starts during the vote.
+    """
+    key = game_key(game_id, seed)
+    result = GameResult(game_id=game_id, seed=seed)
+    result.log_path = os.path.join(log_dir, key + ".txt")
+    result.events_path = os.path.join(log_dir, key + ".events.jsonl")
+    result.decisions_path = os.path.join(log_dir, key + ".decisions.json")
+    result.trace_path = os.path.join(log_dir, key + ".trace.jsonl") if trace else ""
+    meter = MeteredLLM(llm)
+    start = time.perf_counter()
+    config = checkpoint_config(key)
+    app = build_workflow().compile(checkpointer=saver)
+    saved = (await app.aget_state(config)).values if saver is not None else {}
+    record = GameRecord(seed=seed, backend=backend, model=model)
+    with track_usage(key) as usage, game_log(result.log_path, events_path=result.events_path, game_id=game_id, append=bool(saved)), game_trace(result.trace_path, id=key, seed=seed, backend=backend, resumed=bool(saved)):
+        try:
+            rng = random.Random(seed)
+            if saved:
+                state, inputs = saved, None
+                restore_rng(rng, state)
+                if os.path.exists(result.decisions_path):
+                    record = GameRecord.load(result.decisions_path)
+                result.rounds = sum(1 for d in record.decisions if d.kind == "nominate")
+                logger(f"[RESUME] Game {game_id}: continuing from phase {state.get('phase')}")
+                log_event("game_resume", seed=seed, phase=state.get("phase"))
+            else:
+                if store is not None:
+                    # Off the event loop: the checkpointer's connection may hold the write lock meanwhile.
+                    await asyncio.to_thread(store.register, key, seed, backend, model)
+                log_event("game_start", seed=seed, backend=backend, model=model)
+                state = inputs = create_initial_state(rng)
+                if saver is not None:
+                    state["rng_state"] = rng.getstate()
+            agents = record_agents(initialize_agents(state["players"], model=model, llm_client=meter, backend=backend, rng=rng, seed=seed), record)
+            context = {"agents": agents, "rng": rng, "persist_rng": saver is not None, "speculate": speculate, "memory": game_memory(agents)}
+            if saved and context["memory"] is not None:
+                context["memory"].restore(state.get("memory_state"))
+            if backend == "scripted":
+                context["vote_workers"] = 1
+            async for output in app.astream(
+                inputs,
+                stream_mode="updates",
+                config=config,
+                context=context,
+                durability="sync",
+            ):
+                if saver is not None:
+                    record.save(result.decisions_path)
+                for node_name, update in output.items():
+                    if node_name == "nominate":
+                        result.rounds += 1
+                    if update.get("winner") is not None:
+                        result.winner = update["winner"]
+                        result.reason = update.get("game_over_reason")
+        except Exception as e:
+            result.error = f"{type(e).__name__}: {e}"
+            logger(f"[ERROR] Game {game_id} aborted: {result.error}")
+        if saver is None or result.error is None:
+            # After a crash the file keeps the decisions of the last checkpointed node, ready for a resume.
+            record.winner, record.reason = result.winner, result.reason
+            record.save(result.decisions_path)
+        log_event("game_end", winner=result.winner, reason=result.reason, rounds=result.rounds, error=result.error)
+    result.duration = time.perf_counter() - start
+    result.llm_calls = meter.calls
+    result.llm_latency = meter.latency
+    result.usage = usage.summary()
+    if store is not None and result.error is None and result.winner is not None:
+        await asyncio.to_thread(store.finish, key, asdict(result))
+    return result
+
+async def _play_batch(jobs: List[tuple], log_dir: str, concurrency: int, backend: str, db_path: Optional[str], trace: bool, speculate: bool) -> List[GameResult]:
+    model = model_name()
+    llm = make_llm(model) if backend != "scripted" else None
+    gate = asyncio.Semaphore(max(1, concurrency))
+    store = GameStore(db_path) if db_path else None
+
+    async def bounded(game_id: int, seed: int, saver: Any) -> GameResult:
+        async with gate:
+            return await play_game(game_id, seed, log_dir, llm, model, backend, saver, store, trace, speculate)
+
+    try:
+        if store is None:
+            return await asyncio.gather(*(bounded(game_id, seed, None) for game_id, seed in jobs))
+        async with async_saver(db_path) as saver:
+            return await asyncio.gather(*(bounded(game_id, seed, saver) for game_id, seed in jobs))
+    finally:
+        if store is not None:
+            store.close()
+        if llm is not None:
+            logger(f"[CIRCUIT] {get_breaker().stats()}")
+        for client in clients(llm) if llm is not None else []:
+            hedging = find_hedging(client)
+            if hedging is not None:
+                logger(f"[HEDGING] {hedging.stats()}")
+            batching = find_batching(client)
+            if batching is not None:
+                logger(f"[BATCHING] {batching.stats()}")
+            context_cache = find_context_cache(client)
+            if context_cache is not None:
+                context_cache.release()
+
+def run_batch(jobs: List[tuple], log_dir: str, concurrency: int, backend: str = "llm", quota_share: float = 1.0, db_path: Optional[str] = None, trace: bool = False, speculate: bool = False) -> List[dict]:
+    """Process-pool entry point: play a list of (game_id, seed) jobs and return plain dicts."""
+    if quota_share < 1.0:
+        # Each worker process paces itself to its share of the request quota.
+        limiter = get_limiter()
+        set_limiter(RateLimiter(limiter.bucket.rate * 60 * quota_share, max(1, int(limiter.bucket.capacity * quota_share)), limiter.max_attempts, limiter.deadline))
+    results = [asdict(r) for r in asyncio.run(_play_batch(jobs, log_dir, concurrency, backend, db_path, trace, speculate))]
+    flush_log()
+    return results
+
+def summarize(results: List[dict]) -> dict:
+    """Aggregate per-game results into a tournament report."""
+    finished = [r for r in results if r["error"] is None and r["winner"] is not None]
+    winners = Counter(r["winner"] for r in finished)
+    calls = sum(r["llm_calls"] for r in finished)
+
+    def mean(key: str) -> float:
+        return statistics.fmean(r[key] for r in finished) if finished else 0.0
+
+    return {
+        "games": len(results),
+        "finished": len(finished),
+        "errors": len(results) - len(finished),
+        "win_rate": {team: winners[team] / len(finished) if finished else 0.0 for team in ("liberals", "fascists")},
+        "win_reasons": dict(Counter(r["reason"] for r in finished).most_common()),
+        "avg_rounds": mean("rounds"),
+        "avg_llm_calls": mean("llm_calls"),
+        "avg_llm_latency_per_game": mean("llm_latency"),
+        "avg_llm_latency_per_call": sum(r["llm_latency"] for r in finished) / calls if calls else 0.0,
+        "avg_duration": mean("duration"),
+    }
+
+def run_tournament(games: int, workers: int, concurrency: int, base_seed: int, out_dir: str, backend: str = "llm", resume: bool = False, trace: bool = False, speculate: bool = False) -> dict:
+    """
+    Play `games` games with seeds base_seed, base_seed + 1, ... and write results plus a report to out_dir.
+    Every game is checkpointed in out_dir/checkpoints.sqlite; with resume=True finished games are
+    taken from there and unfinished ones continue from their last completed node.
+    With trace=True every game also writes timing spans next to its log; speculate=True starts each
+    President's legislative decision during the vote.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    db_path = os.path.join(out_dir, "checkpoints.sqlite")
+    if os.path.exists(db_path) and not resume:
+        raise SystemExit(f"{out_dir} already holds a tournament; pass --resume to continue it")
+    store = GameStore(db_path)
+    done = store.results() if resume else {}
+    store.close()
+    jobs = [(i, base_seed + i) for i in range(games)]
+    results: List[dict] = [done[game_key(*job)] for job in jobs if game_key(*job) in done]
+    jobs = [job for job in jobs if game_key(*job) not in done]
+    if resume:
+        logger(f"[TOURNAMENT] Resuming: {len(results)} games already finished, {len(jobs)} to play")
+    workers = max(1, min(workers, len(jobs)))
+    chunks = [jobs[i::workers] for i in range(workers)]
+    if workers == 1:
+        results.extend(run_batch(jobs, out_dir, concurrency, backend, db_path=db_path, trace=trace, speculate=speculate))
+    else:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            share = [1.0 / workers] * workers
+            for batch in pool.map(run_batch, chunks, [out_dir] * workers, [concurrency] * workers, [backend] * workers, share, [db_path] * workers, [trace] * workers, [speculate] * workers):
+                results.extend(batch)
+    results.sort(key=lambda r: r["game_id"])
+    report = summarize(results)
+    # After a resume, a game's usage covers the calls made since its last restart.
+    usage = export_usage(os.path.join(out_dir, "usage.json"), {game_key(r["game_id"], r["seed"]): r.get("usage") or {} for r in results})
+    report["usage"] = usage.get("total", {})
+    if backend == "tiered":
+        report["escalation"] = escalation_rates(usage)
+    if usage.get("by_route"):
+        report["routing"] = route_stats(usage)
+    with open(os.path.join(out_dir, "results.jsonl"), "w", encoding="utf-8") as fh:
+        for r in results:
+            fh.write(json.dumps(r) + "\n")
+    with open(os.path.join(out_dir, "report.json"), "w", encoding="utf-8") as fh:
+        json.dump(report, fh, indent=2)
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a Secret Hitler tournament.")
+    parser.add_argument("--games", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="worker processes")
+    parser.add_argument("--concurrency", type=int, default=4, help="concurrent games per worker")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first game; game i uses seed + i")
+    parser.add_argument("--out", default=None, help="output directory (default: logs/tournament_<timestamp>)")
+    parser.add_argument("--resume", action="store_true", help="continue the tournament in --out: skip finished games, resume unfinished ones")
+    parser.add_argument("--backend", choices=["llm", "tiered", "scripted"], default="llm", help="agent decision backend (tiered: scripted rules first, LLM when unsure)")
+    parser.add_argument("--trace", action="store_true", help="write per-game timing spans (render with tracing.py)")
+    parser.add_argument("--speculate", action="store_true", help="start each President's legislative decision while the ballots are collected")
+    parser.add_argument("--log-level", choices=list(LEVELS), default=None, help="per-game log level (default: LOG_LEVEL or DEBUG); INFO drops thoughts")
+    args = parser.parse_args()
+    if args.log_level:
+        # Read by every game log, including those in spawned worker processes.
+        os.environ["LOG_LEVEL"] = args.log_level
+    out_dir = args.out or os.path.join("logs", datetime.utcnow().strftime("tournament_%Y%m%d_%H%M%S"))
+    start = time.perf_counter()
+    if args.resume and not args.out:
+        parser.error("--resume needs the --out directory of the tournament to continue")
+    report = run_tournament(args.games, args.workers, args.concurrency, args.seed, out_dir, args.backend, args.resume, args.trace, args.speculate)
+    logger(json.dumps(report, indent=2))
+    logger(f"[TOURNAMENT] {report['games']} games in {time.perf_counter() - start:.1f}s — results in {out_dir}")
+
+if __name__ == "__main__":
+    main()
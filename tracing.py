@@ -0,0 +1,342 @@
+"""Timing spans for a game: game → round → graph node → agent decision → LLM attempt.
+
+The tracer mirrors the OpenTelemetry API (`get_tracer(...).start_as_current_span(name,
+attributes=...)`, `start_span`, `get_current_span`, spans with `set_attribute`,
+`record_exception` and `end`), so instrumented code can move to the real SDK
+unchanged. Spans are recorded only inside `game_trace(path)`; elsewhere they are
+non-recording and cost a context-variable lookup. Finished spans are written as JSON
+lines in the shape of the SDK's `span.to_json()` (ConsoleSpanExporter), one trace per
+game run, when the game ends.
+
+Render a flame-style breakdown of one or more trace files:
+
+    python tracing.py logs/run_20250101_120000.trace.jsonl
+    python tracing.py logs/tournament_x/*.trace.jsonl --folded > game.folded
+"""
+import argparse
+import json
+import os
+import secrets
+import threading
+import time
+import traceback
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional
+
+class SpanContext:
+    def __init__(self, trace_id: int, span_id: int):
+        self.trace_id = trace_id
+        self.span_id = span_id
+
+class Span:
+    """One timed operation. Times are nanoseconds since the epoch, as in OpenTelemetry."""
+
+    def __init__(self, trace: "GameTrace", name: str, parent: Optional["Span"], attributes: Optional[Dict[str, Any]] = None, start_time: Optional[int] = None):
+        self._trace = trace
+        self.name = name
+        self.context = SpanContext(trace.trace_id, secrets.randbits(64))
+        self.parent = parent.context if parent is not None else None
+        self.attributes: Dict[str, Any] = dict(attributes or {})
+        self.events: List[dict] = []
+        self.status = "UNSET"
+        self.start_time = time.time_ns() if start_time is None else start_time
+        self.end_time: Optional[int] = None
+        # Set inside deferred(): the span is held there when it ends instead of joining the trace.
+        self._held = _HELD.get()
+
+    def is_recording(self) -> bool:
+        return self.end_time is None
+
+    def get_span_context(self) -> SpanContext:
+        return self.context
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def set_attributes(self, attributes: Dict[str, Any]) -> None:
+        self.attributes.update(attributes)
+
+    def set_status(self, status: str) -> None:
+        self.status = status
+
+    def record_exception(self, exc: BaseException) -> None:
+        self.events.append({
+            "name": "exception",
+            "timestamp": _iso(time.time_ns()),
+            "attributes": {
+                "exception.type": type(exc).__name__,
+                "exception.message": str(exc),
+                "exception.stacktrace": "".join(traceback.format_exception(exc)),
+            },
+        })
+
+    def end(self, end_time: Optional[int] = None) -> None:
+        if self.end_time is not None:
+            return
+        self.end_time = time.time_ns() if end_time is None else end_time
+        if self._held is not None:
+            self._held.append(self)
+        else:
+            self._trace.finished(self)
+
+    def to_json(self) -> dict:
+        return {
+            "name": self.name,
+            "context": {"trace_id": f"0x{self.context.trace_id:032x}", "span_id": f"0x{self.context.span_id:016x}", "trace_state": "[]"},
+            "kind": "SpanKind.INTERNAL",
+            "parent_id": f"0x{self.parent.span_id:016x}" if self.parent is not None else None,
+            "start_time": _iso(self.start_time),
+            "end_time": _iso(self.end_time),
+            "status": {"status_code": self.status},
+            "attributes": self.attributes,
+            "events": self.events,
+            "links": [],
+            "resource": {"attributes": {"service.name": "secret-hitler"}, "schema_url": ""},
+        }
+
+class _NonRecordingSpan:
+    """Returned outside a game trace; accepts and drops everything."""
+
+    def is_recording(self) -> bool:
+        return False
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def set_attributes(self, attributes: Dict[str, Any]) -> None:
+        pass
+
+    def set_status(self, status: str) -> None:
+        pass
+
+    def record_exception(self, exc: BaseException) -> None:
+        pass
+
+    def end(self, end_time: Optional[int] = None) -> None:
+        pass
+
+INVALID_SPAN = _NonRecordingSpan()
+
+def _iso(ns: Optional[int]) -> Optional[str]:
+    if ns is None:
+        return None
+    seconds, rest = divmod(ns, 1_000_000_000)
+    return datetime.fromtimestamp(seconds, timezone.utc).strftime("%Y-%m-%dT%H:%M:%S") + f".{rest:09d}Z"
+
+def _parse_iso(text: str) -> int:
+    stamp, fraction = text.rstrip("Z").split(".")
+    seconds = int(datetime.strptime(stamp, "%Y-%m-%dT%H:%M:%S").replace(tzinfo=timezone.utc).timestamp())
+    return seconds * 1_000_000_000 + int(fraction.ljust(9, "0")[:9])
+
+class JsonFileExporter:
+    """Appends finished spans to a JSON-lines file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+
+    def export(self, spans: List[Span]) -> None:
+        lines = "".join(json.dumps(span.to_json(), default=str) + "\n" for span in spans)
+        with self._lock, open(self.path, "a", encoding="utf-8") as fh:
+            fh.write(lines)
+
+    def shutdown(self) -> None:
+        pass
+
+class GameTrace:
+    """The spans of one game run: its root span, the current round, and the finished spans awaiting export."""
+
+    def __init__(self, exporter: Optional[JsonFileExporter], attributes: Optional[Dict[str, Any]] = None):
+        self.exporter = exporter
+        self.trace_id = secrets.randbits(128)
+        self._lock = threading.Lock()
+        self._finished: List[Span] = []
+        self.rounds = 0
+        self.round: Optional[Span] = None
+        self.root = Span(self, "game", None, attributes)
+
+    def finished(self, span: Span) -> None:
+        with self._lock:
+            self._finished.append(span)
+
+    def next_round(self) -> Span:
+        """End the current round span (if any) and open the next one under the game span."""
+        if self.round is not None:
+            self.round.end()
+        self.rounds += 1
+        self.round = Span(self, "round", self.root, {"game.round": self.rounds})
+        return self.round
+
+    def close(self) -> None:
+        if self.round is not None:
+            self.round.end()
+        self.root.set_attribute("game.rounds", self.rounds)
+        self.root.end()
+        with self._lock:
+            spans, self._finished = self._finished, []
+        if self.exporter is not None:
+            self.exporter.export(spans)
+
+_TRACE: ContextVar[Optional[GameTrace]] = ContextVar("game_trace", default=None)
+_SPAN: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+_HELD: ContextVar[Optional[List[Span]]] = ContextVar("held_spans", default=None)
+
+@contextmanager
+def deferred() -> Iterator[List[Span]]:
+    """Hold back spans started in the current thread/async task; yields them for commit()."""
+    held: List[Span] = []
+    token = _HELD.set(held)
+    try:
+        yield held
+    finally:
+        _HELD.reset(token)
+
+def commit(spans: List[Span], keep: bool) -> None:
+    """Add held spans to their trace, or drop them (and everything their attributes reveal)."""
+    if keep:
+        for span in spans:
+            span._trace.finished(span)
+
+def get_current_span() -> Any:
+    return _SPAN.get() or INVALID_SPAN
+
+def current_trace() -> Optional[GameTrace]:
+    return _TRACE.get()
+
+class Tracer:
+    def __init__(self, name: str):
+        self.name = name
+
+    def start_span(self, name: str, attributes: Optional[Dict[str, Any]] = None, start_time: Optional[int] = None, parent: Optional[Span] = None) -> Any:
+        trace = _TRACE.get()
+        if trace is None:
+            return INVALID_SPAN
+        return Span(trace, name, parent or _SPAN.get() or trace.root, attributes, start_time)
+
+    @contextmanager
+    def start_as_current_span(self, name: str, attributes: Optional[Dict[str, Any]] = None, parent: Optional[Span] = None) -> Iterator[Any]:
+        span = self.start_span(name, attributes, parent=parent)
+        if span is INVALID_SPAN:
+            yield span
+            return
+        token = _SPAN.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.record_exception(e)
+            span.set_status("ERROR")
+            raise
+        finally:
+            _SPAN.reset(token)
+            span.end()
+
+_tracers: Dict[str, Tracer] = {}
+
+def get_tracer(name: str) -> Tracer:
+    if name not in _tracers:
+        _tracers[name] = Tracer(name)
+    return _tracers[name]
+
+@contextmanager
+def game_trace(path: Optional[str], **attributes: Any) -> Iterator[Optional[GameTrace]]:
+    """
+    Record spans from the current thread/async task (and the ballots it fans out) under one
+    "game" span while the block runs, then append them to `path`. path=None disables tracing.
+    """
+    if not path:
+        yield None
+        return
+    trace = GameTrace(JsonFileExporter(path), {f"game.{k}": v for k, v in attributes.items()})
+    token = _TRACE.set(trace)
+    span_token = _SPAN.set(trace.root)
+    try:
+        yield trace
+    except BaseException as e:
+        trace.root.record_exception(e)
+        trace.root.set_status("ERROR")
+        raise
+    finally:
+        _SPAN.reset(span_token)
+        _TRACE.reset(token)
+        trace.close()
+
+def load(paths: List[str]) -> List[dict]:
+    spans = []
+    for path in paths:
+        with open(path, encoding="utf-8") as fh:
+            spans.extend(json.loads(line) for line in fh if line.strip())
+    return spans
+
+def flame(spans: List[dict]) -> Dict[tuple, dict]:
+    """
+    Aggregate spans by their name path from the root (game → round → vote → ...): call count,
+    total wall time and self time (wall time not covered by children, floored at 0 — concurrent
+    ballots can cover more than their parent's wall time).
+    """
+    by_id = {s["context"]["span_id"]: s for s in spans}
+    children: Dict[Optional[str], List[dict]] = {}
+    for s in spans:
+        parent = s["parent_id"] if s["parent_id"] in by_id else None
+        children.setdefault(parent, []).append(s)
+
+    def seconds(s: dict) -> float:
+        return (_parse_iso(s["end_time"]) - _parse_iso(s["start_time"])) / 1e9
+
+    stats: Dict[tuple, dict] = {}
+
+    def walk(span: dict, prefix: tuple) -> None:
+        path = prefix + (span["name"],)
+        total = seconds(span)
+        kids = children.get(span["context"]["span_id"], [])
+        entry = stats.setdefault(path, {"count": 0, "total": 0.0, "self": 0.0, "children": 0.0})
+        entry["count"] += 1
+        entry["total"] += total
+        child_total = sum(seconds(k) for k in kids)
+        entry["children"] += child_total
+        entry["self"] += max(0.0, total - child_total)
+        for kid in kids:
+            walk(kid, path)
+
+    for root in children.get(None, []):
+        walk(root, ())
+    return stats
+
+def render(stats: Dict[tuple, dict], width: int = 40, depth: Optional[int] = None) -> str:
+    """Indented tree of span paths, children ordered by total time, with bars relative to the root total."""
+    roots = sum(v["total"] for k, v in stats.items() if len(k) == 1) or 1.0
+    lines = [f"{'span':<44} {'calls':>6} {'total s':>9} {'self s':>8} {'%':>6}"]
+
+    def visit(path: tuple) -> None:
+        entry = stats[path]
+        label = "  " * (len(path) - 1) + path[-1]
+        share = entry["total"] / roots
+        note = f" ({entry['children'] / entry['total']:.1f}x parallel)" if entry["total"] and entry["children"] > entry["total"] * 1.05 else ""
+        lines.append(f"{label:<44} {entry['count']:>6} {entry['total']:>9.3f} {entry['self']:>8.3f} {share:>6.1%}  {'#' * round(share * width)}{note}")
+        if depth is not None and len(path) >= depth:
+            return
+        kids = [k for k in stats if len(k) == len(path) + 1 and k[:len(path)] == path]
+        for kid in sorted(kids, key=lambda k: -stats[k]["total"]):
+            visit(kid)
+
+    for root in sorted((k for k in stats if len(k) == 1), key=lambda k: -stats[k]["total"]):
+        visit(root)
+    return "\n".join(lines)
+
+def folded(stats: Dict[tuple, dict]) -> str:
+    """Self time per path in microseconds, in the folded-stack format flamegraph.pl and speedscope read."""
+    return "\n".join(f"{';'.join(path)} {round(entry['self'] * 1e6)}" for path, entry in sorted(stats.items()) if entry["self"] > 0)
+
+def main():
+    parser = argparse.ArgumentParser(description="Show where a game's time went, from its trace file(s).")
+    parser.add_argument("traces", nargs="+", help="trace files written with --trace")
+    parser.add_argument("--depth", type=int, default=None, help="only show this many levels")
+    parser.add_argument("--folded", action="store_true", help="print folded stacks for flamegraph.pl/speedscope instead")
+    args = parser.parse_args()
+    stats = flame(load(args.traces))
+    print(folded(stats) if args.folded else render(stats, depth=args.depth))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,255 @@
+"""Token and latency accounting for LLM decisions.
+
+tools._invoke_structured records one entry per decision: prompt tokens (and how many the
+provider served from its context cache), output tokens, latency, retries and whether a
+fallback was used. Forced and heuristic-tier decisions are recorded with no tokens.
+Entries are tagged with game, player, role, phase and model route, and collected by the
+GameUsage bound to the current thread/async task (see `tracking`). Summaries from many
+games merge by adding, which is how tournaments build cross-game histograms.
+"""
+import json
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+# Upper bucket edges; the last bucket is open-ended.
+HISTOGRAM_EDGES = {
+    "latency_seconds": [0.25, 0.5, 1, 2, 4, 8, 16, 32, 64],
+    "prompt_tokens": [250, 500, 1000, 2000, 4000, 8000, 16000],
+    "output_tokens": [50, 100, 200, 400, 800, 1600, 3200],
+}
+
+@dataclass
+class UsageRecord:
+    game: Optional[Any]
+    player: int
+    role: str
+    phase: str
+    prompt_tokens: int
+    cached_prompt_tokens: int
+    output_tokens: int
+    latency: float
+    retries: int
+    fallback: bool
+    cached: bool
+    forced: bool = False
+    heuristic: bool = False
+    # A speculative decision whose result was thrown away (its tokens were still spent).
+    wasted: bool = False
+    # Model route the decision was sent to (see routing.py); empty without routing or a model call.
+    route: str = ""
+    # Fallback taken without calling the model because the circuit breaker was open.
+    circuit_open: bool = False
+
+class UsageCallback(BaseCallbackHandler):
+    """Collects token counts reported by the chat model during one decision."""
+
+    def __init__(self):
+        self.prompt_tokens = 0
+        self.cached_prompt_tokens = 0
+        self.output_tokens = 0
+        self.calls = 0
+
+    def on_llm_end(self, response, **kwargs) -> None:
+        self.calls += 1
+        for generations in response.generations:
+            for generation in generations:
+                meta = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                self.prompt_tokens += meta.get("input_tokens", 0)
+                # Prompt tokens served from the provider's context cache (billed at a discount).
+                self.cached_prompt_tokens += (meta.get("input_token_details") or {}).get("cache_read", 0)
+                self.output_tokens += meta.get("output_tokens", 0)
+
+def _histogram(name: str, values: Iterable[float]) -> List[int]:
+    edges = HISTOGRAM_EDGES[name]
+    counts = [0] * (len(edges) + 1)
+    for value in values:
+        counts[next((i for i, edge in enumerate(edges) if value <= edge), len(edges))] += 1
+    return counts
+
+def _totals(records: List[UsageRecord]) -> dict:
+    return {
+        "calls": len(records),
+        "prompt_tokens": sum(r.prompt_tokens for r in records),
+        "cached_prompt_tokens": sum(r.cached_prompt_tokens for r in records),
+        "output_tokens": sum(r.output_tokens for r in records),
+        "latency_seconds": sum(r.latency for r in records),
+        "retries": sum(r.retries for r in records),
+        "fallbacks": sum(1 for r in records if r.fallback),
+        "cached": sum(1 for r in records if r.cached),
+        "forced": sum(1 for r in records if r.forced),
+        "heuristic": sum(1 for r in records if r.heuristic),
+        "wasted": sum(1 for r in records if r.wasted),
+        "circuit_open": sum(1 for r in records if r.circuit_open),
+    }
+
+class GameUsage:
+    """Usage records for one game."""
+
+    def __init__(self, game_id: Optional[Any] = None):
+        self.game_id = game_id
+        self.records: List[UsageRecord] = []
+        # phase -> role -> {"decisions", "escalated", "agreed"} for the heuristic tier.
+        self.escalation: Dict[str, Dict[str, Dict[str, int]]] = {}
+        self._lock = threading.Lock()
+
+    def add(self, record: UsageRecord) -> None:
+        with self._lock:
+            self.records.append(record)
+
+    def tokens(self) -> int:
+        """Prompt plus output tokens spent so far."""
+        with self._lock:
+            return sum(r.prompt_tokens + r.output_tokens for r in self.records)
+
+    def tier(self, phase: str, role: str, escalated: bool, agreed: bool = False) -> None:
+        with self._lock:
+            counts = self.escalation.setdefault(phase, {}).setdefault(role, {"decisions": 0, "escalated": 0, "agreed": 0})
+            counts["decisions"] += 1
+            counts["escalated"] += escalated
+            counts["agreed"] += escalated and agreed
+
+    def summary(self) -> dict:
+        with self._lock:
+            records = list(self.records)
+            escalation = {phase: {role: dict(c) for role, c in roles.items()} for phase, roles in self.escalation.items()}
+
+        def grouped(key: str) -> Dict[str, dict]:
+            groups: Dict[str, List[UsageRecord]] = {}
+            for r in records:
+                if key == "route" and not r.route:
+                    continue
+                groups.setdefault(str(getattr(r, key)), []).append(r)
+            return {name: _totals(group) for name, group in sorted(groups.items())}
+
+        return {
+            "games": 1,
+            "total": _totals(records),
+            "by_phase": grouped("phase"),
+            "by_role": grouped("role"),
+            "by_player": grouped("player"),
+            "by_route": grouped("route"),
+            "escalation": escalation,
+            "histograms": {
+                "edges": HISTOGRAM_EDGES,
+                **{name: _histogram(name, (getattr(r, name.replace("_seconds", "")) for r in records)) for name in HISTOGRAM_EDGES},
+            },
+        }
+
+def merge(summaries: Iterable[dict]) -> dict:
+    """Add up game summaries (totals, groups and histogram counts) into one cross-game summary."""
+    def add(into: dict, other: dict) -> None:
+        for key, value in other.items():
+            if key == "edges":
+                into[key] = value
+            elif isinstance(value, dict):
+                add(into.setdefault(key, {}), value)
+            elif isinstance(value, list):
+                into[key] = [a + b for a, b in zip(into[key], value)] if key in into else list(value)
+            else:
+                into[key] = into.get(key, 0) + value
+
+    merged: dict = {}
+    for summary in summaries:
+        if summary:
+            add(merged, summary)
+    return merged
+
+def export(path: str, games: Dict[str, dict]) -> dict:
+    """Write per-game summaries and their cross-game merge to `path` (JSON). Returns the merge."""
+    total = merge(games.values())
+    with open(path, "w", encoding="utf-8") as fh:
+        json.dump({"total": total, "games": games}, fh, indent=2, sort_keys=True)
+    return total
+
+_CURRENT: ContextVar[Optional[GameUsage]] = ContextVar("game_usage", default=None)
+
+def current() -> Optional[GameUsage]:
+    return _CURRENT.get()
+
+@contextmanager
+def tracking(game_id: Optional[Any] = None) -> Iterator[GameUsage]:
+    """Collect usage records from the current thread/async task (and ballots it fans out) while the block runs."""
+    usage = GameUsage(game_id)
+    token = _CURRENT.set(usage)
+    try:
+        yield usage
+    finally:
+        _CURRENT.reset(token)
+
+_PENDING: ContextVar[Optional[list]] = ContextVar("usage_pending", default=None)
+
+@contextmanager
+def deferred() -> Iterator[list]:
+    """Hold back records made in the current thread/async task (a speculative decision); yields them for commit()."""
+    pending: list = []
+    token = _PENDING.set(pending)
+    try:
+        yield pending
+    finally:
+        _PENDING.reset(token)
+
+def commit(pending: list, wasted: bool = False) -> None:
+    """Add held-back records to their game. Wasted ones keep their token counts but skip the tier counts."""
+    for usage, kind, payload in pending:
+        if kind == "record":
+            payload.wasted = wasted
+            usage.add(payload)
+        elif not wasted:
+            usage.tier(*payload)
+
+def record(**fields: Any) -> Optional[UsageRecord]:
+    """Add a record to the current game's usage, if one is being tracked."""
+    usage = _CURRENT.get()
+    if usage is None:
+        return None
+    entry = UsageRecord(game=usage.game_id, **fields)
+    pending = _PENDING.get()
+    if pending is not None:
+        pending.append((usage, "record", entry))
+    else:
+        usage.add(entry)
+    return entry
+
+def record_tier(phase: str, role: str, escalated: bool, agreed: bool = False) -> None:
+    """Count one heuristic-tier decision for the current game: kept local, or escalated (and whether the model agreed)."""
+    usage = _CURRENT.get()
+    if usage is None:
+        return
+    pending = _PENDING.get()
+    if pending is not None:
+        pending.append((usage, "tier", (phase, role, escalated, agreed)))
+    else:
+        usage.tier(phase, role, escalated, agreed)
+
+def escalation_rates(summary: dict) -> Dict[str, Dict[str, dict]]:
+    """Per phase and role: share of heuristic-tier decisions escalated to the model, and the model's agreement with the heuristic."""
+    return {
+        phase: {
+            role: {
+                "decisions": c["decisions"],
+                "escalation_rate": round(c["escalated"] / c["decisions"], 3) if c["decisions"] else 0.0,
+                "agreement": round(c["agreed"] / c["escalated"], 3) if c["escalated"] else None,
+            }
+            for role, c in sorted(roles.items())
+        }
+        for phase, roles in sorted((summary.get("escalation") or {}).items())
+    }
+
+def route_stats(summary: dict) -> Dict[str, dict]:
+    """Per model route: decisions, mean latency and mean tokens per decision, and fallbacks."""
+    stats = {}
+    for route, t in sorted((summary.get("by_route") or {}).items()):
+        calls = t["calls"] or 1
+        stats[route] = {
+            "decisions": t["calls"],
+            "mean_latency_seconds": round(t["latency_seconds"] / calls, 3),
+            "mean_prompt_tokens": round(t["prompt_tokens"] / calls, 1),
+            "mean_output_tokens": round(t["output_tokens"] / calls, 1),
+            "fallbacks": t["fallbacks"],
+        }
+    return stats